@@ -1,11 +1,25 @@
 import os
-from typing import Literal
+import re
+from typing import Any, Callable, Literal
 
-from PyQt6 import QtWidgets
+from PyQt6 import QtWidgets, QtCore
 from loguru import logger
 
 from .windows import Window
 from . import connector
+from .executor import QueryExecutor
+from . import charts
+from . import counts
+from . import ingest
+from . import receiver
+from . import background
+from . import rollups
+from . import timeindex
+from . import templates
+from . import fingerprints
+from . import search
+from . import stats
+from .profiler import profiler
 from . import actions
 from . import dialogs
 from . import config as cfg
@@ -28,6 +42,117 @@ app_mode = Literal[
 ]
 
 
+class BackgroundIndex():
+
+    """
+    Side index of the current table shown in views: its source and
+    mark are read by the query executor, the views are loaded and rows
+    not indexed yet are indexed by the builder in background /
+    Вспомогательный индекс текущей таблицы, показываемый в представлениях:
+    его источник и отметка читаются исполнителем запросов, представления
+    загружаются, а еще не проиндексированные строки индексирует построитель в фоне
+    """
+
+    application: "Application"
+    builder_type: type[background.StepBuilder]
+    source: Callable[[connector.SQL, str], Any]
+    mark: Callable[[connector.SQL, str], int | None]
+    # загрузка представлений по источнику индекса (None - индексировать нечего)
+    load: Callable[[Any], None] | None
+    views: tuple[QtWidgets.QWidget]
+    # название индекса в строке состояния
+    status: str
+    builder: background.StepBuilder = None
+
+    def __init__(
+            self,
+            application: "Application",
+            builder_type: type[background.StepBuilder],
+            source: Callable[[connector.SQL, str], Any],
+            mark: Callable[[connector.SQL, str], int | None],
+            status: str,
+            load: Callable[[Any], None] = None,
+            views: tuple[QtWidgets.QWidget] = ()):
+
+        self.application = application
+        self.builder_type = builder_type
+        self.source = source
+        self.mark = mark
+        self.status = status
+        self.load = load
+        self.views = views
+
+    def toggle(self, view: QtWidgets.QWidget):
+        view.setVisible(not view.isVisible())
+        self.refresh()
+
+    def refresh(self):
+        """
+        Loads the views and updates the index of the current table
+        if any of the views is shown /
+        Загружает представления и обновляет индекс текущей таблицы,
+        если показано хотя бы одно из представлений
+        """
+        application = self.application
+        table = application.window.forms["main"].table.table
+        if application.mode != "main" or not table or not any(view.isVisible() for view in self.views):
+            return
+        tablename = table.name
+        application.executor.submit(
+            lambda reader: (self.source(reader, tablename), self.mark(reader, tablename), reader.max_rowid(tablename)),
+            lambda state: self._on_state(tablename, *state),
+            "normal",
+            f"{self.builder_type.label}-state")
+
+    def _on_state(self, tablename: str, source: Any, mark: int | None, last: int | None):
+        if self.load:
+            self.load(source)
+        if source is not None:
+            self.update(tablename, mark, last)
+
+    def update(self, tablename: str, mark: int | None, last: int | None):
+        """
+        Starts the builder if the table has rows after the mark /
+        Запускает построитель, если в таблице есть строки после отметки
+        """
+        if (mark is None or mark < (last or 0)) and not self.builder:
+            self.build(tablename)
+
+    def build(self, tablename: str):
+        application = self.application
+        builder = self.builder_type(application.working_database.path, tablename)
+        builder.signals.progress.connect(
+            lambda mark, last: application.window.statusbar.set_rows_status(
+                False, f"{self.status}: {mark * 100 // last if last else 100}%"))
+        builder.signals.finished.connect(lambda tablename: self._on_built(builder))
+        builder.signals.failed.connect(lambda message: self._on_failed(builder))
+        self.builder = builder
+        builder.start()
+
+    def stop(self):
+        if self.builder:
+            self.builder.stop()
+            self.builder = None
+
+    def _on_built(self, builder: background.StepBuilder):
+        # построитель другой базы данных или уже остановленный
+        if builder is not self.builder:
+            return
+        self.builder = None
+        application = self.application
+        table = application.window.forms["main"].table.table
+        if application.mode == "main" and table:
+            # строка состояния снова показывает количество строк
+            application._show_row_count(table.name)
+        # пока строился индекс, могла быть выбрана другая таблица
+        self.refresh()
+
+    def _on_failed(self, builder: background.StepBuilder):
+        # построение повторяется только при следующем показе
+        if builder is self.builder:
+            self.builder = None
+
+
 class Application(QtWidgets.QApplication):
 
     """
@@ -37,7 +162,22 @@ class Application(QtWidgets.QApplication):
 
     mode: app_mode
     application_database: connector.ApplicationDatabase
-    working_database: connector.Connection
+    working_database: connector.SQL
+    executor: QueryExecutor = None
+    row_counter: counts.RowCounter = None
+    profiles_timer: QtCore.QTimer
+    ingestor: ingest.LogIngestor | ingest.BulkImporter = None
+    follower: ingest.LogFollower = None
+    log_receiver: receiver.LogReceiver = None
+    rollup_index: BackgroundIndex
+    template_index: BackgroundIndex
+    exception_index: BackgroundIndex
+    search_index: BackgroundIndex
+    regex_scanner: search.RegexScanner = None
+    stats_builder: stats.StatsBuilder = None
+    # таблица: (состояние файла базы данных при подсчете, статистика столбцов)
+    column_stats: dict[str, tuple[str, list[stats.ColumnStats]]]
+    time_indexes: dict[str, timeindex.TimeIndex]
     log_in_attempts: int = 3
     user: actions.User = None
     window: Window
@@ -50,6 +190,11 @@ class Application(QtWidgets.QApplication):
         gwm.start()
         # подключение к базе данных приложения
         self.application_database = connector.ApplicationDatabase()
+        # история запросов прошлых запусков и ее периодическое сохранение
+        profiler.restore(self.application_database.load_profiles())
+        self.profiles_timer = QtCore.QTimer()
+        self.profiles_timer.timeout.connect(self.save_profiles)
+        self.profiles_timer.start(cfg.PROFILER_SAVE_INTERVAL)
 
     def _create_window(self) -> None:
 
@@ -67,6 +212,34 @@ class Application(QtWidgets.QApplication):
         )
         self.window.signals.triggered.connect(
             lambda trigger: self._window_triggered(trigger))
+        self.window.forms["main"].rollups.bar.option_signals.chosen.connect(
+            lambda granularity: self.rollup_index.refresh())
+        self.window.forms["main"].chart.bar.option_signals.chosen.connect(
+            lambda option: self.load_chart())
+        self.window.forms["main"].exceptions.signals.chosen.connect(self.show_occurrences)
+        self.window.forms["main"].exceptions.signals.occurrence.connect(
+            lambda rowid: self.window.forms["main"].table.seek(rowid))
+        self.window.dialogs["jump"].jump_signals.jump.connect(self.jump_to_time)
+        self.window.forms["main"].search.search_signals.search.connect(self.search_text)
+        self.window.forms["main"].search.search_signals.regex.connect(self.scan_regex)
+        self.window.forms["main"].matches.signals.chosen.connect(
+            lambda rowid: self.window.forms["main"].table.seek(rowid))
+        self.window.forms["main"].matches.signals.closed.connect(self.close_matches)
+        form = self.window.forms["main"]
+        self.rollup_index = BackgroundIndex(
+            self, rollups.RollupBuilder, connector.SQL.rollup_source, connector.SQL.rollup_mark,
+            "Сводка", self._show_rollups, (form.rollups, form.chart))
+        self.template_index = BackgroundIndex(
+            self, templates.TemplateBuilder, connector.SQL.template_source, connector.SQL.template_mark,
+            "Шаблоны", self._show_templates, (form.templates, ))
+        self.exception_index = BackgroundIndex(
+            self, fingerprints.ExceptionBuilder, connector.SQL.exception_source, connector.SQL.exception_mark,
+            "Исключения", self._show_exceptions, (form.exceptions, ))
+        # полнотекстовый индекс строится при поиске, а не при показе
+        self.search_index = BackgroundIndex(
+            self, search.SearchBuilder, connector.SQL.search_source, connector.SQL.search_mark, "Индекс поиска")
+        self.time_indexes = {}
+        self.column_stats = {}
 
     def run(self) -> int:
         """
@@ -82,7 +255,13 @@ class Application(QtWidgets.QApplication):
             "owner",
             "C:\\Users\\Slavic\\Desktop\\Новая папка\\database1.db")
         self.switch_mode("nofile")
-        return self.exec()
+        exit_code = self.exec()
+        if self.log_receiver:
+            # принятые записи из очереди дописываются до выхода
+            self.log_receiver.stop()
+            self.log_receiver.thread.join()
+        self.save_profiles()
+        return exit_code
 
     def _on_dropdown_button_click(self, name: str):
 
@@ -92,37 +271,175 @@ class Application(QtWidgets.QApplication):
         action = name.split("-")[1]
 
         if (
-            action in ("file", "folder", "last") and
+            action in ("file", "folder", "last", "follow") and
             self.mode not in ("auth", "open")
         ):
             self._open(action)
+        elif action == "receive" and self.mode == "main":
+            self.toggle_receiver()
+        elif action == "jump" and self.mode == "main":
+            self.window.show_jump_dialog()
 
-    def _open(self, target: Literal["file", "folder", "last"]) -> None:
+    def _open(self, target: Literal["file", "folder", "last", "follow"]) -> None:
         old_mode = self.mode[:]
         self.mode = "open"
         try:
             return {
                 "file": self._open_file,
                 "folder": self._open_folder,
-                "last": self._open_last
+                "last": self._open_last,
+                "follow": self._follow_folder
             }[target](old_mode)
         except FileNotFoundError:
             self.mode = old_mode
 
     def _open_file(self, old_mode: app_mode) -> None:
         path = dialogs.getOpenFileDialog(
-            "Открыть файл", cfg.DATABASE_FINDER_PATH)
+            "Открыть файл",
+            cfg.DATABASE_FINDER_PATH,
+            f"{cfg.DATABASE_FINDER_FILTER};;{cfg.LOG_FINDER_FILTER}")
         if not path:
             self.mode = old_mode
-        self.connect_database(path)
+        if path.endswith(ingest.log_extensions):
+            self.ingest_log(path, old_mode)
+        else:
+            self.connect_database(path)
+
+    def ingest_log(self, path: str, old_mode: app_mode) -> None:
+        """
+        Loads the log file into a database next to it in background
+        and opens the database when done /
+        Загружает файл логов в базу данных рядом с ним в фоне
+        и открывает базу данных по завершении
+        """
+        self._start_ingestor(ingest.LogIngestor(path), old_mode)
+
+    def import_logs(self, paths: tuple[str], old_mode: app_mode) -> None:
+        """
+        Imports log files of a folder into a database next to it
+        with a process pool and opens the database when done /
+        Импортирует файлы логов папки в базу данных рядом с ней
+        пулом процессов и открывает базу данных по завершении
+        """
+        self._start_ingestor(ingest.BulkImporter(paths), old_mode)
+
+    def _start_ingestor(
+            self,
+            ingestor: ingest.LogIngestor | ingest.BulkImporter,
+            old_mode: app_mode) -> None:
+
+        if self.ingestor:
+            self.ingestor.stop()
+        self.ingestor = ingestor
+        ingestor.signals.progress.connect(self._on_ingest_progress)
+        ingestor.signals.finished.connect(
+            lambda result: self.connect_database(result.database_path, result.tablename))
+        ingestor.signals.failed.connect(
+            lambda message: self._on_ingest_failed(old_mode))
+        ingestor.start()
+
+    def _follow_folder(self, old_mode: app_mode) -> None:
+        folder = dialogs.getExistingFolderDialog(
+            "Следить за папкой", cfg.DATABASE_FINDER_PATH)
+        self.follow_folder(folder, old_mode)
+
+    def follow_folder(self, folder: str, old_mode: app_mode) -> None:
+        """
+        Follows rotated log files of the folder into a database next to it.
+        The database is opened when the log table is created /
+        Отслеживает ротируемые файлы логов папки в базу данных рядом с ней.
+        База данных открывается, когда создана таблица логов
+        """
+        if self.follower:
+            self.follower.stop()
+        self.follower = ingest.LogFollower(folder)
+        self.follower.signals.started.connect(
+            lambda tablename: self.connect_database(self.follower.database_path, tablename))
+        self.follower.signals.appended.connect(
+            lambda tablename, first, last: self._on_rows_appended(
+                self.follower.database_path, tablename, first, last))
+        self.follower.signals.failed.connect(
+            lambda message: self._on_ingest_failed(old_mode))
+        self.follower.start()
+
+    def toggle_receiver(self) -> None:
+        """
+        Starts receiving log records from the network into the working
+        database or stops it if already receiving /
+        Запускает прием записей логов из сети в рабочую базу данных
+        или останавливает его, если прием уже идет
+        """
+        if self.log_receiver:
+            # последние счетчики остановленного приема не показываются
+            self.log_receiver.signals.stats.disconnect()
+            self.log_receiver.stop()
+            self.log_receiver = None
+            self.window.statusbar.set_receiver_status(False, "")
+            return
+        path = self.working_database.path
+        self.log_receiver = receiver.LogReceiver(path)
+        self.log_receiver.signals.started.connect(
+            lambda tablename: self._on_receiver_started(path, tablename))
+        self.log_receiver.signals.appended.connect(
+            lambda tablename, first, last: self._on_rows_appended(path, tablename, first, last))
+        self.log_receiver.signals.stats.connect(
+            lambda stats: self.window.statusbar.set_receiver_status(
+                not stats.dropped, receiver.format_stats(stats)))
+        self.log_receiver.signals.failed.connect(self._on_receiver_failed)
+        self.log_receiver.start()
+
+    def _on_receiver_started(self, path: str, tablename: str):
+        self.window.statusbar.set_receiver_status(True, receiver.format_stats(receiver.ReceiverStats()))
+        # таблица принятых записей создана - схема перечитывается
+        if (
+            self.mode == "main" and
+            self.working_database.path == path and
+            tablename not in self.working_database.tables
+        ):
+            self.connect_database(path, tablename)
+
+    def _on_receiver_failed(self, message: str):
+        self.log_receiver = None
+        self.window.statusbar.set_receiver_status(False, "")
+        self.window.show_alert_dialog(
+            "Ошибка",
+            "Не удалось запустить прием логов"
+        )
+
+    def _on_rows_appended(self, path: str, tablename: str, first_rowid: int, max_rowid: int):
+        if self.mode != "main" or self.working_database.path != path:
+            return
+        self.row_counter.grow(tablename, max_rowid, True)
+        self.window.forms["main"].table.rows_appended(tablename, first_rowid)
+        # сводки обновлены писателем вместе со строками
+        self.load_rollups()
+        self.load_chart()
+        self.template_index.refresh()
+        self.exception_index.refresh()
+
+    def _on_ingest_progress(self, offset: int, size: int):
+        percent = offset * 100 // size if size else 100
+        self.window.statusbar.set_rows_status(False, f"Загрузка: {percent}%")
+
+    def _on_ingest_failed(self, old_mode: app_mode):
+        self.mode = old_mode
+        self.window.show_alert_dialog(
+            "Ошибка",
+            "Не удалось загрузить файл логов"
+        )
 
     def _open_folder(self, old_mode: app_mode) -> None:
         paths = dialogs.getFilesFromFolderDialog(
             "Открыть папку проекта",
             cfg.DATABASE_FINDER_PATH,
-            (".db", ".sqlite3")
+            (".db", ".sqlite3", *ingest.log_extensions)
         )
-        if len(paths) > 1:
+        logs = tuple(path for path in paths if path.endswith(ingest.log_extensions))
+        paths = tuple(path for path in paths if not path.endswith(ingest.log_extensions))
+        # папка без баз данных, но с логами импортируется целиком
+        if not paths and logs:
+            self.import_logs(logs, old_mode)
+        elif len(paths) > 1:
             self._open_one(old_mode, paths)
         elif len(paths) == 1:
             self.connect_database(paths[0])
@@ -156,32 +473,103 @@ class Application(QtWidgets.QApplication):
         if self.mode != "main":
             return
         self.window.forms["main"].table.draw_table(tablename)
-
-    def connect_database(self, path: str):
+        self.close_matches()
+        self.rollup_index.refresh()
+        self.template_index.refresh()
+        self.exception_index.refresh()
+        self.refresh_stats()
+        self._show_row_count(tablename)
+
+    def _show_row_count(self, tablename: str):
+        count = self.row_counter.get(tablename)
+        if count:
+            self.window.statusbar.set_rows_status(
+                count.exact, f"Строк: {counts.format_count(count)}")
+
+    def connect_database(self, path: str, tablename: str = None):
         if not path:
             return
+        path = os.path.abspath(path)
         try:
-            self.working_database = connector.SQL(path)
+            database = connector.SQL(path, parse=False)
         except PermissionError:
             self.window.show_alert_dialog(
                 "Ошибка",
                 "Доступ к базе данных ограничен"
             )
         else:
+            if self.executor:
+                self.executor.close()
+            self.working_database = database
+            self.executor = QueryExecutor(database)
+            self.time_indexes = {}
+            self.column_stats = {}
+            self.rollup_index.stop()
+            self.template_index.stop()
+            self.exception_index.stop()
+            self.search_index.stop()
+            self.stop_regex()
+            if self.stats_builder:
+                self.stats_builder.stop()
+                self.stats_builder = None
             self.application_database.update_last_proj(self.user, path)
-            self.switch_mode("main")
-            self.connect_table(self.working_database)
-            self.switch_table(self.window.forms["main"].nav.radios[0].text())
+            cached = self.application_database.load_schema(path)
+            # схема читается в рабочем потоке, окно не блокируется
+            self.executor.submit(
+                lambda reader: reader.read_schema(cached),
+                lambda schema: self._on_schema_read(schema, cached, tablename),
+                "high",
+                "parse",
+                self._on_database_failed)
+
+    def _on_schema_read(
+            self,
+            schema: connector.Schema,
+            cached: connector.Schema | None,
+            tablename: str = None):
+
+        if not cached or cached.version != schema.version:
+            self.application_database.save_schema(schema)
+        self.working_database.set_tables(schema.tables)
+        self.row_counter = counts.RowCounter(self.working_database, self.executor)
+        self.row_counter.signals.changed.connect(self._on_row_count)
+        self.switch_mode("main")
+        self.connect_table(self.working_database)
+        nav = self.window.forms["main"].nav
+        index = nav.tablenames.index(tablename) if tablename in nav.tablenames else 0
+        if index:
+            # выбор вкладки сам переключает таблицу
+            nav.tab(index)
+        else:
+            self.switch_table(nav.tablenames[0])
+        # точные значения уточняются в фоне, пока показываются оценки
+        self.row_counter.start()
+
+    def _on_row_count(self, tablename: str, count: counts.RowCount):
+        text = counts.format_count(count)
+        self.window.forms["main"].nav.set_lenght(tablename, text)
+        table = self.window.forms["main"].table.table
+        if table and table.name == tablename:
+            self.window.statusbar.set_rows_status(count.exact, f"Строк: {text}")
+
+    def _on_database_failed(self, message: str):
+        self.switch_mode("nofile")
+        self.window.show_alert_dialog(
+            "Ошибка",
+            "Не удалось прочитать базу данных"
+        )
 
     def _on_tablename_click(self, index: int):
-        tablename = self.window.forms["main"].nav.radios[index].text()
+        tablename = self.window.forms["main"].nav.tablenames[index]
         return self.switch_table(tablename)
 
     def connect_table(self, database: connector.SQL):
         form = self.window.forms["main"]
-        form.table.connect(database)
+        form.table.connect(database, self.executor)
         tablenames = tuple(table.name for table in database.tables.values())
         form.nav.fill(tablenames)
+        for tablename in tablenames:
+            form.nav.set_lenght(tablename, self.row_counter.text(tablename))
         form.nav.radio_signals.item_state_changed.connect(
             lambda index, state: self._on_tablename_click(index)
         )
@@ -221,6 +609,348 @@ class Application(QtWidgets.QApplication):
     def show_help(self):
         self.window.show_help(self.mode)
 
+    def save_profiles(self):
+        self.application_database.save_profiles(profiler.take_unsaved())
+
+    def show_history(self):
+        """
+        Shows executed queries statistics of the working database
+        (of all databases if none is open) /
+        Показывает статистику выполненных запросов рабочей базы данных
+        (всех баз данных, если ни одна не открыта)
+        """
+        self.save_profiles()
+        path = self.working_database.path if self.mode == "main" else None
+        self.window.show_history_dialog(profiler.statistics(path))
+
+    def _show_rollups(self, source: tuple | None):
+        form = self.window.forms["main"]
+        if source is None or not form.table.table:
+            form.rollups.load([])
+            form.chart.load([])
+            return
+        form.chart.set_table(form.table.table)
+        self.load_rollups()
+        self.load_chart()
+
+    def load_rollups(self):
+        view = self.window.forms["main"].rollups
+        table = self.window.forms["main"].table.table
+        if self.mode != "main" or not table or not view.isVisible():
+            return
+        tablename, granularity = table.name, view.granularity
+        self.executor.submit(
+            lambda reader: reader.rollup(tablename, granularity),
+            view.load,
+            "normal",
+            "rollup")
+
+    def load_chart(self):
+        """
+        Reads the chosen series of the current table in background,
+        events rate from the minute rollups, numeric columns in chunks /
+        Читает выбранный ряд текущей таблицы в фоне, частоту
+        событий из минутных сводок, числовые столбцы частями
+        """
+        view = self.window.forms["main"].chart
+        table = self.window.forms["main"].table.table
+        if self.mode != "main" or not table or not view.isVisible():
+            return
+        tablename, option = table.name, view.option
+        # преобразование в массивы numpy тоже выполняется в фоне
+        if option == "events":
+            self.executor.submit(
+                lambda reader: charts.rate_series(reader.rollup_counts(tablename, "minute")),
+                view.load,
+                "normal",
+                "chart")
+        else:
+            self.executor.submit(
+                lambda reader: charts.numeric_series(option, reader.time_series(tablename, option)),
+                view.load,
+                "normal",
+                "chart")
+
+    def _show_templates(self, source: tuple | None):
+        if source is None:
+            self.window.forms["main"].templates.load([])
+        else:
+            self.load_templates()
+
+    def load_templates(self):
+        view = self.window.forms["main"].templates
+        table = self.window.forms["main"].table.table
+        if self.mode != "main" or not table or not view.isVisible():
+            return
+        tablename = table.name
+        self.executor.submit(
+            lambda reader: reader.top_templates(tablename),
+            view.load,
+            "normal",
+            "templates")
+
+    def _show_exceptions(self, source: tuple | None):
+        if source is None:
+            self.window.forms["main"].exceptions.load([])
+        else:
+            self.load_exceptions()
+
+    def load_exceptions(self):
+        view = self.window.forms["main"].exceptions
+        table = self.window.forms["main"].table.table
+        if self.mode != "main" or not table or not view.isVisible():
+            return
+        tablename = table.name
+        self.executor.submit(
+            lambda reader: reader.top_exceptions(tablename),
+            view.load,
+            "normal",
+            "exceptions")
+
+    def show_occurrences(self, fingerprint: str):
+        view = self.window.forms["main"].exceptions
+        table = self.window.forms["main"].table.table
+        if self.mode != "main" or not table:
+            return
+        tablename = table.name
+        self.executor.submit(
+            lambda reader: reader.exception_occurrences(tablename, fingerprint),
+            view.load_occurrences,
+            "high",
+            "occurrences")
+
+    def search_text(self, text: str):
+        """
+        Shows the rows of the current table from the next row containing
+        the text. The full-text index of the table is built in background
+        on the first search, rows not indexed yet are scanned /
+        Показывает строки текущей таблицы со следующей строки, содержащей
+        текст. Полнотекстовый индекс таблицы строится в фоне при первом
+        поиске, еще не проиндексированные строки просматриваются
+        """
+        table = self.window.forms["main"].table
+        if self.mode != "main" or not table.table:
+            return
+        tablename = table.table.name
+        after = table.get_first_rowid() if table.row_window.rows else None
+        self.executor.submit(
+            lambda reader: (
+                search.find_next(reader, tablename, text, after),
+                reader.search_mark(tablename),
+                reader.max_rowid(tablename)),
+            lambda result: self._on_text_found(tablename, *result),
+            "high",
+            "search")
+
+    def _on_text_found(self, tablename: str, rowid: int | None, mark: int | None, last: int | None):
+        self.search_index.update(tablename, mark, last)
+        table = self.window.forms["main"].table
+        if not table.table or table.table.name != tablename:
+            return
+        if rowid is None:
+            self.window.statusbar.set_rows_status(False, "Не найдено")
+        else:
+            table.seek(rowid)
+
+    def scan_regex(self, pattern: str):
+        """
+        Scans the current table with the regular expression in background,
+        matching rows are shown as they are found. A running scan is cancelled /
+        Просматривает текущую таблицу регулярным выражением в фоне,
+        совпадающие строки показываются по мере нахождения. Идущий просмотр отменяется
+        """
+        table = self.window.forms["main"].table.table
+        if self.mode != "main" or not table:
+            return
+        try:
+            re.compile(pattern)
+        except re.error as error:
+            self.window.show_alert_dialog("Ошибка", f"Неверное регулярное выражение:\n{error}")
+            return
+        self.stop_regex()
+        view = self.window.forms["main"].matches
+        view.clear()
+        view.show()
+        scanner = search.RegexScanner(self.working_database.path, table.name, pattern)
+        scanner.signals.found.connect(lambda columns, rows: self._on_regex_found(scanner, columns, rows))
+        scanner.signals.progress.connect(lambda mark, last: self._on_regex_progress(scanner, mark, last))
+        scanner.signals.finished.connect(lambda tablename: self._on_regex_finished(scanner))
+        scanner.signals.failed.connect(lambda message: self._on_regex_finished(scanner))
+        self.regex_scanner = scanner
+        scanner.start()
+
+    def _on_regex_found(self, scanner: search.RegexScanner, columns: tuple[str], rows: list[tuple]):
+        # сигналы отмененного просмотра, пришедшие позже, не учитываются
+        if scanner is self.regex_scanner:
+            self.window.forms["main"].matches.append(columns, rows)
+
+    def _on_regex_progress(self, scanner: search.RegexScanner, mark: int, last: int):
+        if scanner is self.regex_scanner:
+            found = len(self.window.forms["main"].matches.model.rows)
+            self.window.statusbar.set_rows_status(
+                False, f"Совпадения: {found}, {mark * 100 // last if last else 100}%")
+
+    def _on_regex_finished(self, scanner: search.RegexScanner):
+        if scanner is not self.regex_scanner:
+            return
+        self.regex_scanner = None
+        view = self.window.forms["main"].matches
+        self.window.statusbar.set_rows_status(True, f"Совпадения: {len(view.model.rows)}")
+
+    def stop_regex(self):
+        if self.regex_scanner:
+            self.regex_scanner.stop()
+            self.regex_scanner = None
+
+    def close_matches(self):
+        self.stop_regex()
+        self.window.forms["main"].matches.hide()
+        table = self.window.forms["main"].table.table
+        if self.mode == "main" and table:
+            self._show_row_count(table.name)
+
+    def toggle_stats(self):
+        view = self.window.forms["main"].stats
+        view.setVisible(not view.isVisible())
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        """
+        Shows the column statistics of the current table in the header
+        tooltips and the side panel. Statistics cached in memory or in the
+        application database are shown at once and recomputed in background
+        if the database file changed since they were computed /
+        Показывает статистику столбцов текущей таблицы в подсказках
+        заголовков и боковой панели. Статистика, закэшированная в памяти или
+        в базе данных приложения, показывается сразу и пересчитывается в фоне,
+        если файл базы данных изменился после ее подсчета
+        """
+        form = self.window.forms["main"]
+        table = form.table.table
+        if self.mode != "main" or not table or not (cfg.STATS_ON_OPEN or form.stats.isVisible()):
+            return
+        tablename = table.name
+        # изменение, удаление и добавление строк любым подключением меняют состояние файла
+        state = connector.file_state(self.working_database.path)
+        cached = self.column_stats.get(tablename)
+        if cached is None:
+            stored = self.application_database.load_column_stats(self.working_database.path, tablename)
+            cached = (stored[0], stats.load_stats(stored[1])) if stored else None
+        if cached:
+            self.column_stats[tablename] = cached
+            self._show_stats(tablename, cached[1])
+            if cached[0] == state:
+                return
+        if not self.stats_builder:
+            self.build_stats(tablename)
+
+    def build_stats(self, tablename: str):
+        builder = stats.StatsBuilder(self.working_database.path, tablename)
+        builder.signals.progress.connect(
+            lambda done, total: self.window.statusbar.set_rows_status(
+                False, f"Статистика: {done * 100 // total if total else 100}%"))
+        builder.signals.finished.connect(
+            lambda tablename, state, columns: self._on_stats_built(builder, tablename, state, columns))
+        builder.signals.failed.connect(lambda message: self._on_stats_failed(builder))
+        self.stats_builder = builder
+        builder.start()
+
+    def _on_stats_built(self, builder: stats.StatsBuilder, tablename: str, state: str, columns: list):
+        if builder is not self.stats_builder:
+            return
+        self.stats_builder = None
+        self.application_database.save_column_stats(builder.database_path, tablename, state, stats.dump_stats(columns))
+        self.column_stats[tablename] = (state, columns)
+        table = self.window.forms["main"].table.table
+        if self.mode != "main" or not table:
+            return
+        self._show_row_count(table.name)
+        # таблица, в которую продолжают добавляться строки, не пересчитывается по кругу
+        if table.name == tablename:
+            self._show_stats(tablename, columns)
+        else:
+            self.refresh_stats()
+
+    def _on_stats_failed(self, builder: stats.StatsBuilder):
+        # подсчет повторяется при следующем открытии таблицы
+        if builder is self.stats_builder:
+            self.stats_builder = None
+
+    def _show_stats(self, tablename: str, columns: list[stats.ColumnStats]):
+        form = self.window.forms["main"]
+        if not form.table.table or form.table.table.name != tablename:
+            return
+        form.table.table_model.set_tooltips({column.name: stats.describe(column) for column in columns})
+        if form.stats.isVisible():
+            form.stats.load(columns)
+
+    def jump_to_time(self, text: str):
+        """
+        Shows the rows of the current table from the entered time on.
+        The sparse time index is loaded from the application database
+        and extended to the appended rows in background /
+        Показывает строки текущей таблицы начиная с введенного времени.
+        Разреженный индекс времени загружается из базы данных приложения
+        и дополняется добавленными строками в фоне
+        """
+        table = self.window.forms["main"].table.table
+        if self.mode != "main" or not table:
+            return
+        # индекс и переход ищут строки по rowid
+        if table.without_rowid:
+            self._show_no_time_column()
+            return
+        tablename = table.name
+        index = self.time_indexes.get(tablename)
+        if index is None:
+            stored = self.application_database.load_checkpoints(self.working_database.path, tablename)
+            index = timeindex.TimeIndex(tablename, *(stored or ()))
+        self.executor.submit(
+            lambda reader: timeindex.seek_time(reader, index.copy(), text),
+            lambda result: self._on_time_found(*result),
+            "high",
+            "jump",
+            self._on_jump_failed)
+
+    def _on_time_found(self, index: timeindex.TimeIndex, moment: str | None, rowid: int | None):
+        self.time_indexes[index.tablename] = index
+        added, replaced = index.take_added()
+        if added or replaced:
+            self.application_database.save_checkpoints(
+                self.working_database.path, index.tablename, index.columnname or "", added, replaced)
+        if index.columnname is None:
+            self._show_no_time_column()
+            return
+        if moment is None:
+            self.window.show_alert_dialog("Ошибка", "Время должно быть в виде\nГГГГ-ММ-ДД ЧЧ:ММ")
+            return
+        table = self.window.forms["main"].table
+        if not table.table or table.table.name != index.tablename:
+            return
+        # время позже всех строк - показывается конец таблицы
+        if rowid is None:
+            table.end()
+        else:
+            table.seek(rowid)
+
+    def _show_no_time_column(self):
+        self.window.show_alert_dialog("Ошибка", "В таблице нет столбца времени,\nрастущего вместе со строками")
+
+    def _on_jump_failed(self, message: str):
+        self.window.show_alert_dialog("Ошибка", "Не удалось перейти ко времени")
+
     def _window_triggered(self, trigger: str):
         if trigger == "info":
             self.show_help()
+        elif trigger == "history":
+            self.show_history()
+        elif trigger == "rollups":
+            self.rollup_index.toggle(self.window.forms["main"].rollups)
+        elif trigger == "chart":
+            self.rollup_index.toggle(self.window.forms["main"].chart)
+        elif trigger == "templates":
+            self.template_index.toggle(self.window.forms["main"].templates)
+        elif trigger == "exceptions":
+            self.exception_index.toggle(self.window.forms["main"].exceptions)
+        elif trigger == "stats":
+            self.toggle_stats()
@@ -0,0 +1,108 @@
+import threading
+from typing import Any, Callable
+
+from PyQt6 import QtCore
+from loguru import logger
+
+from .connector import SQL
+
+"""
+Module with the base of the background work over a table
+on its own connection /
+Модуль с основой фоновой работы над таблицей
+на отдельном подключении
+"""
+
+
+# обновление индекса не более чем на step rowid: новая отметка и максимальный rowid таблицы
+updater = Callable[[int], tuple[int, int]]
+
+
+class TaskSignals(QtCore.QObject):
+
+    progress = QtCore.pyqtSignal(object, object)
+    finished = QtCore.pyqtSignal(str)
+    failed = QtCore.pyqtSignal(str)
+
+
+class TableTask():
+
+    """
+    Work over a table in a background thread. The end and the error
+    are reported by the signals, stop interrupts run between its steps /
+    Работа над таблицей в фоновом потоке. Окончание и ошибка
+    сообщаются сигналами, stop прерывает run между его шагами
+    """
+
+    # название работы в журнале
+    label: str = "task"
+    signals_type: type[QtCore.QObject] = TaskSignals
+    database_path: str
+    tablename: str
+    signals: TaskSignals
+
+    def __init__(self, database_path: str, tablename: str):
+        self.database_path = database_path
+        self.tablename = tablename
+        self.signals = self.signals_type()
+        self._stopped = threading.Event()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._run_reporting, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run_reporting(self):
+        try:
+            result = self.run()
+        except Exception as error:
+            logger.error(f"{self.label} of {self.tablename} failed: {error}")
+            self.signals.failed.emit(str(error))
+        else:
+            self.report(result)
+
+    def report(self, result: Any):
+        self.signals.finished.emit(self.tablename)
+
+    def run(self) -> Any:
+        raise NotImplementedError
+
+
+class StepBuilder(TableTask):
+
+    """
+    Brings an index of an existing table up to date in background,
+    step rowids per transaction, continuing from the stored mark /
+    Доводит индекс существующей таблицы до актуального в фоне,
+    по step rowid за транзакцию, продолжая с сохраненной отметки
+    """
+
+    step: int
+
+    def __init__(self, database_path: str, tablename: str, step: int = None):
+        TableTask.__init__(self, database_path, tablename)
+        if step is not None:
+            self.step = step
+
+    def open(self, database: SQL) -> updater | None:
+        """
+        Prepares the index on the connection of the builder and returns
+        its update, None if the table has nothing to index /
+        Подготавливает индекс на подключении построителя и возвращает
+        его обновление, None, если в таблице нечего индексировать
+        """
+        raise NotImplementedError
+
+    def run(self):
+        database = SQL(self.database_path, parse=False)
+        try:
+            update = self.open(database)
+            mark, last = -1, 0
+            while update and mark < last and not self._stopped.is_set():
+                mark, last = update(self.step)
+                self.signals.progress.emit(mark, last)
+        finally:
+            database.close()
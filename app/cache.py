@@ -0,0 +1,284 @@
+import sys
+import threading
+from typing import Any, Literal
+from collections import OrderedDict
+
+from . import config as cfg
+from .connector import SQL
+from .executor import QueryExecutor
+
+"""
+Module with the row pages cache /
+Модуль с кэшем страниц строк
+"""
+
+
+scroll_direction = Literal["up", "down"]
+
+block_key = tuple[str, int]
+
+
+def rows_size(rows: tuple[tuple[Any]]) -> int:
+    """
+    Approximate memory size of rows in bytes /
+    Приблизительный размер строк в памяти в байтах
+    """
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        size += sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class PageCache():
+
+    """
+    LRU cache of fixed-size row blocks placed between Table and SQL.
+    Block number N of a table holds rows with rowids in
+    [N * block_size, (N + 1) * block_size) range.
+    Can be used as RowWindow source. Following blocks
+    are read ahead in the scrolling direction by the executor /
+    LRU-кэш блоков строк фиксированного размера между Table и SQL.
+    Блок номер N таблицы хранит строки с rowid из диапазона
+    [N * block_size, (N + 1) * block_size).
+    Может быть использован как источник RowWindow. Следующие блоки
+    заранее читаются в направлении прокрутки исполнителем запросов
+    """
+
+    database: SQL
+    executor: QueryExecutor | None
+    block_size: int
+    budget: int
+    used: int
+    blocks: OrderedDict[block_key, tuple[tuple[Any]]]
+
+    def __init__(
+            self,
+            database: SQL,
+            executor: QueryExecutor = None,
+            block_size: int = cfg.PAGE_CACHE_BLOCK_SIZE,
+            budget: int = cfg.PAGE_CACHE_BUDGET):
+
+        self.database = database
+        self.executor = executor
+        self.block_size = block_size
+        self.budget = budget
+        self.used = 0
+        self.blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bind(self, database: SQL) -> "BoundPageCache":
+        """
+        Returns view of the cache reading misses through database
+        (e.g. through the Reader of an executor worker) /
+        Возвращает представление кэша, читающее промахи через database
+        (например, через Reader рабочего потока исполнителя)
+        """
+        return BoundPageCache(self, database)
+
+    def _cacheable(self, tablename: str) -> bool:
+        # блоки строятся по rowid, у таблиц WITHOUT ROWID его нет
+        return not self.database.tables[tablename].without_rowid
+
+    def first_rows(
+            self,
+            tablename: str,
+            count: int,
+            database: SQL = None) -> tuple[tuple[Any]]:
+
+        database = database or self.database
+        if not self._cacheable(tablename):
+            return database.first_rows(tablename, count)
+        edge = database.first_rows(tablename, 1)
+        if not edge:
+            return ()
+        return self.rows_after(tablename, edge[0][0], count, True, database)
+
+    def last_rows(
+            self,
+            tablename: str,
+            count: int,
+            database: SQL = None) -> tuple[tuple[Any]]:
+
+        database = database or self.database
+        if not self._cacheable(tablename):
+            return database.last_rows(tablename, count)
+        edge = database.last_rows(tablename, 1)
+        if not edge:
+            return ()
+        return self.rows_before(tablename, edge[0][0], count, True, database)
+
+    def rows_after(
+            self,
+            tablename: str,
+            key: int,
+            count: int,
+            inclusive: bool = False,
+            database: SQL = None) -> tuple[tuple[Any]]:
+
+        database = database or self.database
+        if not self._cacheable(tablename):
+            return database.rows_after(tablename, key, count, inclusive)
+
+        start = key if inclusive else key + 1
+        index = start // self.block_size
+        result = []
+        while len(result) < count:
+            block = self.block(tablename, index, database)
+            result.extend(row for row in block if row[0] >= start)
+            if block:
+                self.read_ahead(tablename, index, "down")
+                index += 1
+                continue
+            # пустой блок - разрыв в rowid, следующий блок ищется одним запросом
+            following = database.rows_after(
+                tablename, (index + 1) * self.block_size - 1, 1)
+            if not following:
+                break
+            index = following[0][0] // self.block_size
+
+        return tuple(result[:count])
+
+    def rows_before(
+            self,
+            tablename: str,
+            key: int,
+            count: int,
+            inclusive: bool = False,
+            database: SQL = None) -> tuple[tuple[Any]]:
+
+        database = database or self.database
+        if not self._cacheable(tablename):
+            return database.rows_before(tablename, key, count, inclusive)
+
+        end = key if inclusive else key - 1
+        index = end // self.block_size
+        result = []
+        while len(result) < count:
+            block = self.block(tablename, index, database)
+            result[:0] = (row for row in block if row[0] <= end)
+            if block:
+                self.read_ahead(tablename, index, "up")
+                index -= 1
+                continue
+            previous = database.rows_before(
+                tablename, index * self.block_size, 1)
+            if not previous:
+                break
+            index = previous[0][0] // self.block_size
+
+        return tuple(result[-count:]) if count else ()
+
+    def block(
+            self,
+            tablename: str,
+            index: int,
+            database: SQL = None) -> tuple[tuple[Any]]:
+
+        """
+        Returns block of rows, reading it from database on miss /
+        Возвращает блок строк, читая его из базы данных при промахе
+        """
+        key = (tablename, index)
+        with self._lock:
+            if key in self.blocks:
+                self.blocks.move_to_end(key)
+                return self.blocks[key]
+        rows = self._read_block(database or self.database, tablename, index)
+        self._store(key, rows)
+        return rows
+
+    def _read_block(
+            self,
+            database: SQL,
+            tablename: str,
+            index: int) -> tuple[tuple[Any]]:
+
+        low = index * self.block_size
+        return database.rows_between(tablename, low, low + self.block_size)
+
+    def _store(self, key: block_key, rows: tuple[tuple[Any]]):
+        with self._lock:
+            if key in self.blocks:
+                return
+            self.blocks[key] = rows
+            self.used += rows_size(rows)
+            # вытеснение давно не использованных блоков
+            while self.used > self.budget and len(self.blocks) > 1:
+                _, evicted = self.blocks.popitem(last=False)
+                self.used -= rows_size(evicted)
+
+    def invalidate(self, tablename: str = None, rowid: int = None):
+        """
+        Drops cached blocks of the table (or of all tables).
+        If rowid is given, only blocks from the one holding it on /
+        Удаляет закэшированные блоки таблицы (или всех таблиц).
+        Если задан rowid, только блоки, начиная с содержащего его
+        """
+        first = -1 if rowid is None else rowid // self.block_size
+        with self._lock:
+            for key in tuple(self.blocks.keys()):
+                if (tablename is None or key[0] == tablename) and key[1] >= first:
+                    self.used -= rows_size(self.blocks.pop(key))
+
+    def read_ahead(self, tablename: str, index: int, direction: scroll_direction):
+        """
+        Schedules background reading of the blocks following
+        the index block in the scrolling direction /
+        Планирует фоновое чтение блоков, следующих
+        за блоком index в направлении прокрутки
+        """
+        if not self.executor:
+            return
+        step = 1 if direction == "down" else -1
+        for i in range(1, cfg.PAGE_CACHE_READ_AHEAD + 1):
+            neighbour = index + step * i
+            with self._lock:
+                if (tablename, neighbour) in self.blocks:
+                    continue
+            self.executor.submit(
+                lambda reader, n=neighbour: self.block(tablename, n, reader),
+                priority="low",
+                tag=f"read-ahead-{id(self)}-{tablename}-{neighbour}")
+
+    def close(self):
+        self.invalidate()
+
+
+class BoundPageCache():
+
+    """
+    PageCache view reading misses through the given connection /
+    Представление PageCache, читающее промахи через заданное подключение
+    """
+
+    cache: PageCache
+    database: SQL
+
+    def __init__(self, cache: PageCache, database: SQL):
+        self.cache = cache
+        self.database = database
+
+    def first_rows(self, tablename: str, count: int) -> tuple[tuple[Any]]:
+        return self.cache.first_rows(tablename, count, self.database)
+
+    def last_rows(self, tablename: str, count: int) -> tuple[tuple[Any]]:
+        return self.cache.last_rows(tablename, count, self.database)
+
+    def rows_after(
+            self,
+            tablename: str,
+            key: int,
+            count: int,
+            inclusive: bool = False) -> tuple[tuple[Any]]:
+
+        return self.cache.rows_after(tablename, key, count, inclusive, self.database)
+
+    def rows_before(
+            self,
+            tablename: str,
+            key: int,
+            count: int,
+            inclusive: bool = False) -> tuple[tuple[Any]]:
+
+        return self.cache.rows_before(tablename, key, count, inclusive, self.database)
@@ -0,0 +1,440 @@
+from math import floor, log10
+from datetime import datetime, timezone
+from dataclasses import dataclass
+from typing import Iterable, Literal
+
+import numpy as np
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+from . import shorts
+from . import widgets
+from . import dynamic
+from . import config as cfg
+from .config import GAP
+from .connector import Table, rollup_columns
+from .dynamic import global_widget_manager as gwm
+
+"""
+Module with the time series chart of log rates and numeric fields /
+Модуль с графиком временных рядов частоты логов и числовых полей
+"""
+
+
+# шаги делений оси времени в секундах
+time_steps = (
+    1, 2, 5, 10, 15, 30,
+    60, 120, 300, 600, 900, 1800,
+    3600, 7200, 10800, 21600, 43200,
+    86400, 172800, 604800, 2592000, 31536000
+)
+
+# уровни, частота которых рисуется отдельно от общей
+level_colors: dict[str, dynamic.color_name] = {
+    "ERROR": "red",
+    "CRITICAL": "red",
+    "WARNING": "yellow"
+}
+
+series_kind = Literal["events", "values"]
+
+
+@dataclass
+class ChartSeries():
+
+    name: str
+    # unix время по возрастанию и значения, float64
+    x: np.ndarray
+    y: np.ndarray
+    color: dynamic.color_name = "blue"
+
+
+def minmax_downsample(
+        x: np.ndarray,
+        y: np.ndarray,
+        start: float,
+        end: float,
+        width: int) -> tuple[np.ndarray, np.ndarray]:
+
+    """
+    Points of the series between start and end reduced to
+    min and max of each of width columns, so the line drawn
+    looks the same as the full one. Series with few points
+    are returned as is. x must be sorted /
+    Точки ряда между start и end, сокращенные до минимума
+    и максимума в каждом из width столбцов, поэтому нарисованная
+    линия выглядит так же, как полная. Ряды с небольшим числом
+    точек возвращаются как есть. x должен быть отсортирован
+    """
+    # по одной точке за краями, чтобы линия доходила до границ
+    first = max(int(np.searchsorted(x, start, "left")) - 1, 0)
+    last = min(int(np.searchsorted(x, end, "right")) + 1, len(x))
+    x, y = x[first:last], y[first:last]
+    if len(x) <= width * 4:
+        return x, y
+    edges = np.linspace(x[0], x[-1], width + 1)[:-1]
+    # пустые столбцы дают повторяющиеся начала, reduceat требует возрастающих
+    starts = np.unique(np.searchsorted(x, edges, "left"))
+    minimums = np.minimum.reduceat(y, starts)
+    maximums = np.maximum.reduceat(y, starts)
+    xs = np.repeat(x[starts], 2)
+    ys = np.column_stack((minimums, maximums)).ravel()
+    return xs, ys
+
+
+def parse_buckets(buckets: list[str]) -> np.ndarray:
+    """
+    Unix times of "YYYY-MM-DD HH:MM" rollup buckets, NaN for unparsable /
+    Unix время интервалов сводки "YYYY-MM-DD HH:MM", NaN для неразборчивых
+    """
+    try:
+        minutes = np.array(buckets, dtype="datetime64[m]")
+    except ValueError:
+        # в таблице встречается время не в формате ISO, такие интервалы пропускаются
+        minutes = np.array([parse_bucket(bucket) for bucket in buckets], dtype="datetime64[m]")
+    seconds = minutes.astype("datetime64[s]").astype(np.float64)
+    seconds[np.isnat(minutes)] = np.nan
+    return seconds
+
+
+def parse_bucket(bucket: str) -> np.datetime64:
+    try:
+        return np.datetime64(bucket, "m")
+    except ValueError:
+        return np.datetime64("NaT", "m")
+
+
+def rate_series(rows: list[tuple[str, str, int]]) -> list[ChartSeries]:
+    """
+    Events per minute from minute rollups (bucket, level, count):
+    the total and the levels of level_colors, minutes without
+    events are zeros /
+    События в минуту из минутных сводок (интервал, уровень, количество):
+    общее количество и уровни из level_colors, минуты без событий - нули
+    """
+    if not rows:
+        return []
+    buckets, levels, counts = zip(*rows)
+    times = parse_buckets(buckets)
+    counts = np.array(counts, dtype=np.float64)
+    levels = np.array(levels, dtype=object)
+    valid = np.isfinite(times)
+    times, counts, levels = times[valid], counts[valid], levels[valid]
+    if not len(times):
+        return []
+
+    origin = times.min()
+    indexes = ((times - origin) // 60).astype(np.int64)
+    x = origin + np.arange(indexes.max() + 1, dtype=np.float64) * 60
+
+    def accumulate(mask: np.ndarray) -> np.ndarray:
+        y = np.zeros(len(x))
+        np.add.at(y, indexes[mask], counts[mask])
+        return y
+
+    result = [ChartSeries("Всего", x, accumulate(np.ones(len(times), dtype=bool)), "fore")]
+    for color in dict.fromkeys(level_colors.values()):
+        names = [level for level, color_ in level_colors.items() if color_ == color]
+        mask = np.isin(levels, names)
+        if mask.any():
+            result.append(ChartSeries(" / ".join(names), x, accumulate(mask), color))
+    return result
+
+
+def numeric_series(name: str, chunks: Iterable[list[tuple[float, float]]]) -> list[ChartSeries]:
+    """
+    Series of (unix time, value) rows read in chunks, rows with
+    unparsable time are dropped, sorted by time if needed /
+    Ряд из строк (unix время, значение), прочитанных частями, строки
+    с неразборчивым временем отбрасываются, при необходимости сортируется по времени
+    """
+    # None (время, не разобранное julianday) превращается в NaN
+    arrays = [np.array(chunk, dtype=np.float64) for chunk in chunks]
+    if not arrays:
+        return []
+    points = np.concatenate(arrays)
+    points = points[np.isfinite(points).all(axis=1)]
+    if not len(points):
+        return []
+    x, y = points[:, 0], points[:, 1]
+    if np.any(np.diff(x) < 0):
+        order = np.argsort(x, kind="stable")
+        x, y = x[order], y[order]
+    return [ChartSeries(name, np.ascontiguousarray(x), np.ascontiguousarray(y), "blue")]
+
+
+def numeric_columns(table: Table) -> tuple[str]:
+    """
+    Columns of the table that can be plotted over time,
+    none if the table has no time column /
+    Столбцы таблицы, которые можно нарисовать во времени,
+    никаких, если в таблице нет столбца времени
+    """
+    if not any(column.name == rollup_columns[0] for column in table.columns):
+        return ()
+    return tuple(
+        column.name for column in table.columns
+        if column.type_ in (int, float) and not column.is_pk
+    )
+
+
+def nice_step(span: float, count: int) -> float:
+    """
+    Step of 1, 2 or 5 times a power of ten giving about count divisions /
+    Шаг вида 1, 2 или 5, умноженных на степень десяти, дающий около count делений
+    """
+    raw = span / max(count, 1)
+    power = 10 ** floor(log10(raw))
+    for multiplier in (1, 2, 5):
+        if power * multiplier >= raw:
+            return power * multiplier
+    return power * 10
+
+
+def time_step(span: float, count: int) -> float:
+    raw = span / max(count, 1)
+    for step in time_steps:
+        if step >= raw:
+            return step
+    return nice_step(span, count)
+
+
+def time_label(seconds: float, step: float) -> str:
+    moment = datetime.fromtimestamp(seconds, timezone.utc)
+    if step >= 86400:
+        return moment.strftime("%d.%m.%Y")
+    if step >= 60:
+        return moment.strftime("%d.%m %H:%M")
+    return moment.strftime("%H:%M:%S")
+
+
+def value_label(value: float) -> str:
+    # -0.0 превращается в 0.0
+    value = value or 0.0
+    if abs(value) >= 1_000_000:
+        return f"{value / 1_000_000:g}M"
+    if abs(value) >= 1_000:
+        return f"{value / 1_000:g}K"
+    return f"{value:g}"
+
+
+class Chart(dynamic.DynamicFrame):
+
+    """
+    Line chart of time series downsampled to its width on every
+    paint. Wheel zooms around the cursor, dragging pans, double
+    click shows everything. Colors are taken from the current theme /
+    Линейный график временных рядов, прореживаемых до его ширины
+    при каждой отрисовке. Колесо масштабирует вокруг курсора,
+    перетаскивание сдвигает, двойной щелчок показывает все.
+    Цвета берутся из текущей темы
+    """
+
+    series: list[ChartSeries]
+    kind: series_kind = "events"
+    # полный и видимый диапазоны времени
+    bounds: tuple[float, float] = (0.0, 1.0)
+    start: float = 0.0
+    end: float = 1.0
+    _drag: tuple[float, float, float] | None = None
+
+    def __init__(self):
+        dynamic.DynamicFrame.__init__(self)
+        self.series = []
+        self.setMouseTracking(False)
+        self.setSizePolicy(QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Expanding)
+
+    def load(self, series: list[ChartSeries], kind: series_kind = "events"):
+        """
+        Replaces the series. The visible range is kept if it is
+        inside the new data (e.g. rows were appended) /
+        Заменяет ряды. Видимый диапазон сохраняется, если он
+        внутри новых данных (например, добавились строки)
+        """
+        keep = self.series and kind == self.kind and self.end < self.bounds[1]
+        self.series = series
+        self.kind = kind
+        if series:
+            self.bounds = (
+                min(float(item.x[0]) for item in series),
+                max(float(item.x[-1]) for item in series))
+            if self.bounds[0] == self.bounds[1]:
+                self.bounds = (self.bounds[0] - 30, self.bounds[1] + 30)
+        if not keep:
+            self.start, self.end = self.bounds
+        self.update()
+
+    def plot_rect(self) -> QtCore.QRectF:
+        metrics = self.fontMetrics()
+        left = metrics.horizontalAdvance("0000.0K") + GAP
+        bottom = metrics.height() + GAP
+        return QtCore.QRectF(
+            left, GAP, max(self.width() - left - GAP, 1), max(self.height() - bottom - GAP, 1))
+
+    def visible_points(self, width: int) -> list[tuple[ChartSeries, np.ndarray, np.ndarray]]:
+        return [
+            (item, *minmax_downsample(item.x, item.y, self.start, self.end, width))
+            for item in self.series
+        ]
+
+    def paintEvent(self, event: QtGui.QPaintEvent):
+        dynamic.DynamicFrame.paintEvent(self, event)
+        if not self.series:
+            return
+        rect = self.plot_rect()
+        points = self.visible_points(int(rect.width()))
+        low, high = self._value_range(points)
+
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        self._draw_axes(painter, rect, low, high)
+        painter.setClipRect(rect)
+        scale_x = rect.width() / (self.end - self.start)
+        scale_y = rect.height() / (high - low)
+        for item, xs, ys in points:
+            px = rect.left() + (xs - self.start) * scale_x
+            py = rect.bottom() - (ys - low) * scale_y
+            polygon = QtGui.QPolygonF([QtCore.QPointF(x, y) for x, y in zip(px.tolist(), py.tolist())])
+            # толстое перо рисуется в разы медленнее на ломаных с тысячами изломов
+            painter.setPen(QtGui.QPen(gwm.theme[item.color], 1))
+            painter.drawPolyline(polygon)
+        painter.setClipping(False)
+        self._draw_legend(painter, rect)
+        painter.end()
+
+    def _value_range(self, points: list[tuple[ChartSeries, np.ndarray, np.ndarray]]) -> tuple[float, float]:
+        values = [ys for item, xs, ys in points if len(ys)]
+        if not values:
+            return 0.0, 1.0
+        low = min(float(ys.min()) for ys in values)
+        high = max(float(ys.max()) for ys in values)
+        # количества событий отсчитываются от нуля
+        if self.kind == "events":
+            low = min(low, 0.0)
+        if high <= low:
+            high = low + 1
+        margin = (high - low) * 0.05
+        return low if self.kind == "events" else low - margin, high + margin
+
+    def _draw_axes(self, painter: QtGui.QPainter, rect: QtCore.QRectF, low: float, high: float):
+        metrics = self.fontMetrics()
+        grid = QtGui.QColor(gwm.theme["dim"])
+        grid.setAlpha(80)
+        text = gwm.theme["fore"]
+
+        step = nice_step(high - low, max(int(rect.height()) // (metrics.height() * 3), 1))
+        value = np.ceil(low / step) * step
+        while value <= high:
+            y = rect.bottom() - (value - low) * rect.height() / (high - low)
+            painter.setPen(grid)
+            painter.drawLine(QtCore.QPointF(rect.left(), y), QtCore.QPointF(rect.right(), y))
+            painter.setPen(text)
+            label = value_label(value)
+            painter.drawText(
+                QtCore.QPointF(rect.left() - GAP - metrics.horizontalAdvance(label), y + metrics.ascent() / 2),
+                label)
+            value += step
+
+        span = self.end - self.start
+        label_width = metrics.horizontalAdvance("00.00 00:00") + GAP*4
+        step = time_step(span, max(int(rect.width()) // label_width, 1))
+        moment = np.ceil(self.start / step) * step
+        while moment <= self.end:
+            x = rect.left() + (moment - self.start) * rect.width() / span
+            painter.setPen(grid)
+            painter.drawLine(QtCore.QPointF(x, rect.top()), QtCore.QPointF(x, rect.bottom()))
+            painter.setPen(text)
+            label = time_label(moment, step)
+            painter.drawText(
+                QtCore.QPointF(x - metrics.horizontalAdvance(label) / 2, rect.bottom() + metrics.height()),
+                label)
+            moment += step
+
+    def _draw_legend(self, painter: QtGui.QPainter, rect: QtCore.QRectF):
+        metrics = self.fontMetrics()
+        x = rect.right()
+        for item in reversed(self.series):
+            x -= metrics.horizontalAdvance(item.name) + GAP*2
+            painter.setPen(gwm.theme[item.color])
+            painter.drawText(QtCore.QPointF(x, rect.top() + metrics.ascent()), item.name)
+
+    def _time_at(self, x: float) -> float:
+        rect = self.plot_rect()
+        return self.start + (x - rect.left()) * (self.end - self.start) / rect.width()
+
+    def _show(self, start: float, end: float):
+        # видимый диапазон не выходит за данные и не сужается меньше секунды
+        span = min(max(end - start, 1.0), self.bounds[1] - self.bounds[0])
+        start = min(max(start, self.bounds[0]), self.bounds[1] - span)
+        self.start, self.end = start, start + span
+        self.update()
+
+    def wheelEvent(self, event: QtGui.QWheelEvent):
+        if not self.series:
+            return
+        center = self._time_at(event.position().x())
+        factor = cfg.CHART_ZOOM_STEP if event.angleDelta().y() < 0 else 1 / cfg.CHART_ZOOM_STEP
+        self._show(center - (center - self.start) * factor, center + (self.end - center) * factor)
+
+    def mousePressEvent(self, event: QtGui.QMouseEvent):
+        if event.button() == QtCore.Qt.MouseButton.LeftButton:
+            self._drag = (event.position().x(), self.start, self.end)
+
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent):
+        if not self._drag:
+            return
+        x, start, end = self._drag
+        shift = (x - event.position().x()) * (end - start) / self.plot_rect().width()
+        self._show(start + shift, end + shift)
+
+    def mouseReleaseEvent(self, event: QtGui.QMouseEvent):
+        self._drag = None
+
+    def mouseDoubleClickEvent(self, event: QtGui.QMouseEvent):
+        self._show(*self.bounds)
+
+
+class ChartView(dynamic.DynamicFrame):
+
+    """
+    Chart of the events rate or of a numeric column of the table,
+    chosen by the buttons above /
+    График частоты событий или числового столбца таблицы,
+    выбираемого кнопками сверху
+    """
+
+    bar: widgets.OptionBar
+    chart: Chart
+    tablename: str | None = None
+
+    def __init__(self):
+        dynamic.DynamicFrame.__init__(self)
+        self.setFixedHeight(cfg.CHART_VIEW_HEIGHT)
+        self.bar = widgets.OptionBar({"events": "События"})
+        self.chart = Chart()
+        gwm.add_widget(self.chart)
+        # перерисовка при смене темы происходит вместе с обновлением стиля
+        gwm.set_style(self.chart, "always", "border: none;")
+
+        layout = shorts.VLayout(self)
+        layout.setSpacing(GAP)
+        layout.addWidget(self.bar)
+        layout.addWidget(self.chart)
+
+    @property
+    def option(self) -> str:
+        return self.bar.option
+
+    def set_table(self, table: Table):
+        """
+        Offers the events rate and numeric columns of the table /
+        Предлагает частоту событий и числовые столбцы таблицы
+        """
+        if table.name == self.tablename:
+            return
+        self.tablename = table.name
+        options = {"events": "События"}
+        options.update({name: name for name in numeric_columns(table)})
+        self.bar.fill(options, self.bar.option, ("events", ))
+
+    def load(self, series: list[ChartSeries]):
+        self.chart.load(series, "events" if self.option == "events" else "values")
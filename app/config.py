@@ -15,6 +15,96 @@ VOCABULARY_PATH = ".\\programdata\\vocabulary.json"
 
 DATABASE_FINDER_PATH = f"C:\\users\\{os.getlogin()}\\Desktop"
 DATABASE_FINDER_FILTER = "Sqlite3 database (*.db *.sqlite3)"
+LOG_FINDER_FILTER = "Log file (*.log *.txt *.gz *.xz *.zip)"
+
+PAGE_CACHE_BLOCK_SIZE = 256
+PAGE_CACHE_BUDGET = 32 * 1024 * 1024
+PAGE_CACHE_READ_AHEAD = 2
+EXECUTOR_WORKERS = 2
+STATEMENT_CACHE_SIZE = 256
+SQL_NORMALIZER_CACHE_SIZE = 1024
+# скомпилированные шаблоны функции REGEXP
+REGEXP_CACHE_SIZE = 256
+WRITE_CHUNK_SIZE = 10_000
+WRITE_COMMIT_INTERVAL = 500_000
+# сколько секунд писатель ждет, пока другой писатель зафиксирует транзакцию
+WRITE_BUSY_TIMEOUT = 30.0
+
+LOG_ROTATION = "10 MB"
+SQL_TRACE_MODE = "sampled"
+SQL_TRACE_SAMPLE = 100
+SQL_SLOW_QUERY_MS = 50
+PROFILER_BUFFER_SIZE = 5_000
+PROFILER_HISTORY_LIMIT = 50_000
+PROFILER_SAVE_INTERVAL = 30_000
+
+INGEST_READ_SIZE = 1024 * 1024
+INGEST_BATCH_SIZE = 50_000
+FOLLOW_PATTERN = "*.log"
+FOLLOW_INTERVAL = 0.25
+FOLLOW_SETTLE_TIME = 0.3
+BULK_CHUNK_SIZE = 32 * 1024 * 1024
+# None - по числу ядер процессора
+BULK_PROCESSES = None
+SCAN_RANGE_SIZE = 200_000
+# None - по числу ядер процессора
+SCAN_PROCESSES = None
+
+# статистика столбцов считается при открытии таблицы
+STATS_ON_OPEN = True
+STATS_HLL_PRECISION = 12
+# частые значения, хранимые для каждого диапазона rowid
+STATS_TOP_CANDIDATES = 50
+STATS_TOP_SIZE = 10
+STATS_TOOLTIP_TOP = 5
+STATS_HISTOGRAM_BINS = 16
+STATS_VALUE_LENGTH = 120
+STATS_VIEW_WIDTH = 560
+
+RECEIVER_HOST = "127.0.0.1"
+# порты по умолчанию logging.handlers.SocketHandler и DatagramHandler
+RECEIVER_TCP_PORT = 9020
+RECEIVER_UDP_PORT = 9021
+RECEIVER_TABLE = "received"
+RECEIVER_BATCH_SIZE = 5_000
+RECEIVER_BATCH_INTERVAL = 0.2
+RECEIVER_QUEUE_SIZE = 100_000
+RECEIVER_STATS_INTERVAL = 1.0
+
+ROLLUP_STEP = 500_000
+ROLLUP_VIEW_LIMIT = 500
+ROLLUP_VIEW_HEIGHT = 240
+
+FETCH_CHUNK_SIZE = 100_000
+CHART_VIEW_HEIGHT = 260
+CHART_ZOOM_STEP = 1.25
+# строк между контрольными точками индекса времени
+TIME_INDEX_STEP = 10_000
+# пробных строк при поиске столбца времени
+TIME_COLUMN_SAMPLES = 16
+
+TEMPLATE_DEPTH = 2
+TEMPLATE_SIMILARITY = 0.5
+TEMPLATE_MAX_CHILDREN = 100
+TEMPLATE_CACHE_SIZE = 100_000
+TEMPLATE_STEP = 200_000
+TEMPLATE_VIEW_LIMIT = 200
+TEMPLATE_VIEW_HEIGHT = 240
+# шаблоны сообщений выделяются при загрузке и приеме логов (кроме импорта папок)
+TEMPLATES_ON_INGEST = True
+
+EXCEPTION_STEP = 200_000
+EXCEPTION_VIEW_LIMIT = 1_000
+EXCEPTION_VIEW_HEIGHT = 240
+# отпечатки трассировок вычисляются при загрузке и приеме логов (кроме импорта папок)
+EXCEPTIONS_ON_INGEST = True
+
+SEARCH_STEP = 500_000
+SEARCH_BAR_WIDTH = 360
+# rowid в одном запросе просмотра регулярным выражением
+REGEXP_STEP = 50_000
+REGEXP_MATCH_LIMIT = 10_000
+MATCH_VIEW_HEIGHT = 200
 
 GAP = 8
 BORDER_RADUIS = 12
@@ -1,13 +1,22 @@
 import os
+import re
+import json
+from time import time, perf_counter
+from pathlib import Path
 from hashlib import sha256
-from typing import Any, Literal
-from sqlite3 import Connection, Cursor
-from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Literal
+from sqlite3 import Connection, Cursor, DatabaseError
+from dataclasses import dataclass, asdict, astuple
 
 from loguru import logger
 
 from . import config as cfg
 from .actions import User
+from .tracing import tracer
+from .profiler import profiler, QueryProfile
 
 """
 Module working with external data sources /
@@ -41,30 +50,329 @@ class Table():
 
     name: str
     lenght: int
+    lenght_exact: bool = False
     columns: tuple[Column]
+    key: tuple[str]
+    without_rowid: bool
+
+    def __init__(
+            self,
+            name: str,
+            lenght: int,
+            columns: tuple[Column],
+            key: tuple[str] = ("rowid", ),
+            without_rowid: bool = False):
 
-    def __init__(self, name: str, lenght: int, columns: tuple[Column]):
         self.name = name
         self.lenght = lenght
         self.columns = columns
+        self.key = key
+        self.without_rowid = without_rowid
 
     def column(self, columnname: str) -> Column:
         for col in self.columns:
             if col.name == columnname:
                 return col
 
+    def dump(self) -> dict[str, Any]:
+        """
+        Converts table structure to json-compatible dictionary /
+        Преобразует структуру таблицы в json-совместимый словарь
+        """
+        columns = []
+        for column in self.columns:
+            data = asdict(column)
+            data["type_"] = column.type_.__name__
+            columns.append(data)
+        return {
+            "name": self.name,
+            "columns": columns,
+            "key": self.key,
+            "without_rowid": self.without_rowid
+        }
 
-operand = Literal[">", "<", ">=", "<=", "=", "like", "is null", "is not null"]
+    @classmethod
+    def load(cls, data: dict[str, Any]) -> "Table":
+        columns = []
+        for column in data["columns"]:
+            column = dict(column)
+            column["type_"] = python_types[column["type_"]]
+            columns.append(Column(**column))
+        return cls(
+            data["name"],
+            0,
+            tuple(columns),
+            tuple(data["key"]),
+            data["without_rowid"])
 
 
-class Where():
+@dataclass
+class Schema():
 
     """
-    Where clause object for simple queries/
-    объект конструкции Where для простых запросов
+    Database schema with its version (PRAGMA schema_version) /
+    Схема базы данных с ее версией (PRAGMA schema_version)
+    """
+
+    path: str
+    version: int
+    tables: dict[str, Table]
+
+    def dump(self) -> str:
+        return json.dumps(tuple(table.dump() for table in self.tables.values()))
+
+    @classmethod
+    def load(cls, path: str, version: int, text: str) -> "Schema":
+        tables = (Table.load(data) for data in json.loads(text))
+        return cls(path, version, {table.name: table for table in tables})
+
+
+@dataclass
+class FileState():
+
+    """
+    Read position of a followed log file. Identity ("device:inode")
+    survives renaming of the file by rotation /
+    Позиция чтения отслеживаемого файла логов. Идентификатор
+    ("устройство:inode") сохраняется при переименовании файла ротацией
+    """
+
+    identity: str
+    path: str
+    offset: int
+
+
+python_types: dict[str, type] = {
+    "int": int,
+    "float": float,
+    "str": str,
+    "bytes": bytes
+}
+
+
+def column_type(sql_type: str) -> type:
+    """
+    Python type of the column by sqlite type affinity rules /
+    Тип python для столбца по правилам приведения типов sqlite
+    """
+    sql_type = sql_type.upper()
+    if "INT" in sql_type:
+        return int
+    if any(name in sql_type for name in ("CHAR", "CLOB", "TEXT", "DATE", "TIME")):
+        return str
+    if not sql_type or "BLOB" in sql_type:
+        return bytes
+    return float
+
+
+def column_default(default: str | None, type_: type) -> Any:
+    """
+    Converts column default value from PRAGMA table_info /
+    Преобразует значение столбца по умолчанию из PRAGMA table_info
+    """
+    if default is None:
+        return None
+    if default[:1] in ("'", '"') and default[-1:] == default[:1]:
+        return default[1:-1].replace(default[0] * 2, default[0])
+    try:
+        return type_(default)
+    except (TypeError, ValueError):
+        # выражения (например, CURRENT_TIMESTAMP) остаются текстом
+        return default
+
+
+def quote(identifier: str) -> str:
+    """
+    Quotes sql identifier (table or column name) /
+    Экранирует sql-идентификатор (имя таблицы или столбца)
+    """
+    return '"%s"' % identifier.replace('"', '""')
+
+
+statement_kind = Literal["read", "write", "ddl", "other"]
+
+statement_kinds: dict[str, statement_kind] = {
+    "select": "read",
+    "values": "read",
+    "explain": "read",
+    "insert": "write",
+    "replace": "write",
+    "update": "write",
+    "delete": "write",
+    "create": "ddl",
+    "drop": "ddl",
+    "alter": "ddl",
+    "reindex": "ddl"
+}
+
+rollup_granularity = Literal["minute", "hour", "day"]
+
+# длина префикса времени "YYYY-MM-DD HH:MM" для каждого интервала сводки
+rollup_lengths: dict[rollup_granularity, int] = {
+    "minute": 16,
+    "hour": 13,
+    "day": 10
+}
+
+# столбцы таблиц логов, по которым строится сводка
+rollup_columns = ("time", "level", "logger")
+
+# служебные таблицы индексов, создаваемые в базе данных логов, не отображаются
+service_tables = frozenset({
+    "ingested_files", "rollups", "rollup_marks", "table_ids", "templates", "template_rows", "template_marks",
+    "exceptions", "exception_rows", "exception_marks", "search_marks"})
+
+# начало значения времени "YYYY-MM-DD HH:MM" или "YYYY-MM-DDTHH:MM"
+timestamp_pattern = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}")
+
+# столбцы таблиц логов, по которым строится полнотекстовый индекс
+search_columns = ("message", "traceback")
+# триграммный индекс находит только подстроки не короче трех символов
+trigram_length = 3
+
+
+def search_table(tablename: str) -> str:
+    # имя таблицы FTS5 полнотекстового индекса таблицы
+    return f"{tablename}_search"
+
+
+def like_pattern(text: str) -> str:
+    # LIKE-шаблон подстроки, % и _ в тексте ищутся как есть
+    return "%" + re.sub(r"([\\%_])", r"\\\1", text) + "%"
+
+
+def ordered_timestamps(values: list[Any]) -> bool:
+    # все значения - время, и ни одно не раньше предыдущего
+    return (
+        all(isinstance(value, str) and timestamp_pattern.match(value) for value in values) and
+        all(previous <= value for previous, value in zip(values, values[1:]))
+    )
+
+
+def file_state(path: str) -> str:
+    """
+    Modification time and size of the database file and its WAL file.
+    Any committed write of any connection changes them, unlike
+    PRAGMA data_version, which is local to a connection /
+    Время изменения и размер файла базы данных и его файла WAL.
+    Их меняет любая зафиксированная запись любого подключения,
+    в отличие от PRAGMA data_version, которая своя у каждого подключения
+    """
+    states = []
+    for name in (path, f"{path}-wal"):
+        try:
+            info = os.stat(name)
+        except FileNotFoundError:
+            continue
+        # пустой WAL создается при каждом открытии базы данных и ничего не меняет
+        if info.st_size:
+            states.append(f"{info.st_mtime_ns}:{info.st_size}")
+    return " ".join(states)
+
+
+sql_token = re.compile(r"""
+    (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    |(?P<comment>--[^\n]*|/\*.*?(?:\*/|$))
+    |(?P<space>\s+)
+    |(?P<word>\w+)
+    |(?P<other>.)
+""", re.S | re.X)
+
+
+@lru_cache(maxsize=cfg.SQL_NORMALIZER_CACHE_SIZE)
+def normalize_sql(sql: str) -> tuple[str, statement_kind]:
+    """
+    Collapses whitespaces and comments outside of literals into single
+    spaces and classifies the statement. Works in one pass and
+    remembers results for repeated queries /
+    Заменяет пробельные символы и комментарии вне литералов одиночными
+    пробелами и определяет класс запроса. Работает за один проход и
+    запоминает результаты для повторяющихся запросов
+    """
+    parts = []
+    space = False
+    command = None
+    kind = "other"
+    depth = 0
+    for token in sql_token.finditer(sql):
+        group = token.lastgroup
+        if group in ("space", "comment"):
+            space = bool(parts)
+            continue
+        text = token.group()
+        if space:
+            parts.append(" ")
+            space = False
+        parts.append(text)
+        if group == "other":
+            depth += (text == "(") - (text == ")")
+        elif group == "word" and depth == 0:
+            word = text.lower()
+            if command is None:
+                command = word
+                kind = statement_kinds.get(word, "other")
+            # класс запроса с WITH определяется основной командой после CTE
+            elif command == "with" and kind == "other" and word in statement_kinds:
+                kind = statement_kinds[word]
+    return "".join(parts), kind
+
+
+@lru_cache(maxsize=cfg.REGEXP_CACHE_SIZE)
+def compile_pattern(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def regexp(pattern: str | None, value: Any) -> bool | None:
+    """
+    SQL function for "value REGEXP pattern": whether the pattern is found
+    in the value. Each pattern is compiled once, not for every row /
+    SQL-функция для "value REGEXP pattern": найден ли шаблон в значении.
+    Каждый шаблон компилируется один раз, а не для каждой строки
+    """
+    if pattern is None or value is None:
+        return None
+    return compile_pattern(pattern).search(value if isinstance(value, str) else str(value)) is not None
+
+
+operand = Literal[">", "<", ">=", "<=", "=", "like", "regexp", "is null", "is not null"]
+
+
+class Clause():
+
+    """
+    SQL condition compiled to text with placeholders
+    and the values bound to them /
+    SQL-условие, скомпилированное в текст с заполнителями
+    и привязанные к ним значения
     """
 
     text: str
+    params: tuple[Any]
+
+    def __init__(self, text: str, params: tuple[Any] = ()):
+        self.text = text
+        self.params = tuple(params)
+
+    def _join(self, other: "Clause | str", operator: str) -> "Clause":
+        other = other if isinstance(other, Clause) else Clause(other)
+        return Clause(f"{self.text} {operator} {other.text}", self.params + other.params)
+
+    def __mul__(self, other: "Clause | str") -> "Clause":
+        return self._join(other, "AND")
+
+    def __add__(self, other: "Clause | str") -> "Clause":
+        return self._join(other, "OR")
+
+    def __str__(self):
+        return self.text
+
+
+class Where(Clause):
+
+    """
+    Where clause object for simple queries/
+    объект конструкции Where для простых запросов
+    """
 
     column: Column
     operand_: operand
@@ -74,32 +382,14 @@ class Where():
         self.column = column
         self.operand_ = operand_
         self.value = value
-        self.text = self._generate_text()
-
-    def _generate_text(self) -> str:
-        if self.column.type_ == str:
-            value = f"'{self.value}'"
-        else:
-            value = str(self.value)
-        if self.value:
-            return f"({self.column.name} {self.operand_} {value})"
-        else:
-            return f"({self.column.name} {self.operand_})"
-
-    def __mul__(self, other) -> str:
-        if isinstance(other, str):
-            return f"{self.text} AND {other}"
-        else:
-            return f"{self.text} AND {other.text}"
-
-    def __add__(self, other):
-        if isinstance(other, str):
-            return f"{self.text} OR {other}"
-        else:
-            return f"{self.text} OR {other.text}"
+        Clause.__init__(self, *self._generate_text())
 
-    def __str__(self):
-        return self.text
+    def _generate_text(self) -> tuple[str, tuple[Any]]:
+        # значение передается отдельно от текста запроса,
+        # поэтому текст одинаков для любых значений и не требует экранирования
+        if self.operand_ in ("is null", "is not null"):
+            return f"({quote(self.column.name)} {self.operand_})", ()
+        return f"({quote(self.column.name)} {self.operand_} ?)", (self.value, )
 
 
 class SQL(Connection):
@@ -109,53 +399,239 @@ class SQL(Connection):
     Главный sqlite-коннектор.
     """
 
+    path: str
     tables: dict[str, Table]
     echo: bool = True
+    _transaction_depth: int = 0
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, parse: bool = True):
         self.echo = False
-        parse = False
+        self.path = path
         if os.path.exists(path):
-            parse = True
             logger.debug(f"Connecting: {path}")
         else:
+            parse = False
             logger.debug(f"Creating: {path}")
-        Connection.__init__(self, path, check_same_thread=False)
+        Connection.__init__(
+            self,
+            path,
+            timeout=cfg.WRITE_BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=cfg.STATEMENT_CACHE_SIZE)
         self._cursor = self.cursor()
+        self._create_functions()
+        self.tables = {}
         if parse:
-            self.tables = self._parse_database()
-        else:
-            self.tables = ()
+            self.set_tables(self.parse_database())
         self.exec("PRAGMA FOREIGN_KEYS = ON;")
         self.exec("PRAGMA SQLITE_ENABLE_MATH_FUNCTIONS = ON;")
         self.echo = True
 
     def update(self):
         self.echo = False
-        self.tables = self._parse_database()
+        self.set_tables(self.parse_database())
         self.echo = True
 
-    def exec(self, query: str) -> Cursor:
-        # приведение запроса в нормальный вид
-        query = self._normilize_sql(query)
-        # трассировка
-        if self.echo:
-            logger.info(query)
+    def _create_functions(self):
+        # детерминированную функцию sqlite может вычислять один раз для одинаковых аргументов
+        self.create_function("REGEXP", 2, regexp, deterministic=True)
+
+    def set_tables(self, tables: dict[str, Table]):
+        """
+        Replaces tables descriptions. The dictionary itself
+        stays the same, so readers see the new descriptions too /
+        Заменяет описания таблиц. Сам словарь остается прежним,
+        поэтому новые описания видны и читателям
+        """
+        self.tables.clear()
+        self.tables.update(tables)
+
+    def exec(self, query: str, params: tuple[Any] = ()) -> Cursor:
+        """
+        Executes query with values bound to its placeholders.
+        Compiled statements are reused by the connection statement cache /
+        Выполняет запрос со значениями, привязанными к заполнителям.
+        Скомпилированные запросы переиспользуются кэшем запросов подключения
+        """
+        # приведение запроса в нормальный вид и определение его класса
+        query, kind = normalize_sql(query)
         # выполнение
-        response = self._cursor.execute(query)
-        # коммит если необходимо
-        command = query.split(" ")[0].lower()
-        if command in ("insert", "update", "delete", "alter"):
+        start = perf_counter()
+        response = self._cursor.execute(query, params)
+        # коммит если необходимо (внутри явной транзакции - при ее завершении)
+        if kind in ("write", "ddl") and not self._transaction_depth:
             self.commit()
+        # трассировка и профилирование
+        if self.echo:
+            rows = response.rowcount if response.rowcount >= 0 else None
+            self._observe(query, params, kind, start, rows)
         # возвращение результата
         return response
 
-    def select(self, query: str) -> list[Any]:
+    def fetch(self, query: str, params: tuple[Any] = ()) -> list[tuple[Any]]:
+        """
+        Executes query and fetches all its rows. Unlike exec,
+        the traced duration includes reading the rows /
+        Выполняет запрос и получает все его строки. В отличие от exec,
+        трассируемая длительность включает чтение строк
+        """
+        query, kind = normalize_sql(query)
+        start = perf_counter()
+        rows = self._cursor.execute(query, params).fetchall()
+        if self.echo:
+            self._observe(query, params, kind, start, len(rows))
+        return rows
+
+    def fetch_chunks(
+            self,
+            query: str,
+            params: tuple[Any] = (),
+            size: int = cfg.FETCH_CHUNK_SIZE) -> Iterator[list[tuple[Any]]]:
+
+        """
+        Executes query and yields its rows in lists of size rows,
+        so bulk readers can convert them without holding the tuples
+        of the whole result. Traced once all rows are read /
+        Выполняет запрос и отдает его строки списками по size строк,
+        чтобы массовое чтение могло преобразовывать их, не держа кортежи
+        всего результата. Трассируется после чтения всех строк
+        """
+        query, kind = normalize_sql(query)
+        start = perf_counter()
+        cursor = self.cursor()
+        cursor.execute(query, params)
+        total = 0
+        while rows := cursor.fetchmany(size):
+            total += len(rows)
+            yield rows
+        if self.echo:
+            self._observe(query, params, kind, start, total)
+
+    def _observe(
+            self,
+            query: str,
+            params: tuple[Any],
+            kind: statement_kind,
+            start: float,
+            rows: int | None):
+
+        """
+        Traces and profiles the query started at start (perf_counter).
+        Plan of a slow read is captured with EXPLAIN QUERY PLAN /
+        Трассирует и профилирует запрос, начатый в start (perf_counter).
+        План медленного чтения получается через EXPLAIN QUERY PLAN
+        """
+        duration = (perf_counter() - start) * 1000
+        tracer.trace(query, params, kind, duration, rows)
+        plan = None
+        if kind == "read" and duration >= profiler.slow:
+            plan = self.explain(query, params)
+        profiler.record(QueryProfile(time(), self.path, query, kind, duration, rows, plan))
+
+    def explain(self, query: str, params: tuple[Any] = ()) -> str | None:
+        """
+        Returns EXPLAIN QUERY PLAN of the query as indented lines /
+        Возвращает EXPLAIN QUERY PLAN запроса в виде строк с отступами
+        """
+        if query.lower().startswith("explain"):
+            return None
+        try:
+            # отдельный курсор, чтобы не сбросить результат основного запроса
+            steps = self.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        except DatabaseError:
+            return None
+        depth = {0: -1}
+        lines = []
+        for id_, parent, _, detail in steps:
+            depth[id_] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[id_] + detail)
+        return "\n".join(lines) or None
+
+    @contextmanager
+    def transaction(self) -> Iterator["SQL"]:
+        """
+        Explicit transaction: statements inside are committed together
+        on exit or rolled back on exception. Nested calls use savepoints /
+        Явная транзакция: запросы внутри фиксируются вместе при выходе
+        или отменяются при исключении. Вложенные вызовы используют точки сохранения
+        """
+        depth = self._transaction_depth
+        savepoint = f"level{depth}"
+        # блокировка записи берется сразу: отложенная транзакция, начавшая читать,
+        # не может дождаться другого писателя и сразу получает "database is locked"
+        self.exec(f"SAVEPOINT {savepoint}" if depth else "BEGIN IMMEDIATE")
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if depth:
+                self.exec(f"ROLLBACK TO {savepoint}")
+                self.exec(f"RELEASE {savepoint}")
+            else:
+                self.exec("ROLLBACK")
+            raise
+        else:
+            self.exec(f"RELEASE {savepoint}" if depth else "COMMIT")
+        finally:
+            self._transaction_depth -= 1
+
+    def exec_many(
+            self,
+            query: str,
+            rows: Iterable[tuple[Any]],
+            chunk_size: int = cfg.WRITE_CHUNK_SIZE,
+            commit_every: int = cfg.WRITE_COMMIT_INTERVAL) -> int:
+
+        """
+        Executes query for every row with executemany in chunks of chunk_size
+        rows. Own transaction is committed every commit_every rows,
+        an outer transaction is never interrupted.
+        Returns the number of processed rows /
+        Выполняет запрос для каждой строки через executemany частями по
+        chunk_size строк. Собственная транзакция фиксируется каждые commit_every
+        строк, внешняя транзакция не прерывается.
+        Возвращает количество обработанных строк
+        """
+        query, kind = normalize_sql(query)
+        own = not self._transaction_depth
+        rows = iter(rows)
+        done = 0
+        start = perf_counter()
+        with self.transaction():
+            while chunk := tuple(islice(rows, chunk_size)):
+                self._cursor.executemany(query, chunk)
+                done += len(chunk)
+                if own and done // commit_every != (done - len(chunk)) // commit_every:
+                    self._cursor.execute("COMMIT")
+                    self._cursor.execute("BEGIN IMMEDIATE")
+        if self.echo:
+            self._observe(query, (), kind, start, done)
+        return done
+
+    def insert_many(
+            self,
+            tablename: str,
+            columns: tuple[str],
+            rows: Iterable[tuple[Any]],
+            chunk_size: int = cfg.WRITE_CHUNK_SIZE,
+            commit_every: int = cfg.WRITE_COMMIT_INTERVAL) -> int:
+
+        """
+        Batched insert of rows into the columns of the table /
+        Пакетная вставка строк в столбцы таблицы
+        """
+        query = "INSERT INTO %s (%s) VALUES (%s)" % (
+            quote(tablename),
+            ", ".join(quote(column) for column in columns),
+            ", ".join("?" for _ in columns))
+        return self.exec_many(query, rows, chunk_size, commit_every)
+
+    def select(self, query: str, params: tuple[Any] = ()) -> list[Any]:
         """
         Executes query and returns response (or raises EmptySet exceprtion) /
         Выполняет запрос и возвращает ответ (или вызывает исключение EmptySet)
         """
-        response = self.exec(query).fetchall()
+        response = self.fetch(query, params)
         if not response:
             if self.echo:
                 logger.error("empty set")
@@ -163,128 +639,745 @@ class SQL(Connection):
         else:
             return response
 
-    def _parse_database(self) -> dict[str, Table]:
-
+    def parse_database(self) -> dict[str, Table]:
+        """
+        Reads tables descriptions from the database /
+        Читает описания таблиц из базы данных
+        """
         tables = dict()
-        tablenames = self._get_tablenames()
-
-        for tablename in tablenames:
-            fks = self._get_table_fks(tablename)
-            lenght = self._get_table_lenght(tablename)
-            columnnames = self._get_column_names(tablename)
-            columns = []
-
-            for columnname in columnnames:
-                type_ = self._get_column_type(tablename, columnname)
-                default = self._get_column_default(tablename, columnname)
-                is_pk, not_null, unique, calculated = self._get_column_constraints(
-                    tablename, columnname)
-                columns.append(Column(
-                    columnname,
-                    type_,
-                    default,
-                    is_pk,
-                    columnname in fks,
-                    not_null,
-                    unique,
-                    calculated))
-
-            tables[tablename] = Table(tablename, lenght, tuple(columns))
+        for tablename in self._get_tablenames():
+            table = self._describe_table(tablename)
+            table.lenght = self.estimate_lenght(tablename, table.without_rowid)
+            tables[tablename] = table
         return tables
 
-    def _get_table_fks(self, tablename: str) -> tuple[str]:
-        sql = "(".join(self._get_table_sql(tablename).split("(")[1:])[:-1]
-        columns = sql.split(",")
-        fks = []
-        while columns:
-            column = self._normilize_sql(columns.pop()).lower()
-            if column.startswith("foreign key"):
-                fks.append(column.split("(")[1].split(")")[0].strip())
-        return tuple(fks)
-
-    def _get_column_constraints(
-            self,
-            tablename: str,
-            columnname: str) -> tuple[bool, bool, bool, bool]:
-
-        column_sql = self._get_column_sql(tablename, columnname).lower()
-        return (
-            "primary key" in column_sql,
-            "not null" in column_sql,
-            "unique" in column_sql,
-            "generated" in column_sql
-        )
+    def schema_version(self) -> int:
+        return self.exec("PRAGMA schema_version").fetchone()[0]
 
-    def _get_column_default(self, tablename: str, columnname: str) -> Any:
-        sql = self._get_column_sql(tablename, columnname).lower()
-        if "default" not in sql:
-            return None
-        else:
-            type_ = self._get_column_type(tablename, columnname)
-            return type_(sql.split("default ")[1].split(" ")[0])
-
-    def _get_column_sql(self, tablename: str, columnname: str) -> str:
-        sql = self._get_table_sql(tablename)
-        columns = sql.split("(")[1].split(",")
-        for column in columns:
-            if columnname.lower() in column.lower():
-                return self._normilize_sql(column)
-
-    def _get_column_type(self, tablename: str, columnname: str) -> type:
-        sql_type = self._get_column_sql(tablename, columnname).split(" ")[1].lower()
-        return {
-            "int": int,
-            "integer": int,
-            "real": float,
-            "text": str,
-            "blob": bytes,
-            "tex": str
-        }[sql_type]
+    def read_schema(self, cached: "Schema" = None) -> "Schema":
+        """
+        Reads database schema. Tables structure is taken from
+        cached schema if the database schema version has not changed /
+        Читает схему базы данных. Структура таблиц берется из
+        закэшированной схемы, если версия схемы базы данных не изменилась
+        """
+        version = self.schema_version()
+        if not cached or cached.version != version:
+            return Schema(self.path, version, self.parse_database())
+        for table in cached.tables.values():
+            table.lenght = self.estimate_lenght(table.name, table.without_rowid)
+        return Schema(self.path, version, cached.tables)
+
+    def _describe_table(self, tablename: str) -> Table:
+        # вся структура таблицы читается прагмами за один проход,
+        # без разбора текста CREATE TABLE
+        name = quote(tablename)
+        info = self.exec(f"PRAGMA table_xinfo({name})").fetchall()
+        fks = set(row[3] for row in self.exec(f"PRAGMA foreign_key_list({name})"))
+        unique = self._get_unique_columns(tablename)
+
+        columns = []
+        pk = []
+        for _, columnname, sql_type, not_null, default, is_pk, hidden in info:
+            # скрытые столбцы виртуальных таблиц не отображаются
+            if hidden == 1:
+                continue
+            type_ = column_type(sql_type)
+            columns.append(Column(
+                columnname,
+                type_,
+                column_default(default, type_),
+                bool(is_pk),
+                columnname in fks,
+                bool(not_null),
+                columnname in unique,
+                hidden in (2, 3)))
+            if is_pk:
+                pk.append((is_pk, columnname))
+
+        without_rowid = self._is_without_rowid(tablename)
+        key = tuple(name for _, name in sorted(pk)) if without_rowid else ("rowid", )
+        return Table(tablename, 0, tuple(columns), key, without_rowid)
+
+    def _get_unique_columns(self, tablename: str) -> set[str]:
+        unique = set()
+        for _, index, is_unique, *_ in self.exec(f"PRAGMA index_list({quote(tablename)})"):
+            if not is_unique:
+                continue
+            columns = self.exec(f"PRAGMA index_info({quote(index)})").fetchall()
+            if len(columns) == 1:
+                unique.add(columns[0][2])
+        return unique
+
+    def _is_without_rowid(self, tablename: str) -> bool:
+        try:
+            row = self.exec(f"PRAGMA table_list({quote(tablename)})").fetchone()
+            return bool(row[4])
+        except DatabaseError:
+            # PRAGMA table_list появилась в sqlite 3.37
+            query = "SELECT sql FROM sqlite_schema WHERE name = ?"
+            sql = normalize_sql(self.select(query, (tablename, ))[0][0])[0].lower()
+            return sql.endswith("without rowid")
 
     def _get_tablenames(self) -> tuple[str]:
-        tablenames = self.select("SELECT name FROM sqlite_schema WHERE type = \"table\"")
-        tablenames = sorted(list((row[0] for row in tablenames)))
+        rows = self.select("SELECT name, sql FROM sqlite_schema WHERE type = \"table\"")
+        # виртуальные таблицы (полнотекстовые индексы) и их теневые таблицы
+        # "<таблица>_<суффикс>" служебные и не отображаются
+        virtual = tuple(name for name, sql in rows if (sql or "").upper().startswith("CREATE VIRTUAL TABLE"))
+        shadows = tuple(f"{name}_" for name in virtual)
+        tablenames = sorted(
+            name for name, _ in rows
+            if name not in virtual and name not in service_tables and not name.startswith(shadows))
         if "sqlite_sequence" in tablenames:
             tablenames.remove("sqlite_sequence")
         return tuple(tablenames)
 
-    def _get_table_lenght(self, tablename: str) -> int:
-        return self.select(f"SELECT count(*) FROM {tablename}")[0][0]
-
-    def _normilize_sql(self, sql: str) -> str:
-        sql = sql.strip()
-        sql = " ".join(sql.split("\n"))
-        while "  " in sql:
-            sql = sql.replace("  ", " ")
-        return sql
-
-    def _get_table_sql(self, tablename: str) -> str:
-        # sqlite не позволяет получить имена столбцов,
-        # однако можно получить полный текст команды CREATE TABLE
-        query = f"SELECT sql FROM sqlite_schema WHERE name='{tablename}'"
-        # текст команды в исходном виде
-        sql = self.select(query)[0][0].strip()[:-1]
-        return self._normilize_sql(sql)
-
-    def _get_column_names(self, tablename: str) -> tuple[str]:
-        sql = self._get_table_sql(tablename)
-        # отсекаем CREATE TABLE ... ( и разбиваем на столбцы по запятой
-        columns = sql.split("(")[1].split(",")
-        # избавлемся от висячих пробелов
-        names = tuple(col.split()[0].strip() for col in columns)
-        # удаляем Foregin key и primary keн
-        names = tuple(filter(lambda name: "FOREIGN" not in name.upper(), names))
-        names = tuple(filter(lambda name: "PRIMARY" not in name.upper(), names))
-        return names
+    def estimate_lenght(self, tablename: str, without_rowid: bool = False) -> int:
+        """
+        Instant estimate of the rows count: from sqlite_stat1
+        (if ANALYZE was run) or from max(rowid) /
+        Мгновенная оценка количества строк: по sqlite_stat1
+        (если выполнялся ANALYZE) или по max(rowid)
+        """
+        lenght = self._get_stat_lenght(tablename)
+        if lenght is not None:
+            return lenght
+        if without_rowid:
+            return 0
+        return self.max_rowid(tablename) or 0
+
+    def scan_columns(self, tablename: str) -> tuple[str] | None:
+        """
+        Columns of the table for the rowid ranges scan,
+        None if the table has no rowid /
+        Столбцы таблицы для просмотра по диапазонам rowid,
+        None, если у таблицы нет rowid
+        """
+        if self._is_without_rowid(tablename):
+            return None
+        return tuple(row[1] for row in self.fetch(f"PRAGMA table_info({quote(tablename)})"))
+
+    def rowid_ranges(self, tablename: str, size: int = cfg.SCAN_RANGE_SIZE) -> list[tuple[int, int]]:
+        """
+        Splits the rowids of the table into (start, end] ranges of size
+        rowids. Reads only the ends of the rowid b-tree, not the rows /
+        Делит rowid таблицы на диапазоны (начало, конец] по size rowid.
+        Читает только концы b-дерева rowid, а не строки
+        """
+        # min и max в одном запросе читают всю таблицу, по отдельности - только концы
+        low, high = self.exec(
+            f"SELECT (SELECT min(rowid) FROM {quote(tablename)}), (SELECT max(rowid) FROM {quote(tablename)})"
+        ).fetchone()
+        if low is None:
+            return []
+        return [(start, min(start + size, high)) for start in range(low - 1, high, size)]
+
+    def max_rowid(self, tablename: str) -> int | None:
+        # максимум по ключу - один индексный поиск, без сканирования
+        return self.exec(f"SELECT max(rowid) FROM {quote(tablename)}").fetchone()[0]
+
+    def timestamp_columns(self, tablename: str, samples: int = cfg.TIME_COLUMN_SAMPLES) -> tuple[str]:
+        """
+        Text columns holding non-decreasing timestamps in sample rows
+        spread evenly over the rowids of the table, one key lookup each /
+        Текстовые столбцы, хранящие неубывающее время в пробных строках,
+        равномерно распределенных по rowid таблицы, по поиску по ключу на каждую
+        """
+        low, high = self.exec(
+            f"SELECT (SELECT min(rowid) FROM {quote(tablename)}), (SELECT max(rowid) FROM {quote(tablename)})"
+        ).fetchone()
+        if low is None:
+            return ()
+        keys = sorted({low + (high - low) * number // max(samples - 1, 1) for number in range(samples)})
+        rows = []
+        for key in keys:
+            cursor = self.exec(f"SELECT * FROM {quote(tablename)} WHERE rowid >= ? ORDER BY rowid LIMIT 1", (key, ))
+            rows.append(cursor.fetchone())
+        names = (description[0] for description in cursor.description)
+        return tuple(
+            name for number, name in enumerate(names)
+            if ordered_timestamps([row[number] for row in rows])
+        )
+
+    def range_max(self, tablename: str, columnname: str, low: int, high: int) -> Any:
+        """
+        Max value of the column in the rows with rowid in (low, high].
+        Reads only the rows of the range /
+        Наибольшее значение столбца в строках с rowid в (low, high].
+        Читает только строки диапазона
+        """
+        return self.exec(
+            f"SELECT max({quote(columnname)}) FROM {quote(tablename)} WHERE rowid > ? AND rowid <= ?",
+            (low, high)).fetchone()[0]
+
+    def row_at(self, tablename: str, columnname: str, rowid: int) -> tuple[int, Any] | None:
+        """
+        Rowid and value of the column of the first row from rowid on,
+        one search by the rowid key /
+        Rowid и значение столбца первой строки начиная с rowid,
+        один поиск по ключу rowid
+        """
+        rows = self.fetch(
+            f"SELECT rowid, {quote(columnname)} FROM {quote(tablename)} WHERE rowid >= ? ORDER BY rowid LIMIT 1",
+            (rowid, ))
+        return rows[0] if rows else None
+
+    def first_reaching(
+            self,
+            tablename: str,
+            columnname: str,
+            value: Any,
+            low: int,
+            high: int | None = None) -> int | None:
+
+        """
+        Rowid of the first row in (low, high] which column value is
+        not less than value. Reads only the rows of the range /
+        Rowid первой строки в (low, high], значение столбца которой
+        не меньше value. Читает только строки диапазона
+        """
+        query = f"""
+            SELECT rowid FROM {quote(tablename)}
+            WHERE rowid > ? AND rowid <= ? AND {quote(columnname)} >= ?
+            ORDER BY rowid LIMIT 1"""
+        # без верхней границы поиск идет до конца таблицы (до наибольшего возможного rowid)
+        rows = self.fetch(query, (low, 2**63 - 1 if high is None else high, value))
+        return rows[0][0] if rows else None
+
+    def count_rows(self, tablename: str, without_rowid: bool = False) -> tuple[int, int | None]:
+        """
+        Exact rows count (full scan) and max rowid at the moment of counting /
+        Точное количество строк (полное сканирование) и максимальный rowid
+        на момент подсчета
+        """
+        target = "NULL" if without_rowid else "max(rowid)"
+        return self.exec(f"SELECT count(*), {target} FROM {quote(tablename)}").fetchone()
+
+    def _get_stat_lenght(self, tablename: str) -> int | None:
+        if not self.exec(
+                "SELECT 1 FROM sqlite_schema WHERE name = 'sqlite_stat1'").fetchone():
+            return None
+        row = self.exec(
+            "SELECT stat FROM sqlite_stat1 WHERE tbl = ?", (tablename, )).fetchone()
+        return int(row[0].split()[0]) if row else None
+
+    def create_rollups(self):
+        """
+        Creates tables of the rollups: rows counts per time bucket,
+        level and logger, and rowids up to which tables are rolled up /
+        Создает таблицы сводок: количества строк по интервалам времени,
+        уровням и логгерам, и rowid, до которых таблицы учтены в сводке
+        """
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS rollups (
+                tablename TEXT NOT NULL,
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                level TEXT NOT NULL,
+                logger TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (tablename, granularity, bucket, level, logger)
+            ) WITHOUT ROWID""")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS rollup_marks (
+                tablename TEXT PRIMARY KEY,
+                mark INTEGER NOT NULL
+            )""")
+
+    def rollup_source(self, tablename: str) -> tuple[str | None] | None:
+        """
+        Rollup columns (time, level, logger) present in the table,
+        None if the table has no time column /
+        Столбцы сводки (время, уровень, логгер), имеющиеся в таблице,
+        None, если в таблице нет столбца времени
+        """
+        names = {row[1] for row in self.fetch(f"PRAGMA table_info({quote(tablename)})")}
+        if rollup_columns[0] not in names:
+            return None
+        return tuple(name if name in names else None for name in rollup_columns)
+
+    def rollup_mark(self, tablename: str) -> int | None:
+        """
+        Rowid up to which the table is rolled up,
+        None if its rollup was never built /
+        Rowid, до которого таблица учтена в сводке,
+        None, если сводка никогда не строилась
+        """
+        if not self.fetch("SELECT 1 FROM sqlite_schema WHERE name = 'rollup_marks'"):
+            return None
+        rows = self.fetch("SELECT mark FROM rollup_marks WHERE tablename = ?", (tablename, ))
+        return rows[0][0] if rows else None
+
+    def update_rollups(self, tablename: str, step: int = None) -> tuple[int, int]:
+        """
+        Adds rows appended after the mark (at most step rowids)
+        to the rollups of the table. Runs in the current transaction
+        if there is one, so ingestion updates rollups with its batches.
+        Returns the new mark and max rowid of the table /
+        Добавляет строки, добавленные после отметки (не более step rowid),
+        в сводки таблицы. Выполняется в текущей транзакции, если она есть,
+        поэтому загрузка обновляет сводки вместе со своими пакетами.
+        Возвращает новую отметку и максимальный rowid таблицы
+        """
+        source = self.rollup_source(tablename)
+        if source is None:
+            return 0, 0
+        last = self.max_rowid(tablename) or 0
+        with self.transaction():
+            mark = self.rollup_mark(tablename) or 0
+            end = last if step is None else min(last, mark + step)
+            if end > mark:
+                self._roll_up(tablename, source, mark, end)
+            self.exec(
+                "INSERT OR REPLACE INTO rollup_marks (tablename, mark) VALUES (?, ?)",
+                (tablename, end))
+        return end, last
+
+    def _roll_up(self, tablename: str, source: tuple[str | None], start: int, end: int):
+        time_, level, logger_ = (quote(name) if name else "NULL" for name in source)
+        # строки считаются один раз по минутам, часы и дни складываются из минут
+        self.exec("""
+            CREATE TEMP TABLE IF NOT EXISTS rollup_delta (
+                bucket TEXT, level TEXT, logger TEXT, count INTEGER
+            )""")
+        self.exec("DELETE FROM temp.rollup_delta")
+        self.exec(f"""
+            INSERT INTO temp.rollup_delta
+            SELECT substr({time_}, 1, ?), coalesce({level}, ''), coalesce({logger_}, ''), count(*)
+            FROM {quote(tablename)}
+            WHERE rowid > ? AND rowid <= ? AND {time_} IS NOT NULL
+            GROUP BY 1, 2, 3""", (rollup_lengths["minute"], start, end))
+        query = """
+            INSERT INTO rollups (tablename, granularity, bucket, level, logger, count)
+            SELECT ?, ?, substr(bucket, 1, ?), level, logger, sum(count)
+            FROM temp.rollup_delta WHERE true
+            GROUP BY 3, 4, 5
+            ON CONFLICT (tablename, granularity, bucket, level, logger)
+            DO UPDATE SET count = count + excluded.count"""
+        for granularity, length in rollup_lengths.items():
+            self.exec(query, (tablename, granularity, length))
+
+    def create_templates(self):
+        """
+        Creates tables of the message templates: templates with their counts
+        and first and last seen times, template of every row and rowids
+        up to which tables are mined /
+        Создает таблицы шаблонов сообщений: шаблоны с количеством и временем
+        первого и последнего появления, шаблон каждой строки и rowid,
+        до которых разобраны таблицы
+        """
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS templates (
+                tablename TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                template TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                first_seen TEXT,
+                last_seen TEXT,
+                PRIMARY KEY (tablename, id)
+            ) WITHOUT ROWID""")
+        self.exec("CREATE INDEX IF NOT EXISTS templates_count ON templates (tablename, count)")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS table_ids (
+                id INTEGER PRIMARY KEY,
+                tablename TEXT NOT NULL UNIQUE
+            )""")
+        # строка на каждую строку таблицы, поэтому таблица хранится номером, а не именем
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS template_rows (
+                table_id INTEGER NOT NULL,
+                row INTEGER NOT NULL,
+                template INTEGER NOT NULL,
+                PRIMARY KEY (table_id, row)
+            ) WITHOUT ROWID""")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS template_marks (
+                tablename TEXT PRIMARY KEY,
+                mark INTEGER NOT NULL
+            )""")
+
+    def table_id(self, tablename: str) -> int:
+        """
+        Small integer id of the table in the side tables
+        with a row per row of the table /
+        Небольшой целый номер таблицы во вспомогательных
+        таблицах со строкой на каждую строку таблицы
+        """
+        self.exec("INSERT OR IGNORE INTO table_ids (tablename) VALUES (?)", (tablename, ))
+        return self.exec("SELECT id FROM table_ids WHERE tablename = ?", (tablename, )).fetchone()[0]
+
+    def template_source(self, tablename: str) -> tuple[str, str | None] | None:
+        """
+        Message and time columns of the table,
+        None if the table has no message column /
+        Столбцы сообщения и времени таблицы,
+        None, если в таблице нет столбца сообщения
+        """
+        names = {row[1] for row in self.fetch(f"PRAGMA table_info({quote(tablename)})")}
+        if "message" not in names:
+            return None
+        return "message", rollup_columns[0] if rollup_columns[0] in names else None
+
+    def template_mark(self, tablename: str) -> int | None:
+        """
+        Rowid up to which messages of the table are mined,
+        None if they were never mined /
+        Rowid, до которого разобраны сообщения таблицы,
+        None, если они никогда не разбирались
+        """
+        if not self.fetch("SELECT 1 FROM sqlite_schema WHERE name = 'template_marks'"):
+            return None
+        rows = self.fetch("SELECT mark FROM template_marks WHERE tablename = ?", (tablename, ))
+        return rows[0][0] if rows else None
+
+    def load_templates(self, tablename: str) -> list[tuple[int, str, int, str | None, str | None]]:
+        """
+        All templates (id, template, count, first seen, last seen) of the table /
+        Все шаблоны (идентификатор, шаблон, количество, первое и последнее появление) таблицы
+        """
+        return self.fetch(
+            "SELECT id, template, count, first_seen, last_seen FROM templates WHERE tablename = ?",
+            (tablename, ))
+
+    def save_templates(self, tablename: str, templates: Iterable[tuple[int, str, int, str | None, str | None]]):
+        self.exec_many(
+            "INSERT OR REPLACE INTO templates (tablename, id, template, count, first_seen, last_seen) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((tablename, *template) for template in templates))
+
+    def top_templates(
+            self,
+            tablename: str,
+            limit: int = cfg.TEMPLATE_VIEW_LIMIT) -> list[tuple[int, str, int, str | None, str | None]]:
+
+        """
+        The most frequent templates (id, template, count, first seen,
+        last seen) of the table. Reads only the templates, not the table /
+        Самые частые шаблоны (идентификатор, шаблон, количество, первое
+        и последнее появление) таблицы. Читает только шаблоны, не таблицу
+        """
+        if self.template_mark(tablename) is None:
+            return []
+        return self.fetch("""
+            SELECT id, template, count, first_seen, last_seen FROM templates
+            WHERE tablename = ?
+            ORDER BY count DESC LIMIT ?""", (tablename, limit))
+
+    def create_exceptions(self):
+        """
+        Creates tables of the exceptions index: exceptions grouped by
+        traceback fingerprint with counts and first and last seen times,
+        rows of every fingerprint and rowids up to which tables are indexed /
+        Создает таблицы индекса исключений: исключения, сгруппированные
+        по отпечатку трассировки, с количеством и временем первого и последнего
+        появления, строки каждого отпечатка и rowid, до которых проиндексированы таблицы
+        """
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS exceptions (
+                tablename TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                exception TEXT NOT NULL,
+                location TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                first_seen TEXT,
+                last_seen TEXT,
+                PRIMARY KEY (tablename, fingerprint)
+            ) WITHOUT ROWID""")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS exception_rows (
+                tablename TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (tablename, fingerprint, row)
+            ) WITHOUT ROWID""")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS exception_marks (
+                tablename TEXT PRIMARY KEY,
+                mark INTEGER NOT NULL
+            )""")
+
+    def exception_source(self, tablename: str) -> tuple[str, str | None] | None:
+        """
+        Traceback and time columns of the table,
+        None if the table has no traceback column /
+        Столбцы трассировки и времени таблицы,
+        None, если в таблице нет столбца трассировки
+        """
+        names = {row[1] for row in self.fetch(f"PRAGMA table_info({quote(tablename)})")}
+        if "traceback" not in names:
+            return None
+        return "traceback", rollup_columns[0] if rollup_columns[0] in names else None
+
+    def exception_mark(self, tablename: str) -> int | None:
+        """
+        Rowid up to which tracebacks of the table are indexed,
+        None if they were never indexed /
+        Rowid, до которого проиндексированы трассировки таблицы,
+        None, если они никогда не индексировались
+        """
+        if not self.fetch("SELECT 1 FROM sqlite_schema WHERE name = 'exception_marks'"):
+            return None
+        rows = self.fetch("SELECT mark FROM exception_marks WHERE tablename = ?", (tablename, ))
+        return rows[0][0] if rows else None
+
+    def add_exceptions(
+            self,
+            tablename: str,
+            groups: Iterable[tuple[str, str, str, int, str | None, str | None]]):
+
+        """
+        Adds (fingerprint, exception, location, count, first seen, last seen)
+        groups to the exceptions of the table /
+        Добавляет группы (отпечаток, исключение, место, количество, первое
+        и последнее появление) к исключениям таблицы
+        """
+        # min и max от NULL дают NULL, поэтому известное время не теряется через coalesce
+        self.exec_many(
+            """
+            INSERT INTO exceptions (tablename, fingerprint, exception, location, count, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (tablename, fingerprint) DO UPDATE SET
+                count = count + excluded.count,
+                first_seen = coalesce(min(first_seen, excluded.first_seen), first_seen, excluded.first_seen),
+                last_seen = coalesce(max(last_seen, excluded.last_seen), last_seen, excluded.last_seen)
+            """,
+            ((tablename, *group) for group in groups))
+
+    def top_exceptions(
+            self,
+            tablename: str,
+            limit: int = cfg.EXCEPTION_VIEW_LIMIT) -> list[tuple[str, str, str, int, str | None, str | None]]:
+
+        """
+        Exceptions (fingerprint, exception, location, count, first seen,
+        last seen) of the table, the most frequent first /
+        Исключения (отпечаток, исключение, место, количество, первое
+        и последнее появление) таблицы, сначала самые частые
+        """
+        if self.exception_mark(tablename) is None:
+            return []
+        return self.fetch("""
+            SELECT fingerprint, exception, location, count, first_seen, last_seen FROM exceptions
+            WHERE tablename = ?
+            ORDER BY count DESC LIMIT ?""", (tablename, limit))
+
+    def exception_occurrences(
+            self,
+            tablename: str,
+            fingerprint: str,
+            limit: int = cfg.EXCEPTION_VIEW_LIMIT) -> list[tuple[int, str | None]]:
+
+        """
+        (rowid, time) of the occurrences of the exception,
+        one range read of the exception_rows primary key /
+        (rowid, время) появлений исключения,
+        одно чтение диапазона первичного ключа exception_rows
+        """
+        source = self.exception_source(tablename)
+        time_ = f"source.{quote(source[1])}" if source and source[1] else "NULL"
+        return self.fetch(f"""
+            SELECT occurrence.row, {time_} FROM exception_rows AS occurrence
+            LEFT JOIN {quote(tablename)} AS source ON source.rowid = occurrence.row
+            WHERE occurrence.tablename = ? AND occurrence.fingerprint = ?
+            ORDER BY occurrence.row LIMIT ?""", (tablename, fingerprint, limit))
+
+    def search_source(self, tablename: str) -> tuple[str] | None:
+        """
+        Columns of the table indexed for the full-text search: message and
+        traceback of log tables, otherwise all text columns. None if the
+        table has no rowid or no text columns /
+        Столбцы таблицы, индексируемые для полнотекстового поиска: сообщение
+        и трассировка таблиц логов, иначе все текстовые столбцы. None, если
+        у таблицы нет rowid или текстовых столбцов
+        """
+        if self._is_without_rowid(tablename):
+            return None
+        info = self.fetch(f"PRAGMA table_info({quote(tablename)})")
+        columns = tuple(name for name in search_columns if name in {row[1] for row in info})
+        if not columns:
+            columns = tuple(row[1] for row in info if column_type(row[2]) is str and not row[5])
+        return columns or None
+
+    def create_search(self, tablename: str, columns: tuple[str]):
+        """
+        Creates the FTS5 full-text index of the table with the trigram
+        tokenizer (any substring of 3+ characters is found by the index)
+        and its mark. The index keeps no copy of the text, it is read
+        from the table by rowid /
+        Создает полнотекстовый индекс FTS5 таблицы с триграммным
+        токенизатором (любая подстрока от 3 символов находится по индексу)
+        и его отметку. Индекс не хранит копию текста, он читается
+        из таблицы по rowid
+        """
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS search_marks (
+                tablename TEXT PRIMARY KEY,
+                mark INTEGER NOT NULL
+            )""")
+        with self.transaction():
+            self.exec(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {quote(search_table(tablename))}
+                USING fts5({", ".join(map(quote, columns))}, content={quote(tablename)}, tokenize="trigram")""")
+            self.exec("INSERT OR IGNORE INTO search_marks (tablename, mark) VALUES (?, 0)", (tablename, ))
+
+    def search_mark(self, tablename: str) -> int | None:
+        """
+        Rowid up to which the table is in its full-text index,
+        None if the index was never created /
+        Rowid, до которого таблица внесена в полнотекстовый индекс,
+        None, если индекс никогда не создавался
+        """
+        if not self.fetch("SELECT 1 FROM sqlite_schema WHERE name = 'search_marks'"):
+            return None
+        rows = self.fetch("SELECT mark FROM search_marks WHERE tablename = ?", (tablename, ))
+        return rows[0][0] if rows else None
+
+    def update_search(self, tablename: str, step: int = None) -> tuple[int, int]:
+        """
+        Adds rows appended after the mark (at most step rowids) to the
+        full-text index of the table if it was created. Runs in the current
+        transaction, so ingestion keeps the index in sync with its batches.
+        Returns the new mark and max rowid of the table /
+        Добавляет строки, добавленные после отметки (не более step rowid),
+        в полнотекстовый индекс таблицы, если он создан. Выполняется в текущей
+        транзакции, поэтому загрузка поддерживает индекс вместе со своими пакетами.
+        Возвращает новую отметку и максимальный rowid таблицы
+        """
+        if self.search_mark(tablename) is None:
+            return 0, 0
+        columns = ", ".join(map(quote, self.search_source(tablename)))
+        last = self.max_rowid(tablename) or 0
+        with self.transaction():
+            mark = self.search_mark(tablename)
+            end = last if step is None else min(last, mark + step)
+            if end > mark:
+                self.exec(f"""
+                    INSERT INTO {quote(search_table(tablename))} (rowid, {columns})
+                    SELECT rowid, {columns} FROM {quote(tablename)}
+                    WHERE rowid > ? AND rowid <= ?""", (mark, end))
+            self.exec("UPDATE search_marks SET mark = ? WHERE tablename = ?", (end, tablename))
+        return end, last
+
+    def find_text(self, tablename: str, text: str, after: int = 0) -> int | None:
+        """
+        Rowid of the first row after the given one containing the text
+        (case-insensitive), None if there is no such row. Indexed rows are
+        searched by the full-text index, the rest (and texts shorter than
+        3 characters) by a scan stopping at the first match /
+        Rowid первой строки после данной, содержащей текст (без учета
+        регистра), None, если такой строки нет. Проиндексированные строки
+        ищутся по полнотекстовому индексу, остальные (и тексты короче
+        3 символов) - просмотром до первого совпадения
+        """
+        columns = self.search_source(tablename)
+        if not columns or not text:
+            return None
+        mark = (self.search_mark(tablename) or 0) if len(text) >= trigram_length else 0
+        if mark > after:
+            # фраза в кавычках ищется как подстрока, кавычки внутри удваиваются
+            phrase = '"%s"' % text.replace('"', '""')
+            index = quote(search_table(tablename))
+            rows = self.fetch(f"""
+                SELECT rowid FROM {index}
+                WHERE {index} MATCH ? AND rowid > ? AND rowid <= ?
+                ORDER BY rowid LIMIT 1""", (phrase, after, mark))
+            if rows:
+                return rows[0][0]
+        condition = " OR ".join(f"{quote(name)} LIKE ? ESCAPE '\\'" for name in columns)
+        rows = self.fetch(f"""
+            SELECT rowid FROM {quote(tablename)}
+            WHERE rowid > ? AND ({condition})
+            ORDER BY rowid LIMIT 1""", (max(after, mark), *(like_pattern(text), ) * len(columns)))
+        return rows[0][0] if rows else None
+
+    def regexp_rows(self, tablename: str, pattern: str, start: int, end: int) -> list[tuple[Any]]:
+        """
+        (rowid, *text columns) of the rows with rowid in (start, end]
+        which text columns match the regular expression /
+        (rowid, *текстовые столбцы) строк с rowid в (start, end],
+        текстовые столбцы которых совпадают с регулярным выражением
+        """
+        columns = self.search_source(tablename)
+        if not columns:
+            return []
+        condition = " OR ".join(f"{quote(name)} REGEXP ?" for name in columns)
+        return self.fetch(f"""
+            SELECT rowid, {", ".join(map(quote, columns))} FROM {quote(tablename)}
+            WHERE rowid > ? AND rowid <= ? AND ({condition})""", (start, end, *(pattern, ) * len(columns)))
+
+    def rollup(
+            self,
+            tablename: str,
+            granularity: rollup_granularity,
+            limit: int = cfg.ROLLUP_VIEW_LIMIT) -> list[tuple[str, str, int]]:
+
+        """
+        Rows counts (bucket, level, count) of the last limit buckets,
+        the latest first. Reads only the rollups, not the table /
+        Количества строк (интервал, уровень, количество) последних
+        limit интервалов, сначала последние. Читает только сводки, не таблицу
+        """
+        if self.rollup_mark(tablename) is None:
+            return []
+        return self.fetch("""
+            SELECT bucket, level, sum(count) FROM rollups
+            WHERE tablename = ?1 AND granularity = ?2 AND bucket >= coalesce((
+                SELECT DISTINCT bucket FROM rollups
+                WHERE tablename = ?1 AND granularity = ?2
+                ORDER BY bucket DESC LIMIT 1 OFFSET ?3), '')
+            GROUP BY bucket, level
+            ORDER BY bucket DESC, level""", (tablename, granularity, limit - 1))
+
+    def rollup_counts(
+            self,
+            tablename: str,
+            granularity: rollup_granularity) -> list[tuple[str, str, int]]:
+
+        """
+        Rows counts (bucket, level, count) of all buckets in time order /
+        Количества строк (интервал, уровень, количество) всех интервалов по порядку
+        """
+        if self.rollup_mark(tablename) is None:
+            return []
+        return self.fetch("""
+            SELECT bucket, level, sum(count) FROM rollups
+            WHERE tablename = ? AND granularity = ?
+            GROUP BY bucket, level
+            ORDER BY bucket, level""", (tablename, granularity))
+
+    def time_series(
+            self,
+            tablename: str,
+            columnname: str,
+            size: int = cfg.FETCH_CHUNK_SIZE) -> Iterator[list[tuple[float, Any]]]:
+
+        """
+        Yields (unix time, value) of the rows having a numeric value, in chunks
+        of size rows. "2024-01-01 10:00:00,123" times of logging are
+        accepted as well as "2024-01-01 10:00:00.123" of loguru /
+        Отдает (unix время, значение) строк с числовым значением, частями
+        по size строк. Время logging "2024-01-01 10:00:00,123" принимается
+        так же, как "2024-01-01 10:00:00.123" loguru
+        """
+        time_ = quote(rollup_columns[0])
+        value = quote(columnname)
+        yield from self.fetch_chunks(f"""
+            SELECT (julianday(replace(substr({time_}, 1, 23), ',', '.')) - 2440587.5) * 86400.0, {value}
+            FROM {quote(tablename)}
+            WHERE {time_} IS NOT NULL AND typeof({value}) IN ('integer', 'real')
+            ORDER BY rowid""", size=size)
 
     def select_where(
             self,
             tablename: str,
-            where: str,
+            where: Clause | str,
             rowid: bool = False) -> tuple:
 
         target = "rowid, *" if rowid else "*"
-        return self.select(f"SELECT {target} FROM {tablename} WHERE {where};")
+        where = where if isinstance(where, Clause) else Clause(where)
+        return self.select(
+            f"SELECT {target} FROM {quote(tablename)} WHERE {where.text};",
+            where.params)
 
     def get_rows(
             self,
@@ -293,30 +1386,378 @@ class SQL(Connection):
             count: int,
             rowid: bool = False) -> tuple[tuple[Any]]:
 
-        target = "rowid, *" if rowid else "*"
-        start_ = start if start > 0 else self.tables[tablename].lenght-19
-        start_ = start_ if start_ > 0 else start
-        result = self.select(f"""
-            SELECT {target}
-            FROM {tablename}
-            WHERE rowid >= {start_}
-            LIMIT {count}""")
-        if len(result) == count or start <= 1:
-            return result
+        """
+        Returns count rows starting from the start key
+        (or the last page if start < 1) /
+        Возвращает count строк, начиная с ключа start
+        (или последнюю страницу, если start < 1)
+        """
+        if start > 0:
+            rows = self.rows_after(tablename, start, count, inclusive=True)
         else:
-            print("recursion")
-            return self.get_rows(
-                tablename,
-                start-1,
-                count,
-                rowid
-            )
+            rows = self.last_rows(tablename, count)
+        if not rows:
+            raise EmptySet()
+        if not rowid:
+            rows = tuple(row[1:] for row in rows)
+        return rows
+
+    def first_rows(self, tablename: str, count: int) -> tuple[tuple[Any]]:
+        """
+        Returns the first page of the table with one query /
+        Возвращает первую страницу таблицы одним запросом
+        """
+        return self._keyset_select(tablename, None, count, False)
+
+    def last_rows(self, tablename: str, count: int) -> tuple[tuple[Any]]:
+        """
+        Returns the last page of the table with one query /
+        Возвращает последнюю страницу таблицы одним запросом
+        """
+        return self._keyset_select(tablename, None, count, True)
+
+    def rows_after(
+            self,
+            tablename: str,
+            key: Any,
+            count: int,
+            inclusive: bool = False) -> tuple[tuple[Any]]:
+
+        """
+        Returns count rows which keys are greater than key /
+        Возвращает count строк, ключи которых больше key
+        """
+        operand_ = ">=" if inclusive else ">"
+        return self._keyset_select(tablename, (operand_, key), count, False)
+
+    def rows_before(
+            self,
+            tablename: str,
+            key: Any,
+            count: int,
+            inclusive: bool = False) -> tuple[tuple[Any]]:
+
+        """
+        Returns count rows which keys are less than key /
+        Возвращает count строк, ключи которых меньше key
+        """
+        operand_ = "<=" if inclusive else "<"
+        return self._keyset_select(tablename, (operand_, key), count, True)
+
+    def rows_between(
+            self,
+            tablename: str,
+            low: int,
+            high: int) -> tuple[tuple[Any]]:
+
+        """
+        Returns rows which rowids are in [low, high) range /
+        Возвращает строки, rowid которых лежат в диапазоне [low, high)
+        """
+        return tuple(self.fetch(f"""
+            SELECT rowid, *
+            FROM {quote(tablename)}
+            WHERE rowid >= ? AND rowid < ?
+            ORDER BY rowid""", (low, high)))
+
+    def _keyset_select(
+            self,
+            tablename: str,
+            cursor: tuple[str, Any] | None,
+            count: int,
+            backwards: bool) -> tuple[tuple[Any]]:
+
+        # строки возвращаются в виде (ключ, *значения) по возрастанию ключа.
+        # разрывы в rowid не требуют дополнительных запросов:
+        # индексный поиск по ключу и LIMIT пропускают их сами
+        table = self.tables[tablename]
+        key = tuple(quote(column) for column in table.key)
+        order = " DESC" if backwards else ""
+        where = ""
+        params = ()
+        if cursor:
+            operand_, value = cursor
+            params = tuple(value) if len(key) > 1 else (value, )
+            where = "WHERE (%s) %s (%s)" % (
+                ", ".join(key),
+                operand_,
+                ", ".join("?" for _ in key))
+        rows = self.fetch(f"""
+            SELECT {", ".join(key)}, *
+            FROM {quote(tablename)}
+            {where}
+            ORDER BY {", ".join(k + order for k in key)}
+            LIMIT ?""", (*params, count))
+        if backwards:
+            rows.reverse()
+        width = len(key)
+        if width > 1:
+            return tuple((tuple(row[:width]), *row[width:]) for row in rows)
+        return tuple(rows)
+
+
+class Reader(SQL):
+
+    """
+    Read-only connection to the same database file.
+    Shares table descriptions with the main connector
+    and may be used from a worker thread /
+    Подключение только для чтения к тому же файлу базы данных.
+    Использует описания таблиц главного коннектора
+    и может использоваться из рабочего потока
+    """
+
+    def __init__(self, database: SQL | str):
+        self.echo = False
+        # по пути к файлу подключается рабочий процесс, у которого нет главного коннектора
+        self.path = database if isinstance(database, str) else database.path
+        uri = f"{Path(self.path).absolute().as_uri()}?mode=ro"
+        Connection.__init__(
+            self,
+            uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=cfg.STATEMENT_CACHE_SIZE)
+        self._cursor = self.cursor()
+        self._create_functions()
+        self.tables = {} if isinstance(database, str) else database.tables
+        self.echo = False if isinstance(database, str) else database.echo
+
+
+class RowWindow():
+
+    """
+    Keyset paginated window over table rows.
+    Moves in both directions without relying on contiguous rowids.
+    Source is any object with first_rows, last_rows,
+    rows_after and rows_before methods (SQL by default) /
+    Окно строк таблицы с пагинацией по ключу.
+    Перемещается в обоих направлениях, не полагаясь на непрерывность rowid.
+    Источник - любой объект с методами first_rows, last_rows,
+    rows_after и rows_before (по умолчанию SQL)
+    """
+
+    source: SQL
+    tablename: str
+    size: int
+    rows: tuple[tuple[Any]]
+
+    def __init__(self, source: SQL, tablename: str, size: int = 20):
+        self.source = source
+        self.tablename = tablename
+        self.size = size
+        self.rows = ()
+
+    def first(self) -> tuple[tuple[Any]]:
+        self.rows = self.source.first_rows(self.tablename, self.size)
+        return self.rows
+
+    def last(self) -> tuple[tuple[Any]]:
+        self.rows = self.source.last_rows(self.tablename, self.size)
+        return self.rows
+
+    def seek(self, key: Any) -> tuple[tuple[Any]]:
+        """
+        Moves window to the first row which key is not less than key /
+        Перемещает окно к первой строке с ключом не меньше key
+        """
+        rows = self.source.rows_after(self.tablename, key, self.size, inclusive=True)
+        self.rows = rows if len(rows) == self.size else self.last()
+        return self.rows
+
+    def down(self, step: int = 1) -> bool:
+        """
+        Shifts window forward. Returns False at the end of the table /
+        Сдвигает окно вперед. Возвращает False в конце таблицы
+        """
+        if not self.rows:
+            return bool(self.first())
+        rows = self.source.rows_after(self.tablename, self.rows[-1][0], step)
+        if not rows:
+            return False
+        self.rows = (self.rows + rows)[-self.size:]
+        return True
+
+    def up(self, step: int = 1) -> bool:
+        """
+        Shifts window backwards. Returns False at the start of the table /
+        Сдвигает окно назад. Возвращает False в начале таблицы
+        """
+        if not self.rows:
+            return bool(self.first())
+        rows = self.source.rows_before(self.tablename, self.rows[0][0], step)
+        if not rows:
+            return False
+        self.rows = (rows + self.rows)[:self.size]
+        return True
+
+    def first_key(self) -> Any:
+        return self.rows[0][0] if self.rows else None
 
 
 class ApplicationDatabase(SQL):
 
     def __init__(self):
         SQL.__init__(self, f"{os.getcwd()}\\{cfg.APP_DATABASE_PATH}")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS schemas (
+                path TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                description TEXT NOT NULL
+            )""")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS query_profiles (
+                time REAL NOT NULL,
+                path TEXT NOT NULL,
+                shape TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                duration REAL NOT NULL,
+                rows INTEGER,
+                plan TEXT
+            )""")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS followed_files (
+                database TEXT NOT NULL,
+                identity TEXT NOT NULL,
+                path TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                PRIMARY KEY (database, identity)
+            )""")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS time_checkpoints (
+                path TEXT NOT NULL,
+                tablename TEXT NOT NULL,
+                columnname TEXT NOT NULL,
+                key INTEGER NOT NULL,
+                time TEXT NOT NULL,
+                PRIMARY KEY (path, tablename, key)
+            ) WITHOUT ROWID""")
+        self.exec("""
+            CREATE TABLE IF NOT EXISTS column_stats (
+                path TEXT NOT NULL,
+                tablename TEXT NOT NULL,
+                state TEXT NOT NULL,
+                stats TEXT NOT NULL,
+                PRIMARY KEY (path, tablename)
+            )""")
+
+    def load_followed(self, database: str) -> list[FileState]:
+        """
+        Returns read positions of the log files followed into the database /
+        Возвращает позиции чтения файлов логов, отслеживаемых в базу данных
+        """
+        rows = self.exec(
+            "SELECT identity, path, offset FROM followed_files WHERE database = ?",
+            (database, )).fetchall()
+        return [FileState(*row) for row in rows]
+
+    def save_followed(self, database: str, states: tuple[FileState]) -> None:
+        with self.transaction():
+            self.exec("DELETE FROM followed_files WHERE database = ?", (database, ))
+            self.insert_many(
+                "followed_files",
+                ("database", "identity", "path", "offset"),
+                ((database, state.identity, state.path, state.offset) for state in states))
+
+    def load_profiles(self, limit: int = cfg.PROFILER_BUFFER_SIZE) -> list[QueryProfile]:
+        """
+        Returns the last saved query profiles, oldest first /
+        Возвращает последние сохраненные профили запросов, от старых к новым
+        """
+        rows = self.exec(
+            "SELECT * FROM query_profiles ORDER BY rowid DESC LIMIT ?", (limit, )).fetchall()
+        return [QueryProfile(*row) for row in reversed(rows)]
+
+    def save_profiles(
+            self,
+            profiles: tuple[QueryProfile],
+            limit: int = cfg.PROFILER_HISTORY_LIMIT) -> None:
+
+        """
+        Appends query profiles and keeps only the last limit of them /
+        Добавляет профили запросов и хранит только последние limit из них
+        """
+        if not profiles:
+            return
+        # запросы сохранения сами не профилируются
+        self.echo = False
+        try:
+            with self.transaction():
+                self.insert_many(
+                    "query_profiles",
+                    ("time", "path", "shape", "kind", "duration", "rows", "plan"),
+                    (astuple(profile) for profile in profiles))
+                self.exec(
+                    "DELETE FROM query_profiles WHERE rowid <= (SELECT max(rowid) FROM query_profiles) - ?",
+                    (limit, ))
+        finally:
+            self.echo = True
+
+    def load_schema(self, path: str) -> Schema | None:
+        """
+        Returns cached schema of the database file /
+        Возвращает закэшированную схему файла базы данных
+        """
+        row = self.exec(
+            "SELECT version, description FROM schemas WHERE path = ?", (path, )).fetchone()
+        return Schema.load(path, *row) if row else None
+
+    def save_schema(self, schema: Schema) -> None:
+        self.exec(
+            "INSERT OR REPLACE INTO schemas (path, version, description) VALUES (?, ?, ?)",
+            (schema.path, schema.version, schema.dump()))
+
+    def load_checkpoints(self, path: str, tablename: str) -> tuple[str, list[tuple[int, str]]] | None:
+        """
+        Returns the timestamp column and (rowid, time) checkpoints
+        of the table of the database file /
+        Возвращает столбец времени и контрольные точки (rowid, время)
+        таблицы файла базы данных
+        """
+        rows = self.fetch(
+            "SELECT columnname, key, time FROM time_checkpoints WHERE path = ? AND tablename = ? ORDER BY key",
+            (path, tablename))
+        if not rows:
+            return None
+        return rows[0][0], [(key, time_) for _, key, time_ in rows]
+
+    def save_checkpoints(
+            self,
+            path: str,
+            tablename: str,
+            columnname: str,
+            checkpoints: list[tuple[int, str]],
+            replace: bool = False) -> None:
+
+        """
+        Appends checkpoints of the table, replace drops the stored ones first /
+        Добавляет контрольные точки таблицы, replace сначала удаляет сохраненные
+        """
+        with self.transaction():
+            if replace:
+                self.exec(
+                    "DELETE FROM time_checkpoints WHERE path = ? AND tablename = ?", (path, tablename))
+            self.exec_many(
+                "INSERT OR REPLACE INTO time_checkpoints (path, tablename, columnname, key, time) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((path, tablename, columnname, key, time_) for key, time_ in checkpoints))
+
+    def load_column_stats(self, path: str, tablename: str) -> tuple[str, str] | None:
+        """
+        Returns the state of the database file (see file_state) when
+        the column statistics of the table were computed and the statistics in JSON /
+        Возвращает состояние файла базы данных (см. file_state) на момент
+        подсчета статистики столбцов таблицы и статистику в JSON
+        """
+        row = self.exec(
+            "SELECT state, stats FROM column_stats WHERE path = ? AND tablename = ?",
+            (path, tablename)).fetchone()
+        return tuple(row) if row else None
+
+    def save_column_stats(self, path: str, tablename: str, state: str, stats: str) -> None:
+        self.exec(
+            "INSERT OR REPLACE INTO column_stats (path, tablename, state, stats) VALUES (?, ?, ?, ?)",
+            (path, tablename, state, stats))
 
     def log_in(self, login: str, password: str) -> User | None:
         if not login or not password:
@@ -331,8 +1772,9 @@ class ApplicationDatabase(SQL):
         except EmptySet:
             return None
 
-    def _where_user(self, user: User) -> str:
-        return f"login = '{user.login}'"
+    def _where_user(self, user: User) -> Where:
+        return Where(self.tables["users"].column("login"), "=", user.login)
 
     def update_last_proj(self, user: User, path: str) -> None:
-        self.exec(f"UPDATE users SET last_proj = '{path}' WHERE {self._where_user(user)}")
+        where = self._where_user(user)
+        self.exec(f"UPDATE users SET last_proj = ? WHERE {where}", (path, *where.params))
@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+
+from PyQt6 import QtCore
+
+from .connector import SQL
+from .executor import QueryExecutor
+
+"""
+Module with the tables rows counting service /
+Модуль со службой подсчета строк таблиц
+"""
+
+
+@dataclass
+class RowCount():
+
+    value: int
+    exact: bool
+    # максимальный rowid на момент подсчета
+    max_rowid: int | None = None
+
+
+def format_count(count: RowCount) -> str:
+    """
+    Short text of the rows count: "1 234" or "~1.2M" for estimates /
+    Короткий текст количества строк: "1 234" или "~1.2M" для оценок
+    """
+    if count.exact:
+        return f"{count.value:,}".replace(",", " ")
+    value = float(count.value)
+    for suffix in ("", "K", "M", "B"):
+        if value < 1000:
+            break
+        value /= 1000
+    text = f"{value:.1f}".rstrip("0").rstrip(".") if suffix else str(int(value))
+    return f"~{text}{suffix}"
+
+
+class CounterSignals(QtCore.QObject):
+
+    changed = QtCore.pyqtSignal(str, object)
+
+
+class RowCounter():
+
+    """
+    Tables rows counting service. Gives an instant estimate
+    (taken from Table.lenght), refines it to the exact count
+    in background and keeps it current as rows are appended /
+    Служба подсчета строк таблиц. Сразу отдает оценку
+    (из Table.lenght), уточняет ее до точного значения
+    в фоне и поддерживает актуальной по мере добавления строк
+    """
+
+    database: SQL
+    executor: QueryExecutor
+    counts: dict[str, RowCount]
+    signals: CounterSignals
+
+    def __init__(self, database: SQL, executor: QueryExecutor):
+        self.database = database
+        self.executor = executor
+        self.signals = CounterSignals()
+        self.counts = {
+            table.name: RowCount(table.lenght, table.lenght_exact)
+            for table in database.tables.values()
+        }
+
+    def get(self, tablename: str) -> RowCount | None:
+        return self.counts.get(tablename)
+
+    def text(self, tablename: str) -> str:
+        count = self.get(tablename)
+        return format_count(count) if count else ""
+
+    def start(self):
+        """
+        Schedules exact counting of all tables /
+        Планирует точный подсчет строк всех таблиц
+        """
+        for tablename in self.counts:
+            self.count(tablename)
+
+    def count(self, tablename: str):
+        without_rowid = self.database.tables[tablename].without_rowid
+        self.executor.submit(
+            lambda reader: reader.count_rows(tablename, without_rowid),
+            # у пустой таблицы нет max(rowid), новые строки начнутся с 1
+            lambda result: self._set(tablename, RowCount(result[0], True, result[1] or 0)),
+            "low",
+            f"count-{tablename}")
+
+    def grow(self, tablename: str, max_rowid: int | None, contiguous: bool = False):
+        """
+        Accounts rows appended to the table up to max_rowid.
+        contiguous means the new rowids have no gaps
+        (e.g. rows appended by the application itself) /
+        Учитывает строки, добавленные в таблицу до max_rowid.
+        contiguous означает, что в новых rowid нет разрывов
+        (например, строки добавлены самим приложением)
+        """
+        count = self.counts.get(tablename)
+        if count is None:
+            return
+        if max_rowid is None or count.max_rowid is None or max_rowid <= count.max_rowid:
+            return
+        # разрывы в новых rowid не учитываются, поэтому без contiguous значение - оценка
+        self._set(tablename, RowCount(
+            count.value + max_rowid - count.max_rowid, count.exact and contiguous, max_rowid))
+
+    def _set(self, tablename: str, count: RowCount):
+        self.counts[tablename] = count
+        table = self.database.tables.get(tablename)
+        if table:
+            table.lenght = count.value
+            table.lenght_exact = count.exact
+        self.signals.changed.emit(tablename, count)
@@ -9,6 +9,8 @@ from . import config as cfg
 from .config import GAP, HEAD_FONTSIZE
 from . import gui
 from . import popups
+from . import tables
+from .profiler import ShapeStatistics
 from . import dynamic
 from .dynamic import global_widget_manager as gwm
 
@@ -193,6 +195,41 @@ class ChooseVariantDialog(Dialog):
         self.accept()
 
 
+class JumpSignals(QtCore.QObject):
+
+    jump = QtCore.pyqtSignal(str)
+
+
+class JumpDialog(Dialog):
+
+    """
+    Dialog asking for a time to jump the table to /
+    Диалог, запрашивающий время, к которому перейти в таблице
+    """
+
+    def __init__(self, window: dynamic.DynamicWindow):
+        Dialog.__init__(self, window, "clock-period", "Перейти ко времени")
+        self.jump_signals = JumpSignals()
+        self.island.setFixedSize(400, 220)
+
+        self.input = widgets.LineEdit("ГГГГ-ММ-ДД ЧЧ:ММ")
+        gwm.add_widget(self.input, style_preset="input")
+        self.input.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.input.returnPressed.connect(self.jump)
+        self.accept_button = widgets.get_color_button(None, "arrow-right-circle", "green")
+        self.accept_button.clicked.connect(lambda e: self.jump())
+
+        layout = shorts.VLayout(self.body)
+        layout.setContentsMargins(GAP*2, GAP*3, GAP*2, 0)
+        layout.setSpacing(GAP*3)
+        layout.addWidget(self.input)
+        layout.addWidget(self.accept_button, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
+
+    def jump(self):
+        self.jump_signals.jump.emit(self.input.text())
+        self.accept()
+
+
 class FilterDialog(Dialog):
 
     def __init__(self, window: dynamic.DynamicWindow):
@@ -200,6 +237,58 @@ class FilterDialog(Dialog):
         self.setFixedSize(500, 500)
 
 
+class HistoryDialog(Dialog):
+
+    """
+    Executed queries history: duration percentiles
+    per query shape, the slowest shapes first /
+    История выполненных запросов: процентили длительности
+    по формам запросов, сначала самые медленные
+    """
+
+    headers = (
+        "Запрос", "Класс", "Количество",
+        "p50, мс", "p95, мс", "p99, мс", "max, мс",
+        "Строк", "План")
+
+    def __init__(self, window: dynamic.DynamicWindow):
+        Dialog.__init__(self, window, "clock-duration", "История запросов")
+        self.island.setFixedSize(900, 560)
+
+        self.model = tables.TableModel()
+        self.table = dynamic.DynamicTableView()
+        self.table.setModel(self.model)
+        self.table.setWordWrap(False)
+        gwm.add_widget(self.table)
+        gwm.set_style(
+            self.table,
+            "always",
+            "QTableView { border: none; outline: none; border-radius: 0px; }"
+        )
+        gwm.set_style(self.table, "leave", tables.table_stylesheet())
+
+        layout = shorts.VLayout(self.body)
+        layout.setContentsMargins(0, GAP*2, 0, 0)
+        layout.addWidget(self.table)
+
+    def load(self, statistics: list[ShapeStatistics]):
+        rows = []
+        for number, item in enumerate(statistics, 1):
+            rows.append((
+                number,
+                item.shape,
+                item.kind,
+                item.count,
+                f"{item.p50:.2f}",
+                f"{item.p95:.2f}",
+                f"{item.p99:.2f}",
+                f"{item.max:.2f}",
+                "" if item.rows is None else f"{item.rows:.0f}",
+                item.plan or ""))
+        self.model.load(self.headers, rows)
+        self.table.resizeColumnsToContents()
+
+
 def getPath(
         method: callable,
         caption: str,
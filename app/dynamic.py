@@ -214,6 +214,10 @@ class DynamicScrollBar(QtWidgets.QScrollBar, DynamicWidget):
     pass
 
 
+class DynamicTableView(QtWidgets.QTableView, DynamicWidget):
+    pass
+
+
 class DynamicWindow(CWindow, DynamicWidget):
 
     def __init__(self):
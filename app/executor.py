@@ -0,0 +1,178 @@
+import queue
+import itertools
+import threading
+from typing import Any, Callable, Literal
+from dataclasses import dataclass, field
+
+from PyQt6 import QtCore
+from loguru import logger
+
+from . import config as cfg
+from .connector import SQL, Reader
+
+"""
+Module running database queries on worker threads /
+Модуль, выполняющий запросы к базе данных в рабочих потоках
+"""
+
+
+request_priority = Literal["high", "normal", "low"]
+
+priorities: dict[request_priority, int] = {
+    "high": 0,
+    "normal": 1,
+    "low": 2
+}
+
+
+@dataclass(order=True)
+class Request():
+
+    priority: int
+    number: int
+    task: Callable[[Reader], Any] = field(compare=False)
+    tag: str | None = field(default=None, compare=False)
+    cancelled: bool = field(default=False, compare=False)
+    callback: Callable[[Any], None] | None = field(default=None, compare=False)
+    errback: Callable[[str], None] | None = field(default=None, compare=False)
+
+
+class ExecutorSignals(QtCore.QObject):
+
+    finished = QtCore.pyqtSignal(int, object)
+    failed = QtCore.pyqtSignal(int, str)
+
+
+class QueryExecutor():
+
+    """
+    Runs tasks on worker threads, each owning a read-only connection.
+    Task is a callable receiving the Reader of its worker.
+    Results come back to the GUI thread through Qt signals.
+    New request with the same tag cancels the stale one /
+    Выполняет задачи в рабочих потоках, каждый со своим подключением
+    только для чтения. Задача - вызываемый объект, получающий Reader потока.
+    Результаты возвращаются в поток интерфейса через сигналы Qt.
+    Новый запрос с тем же тегом отменяет устаревший
+    """
+
+    database: SQL
+    signals: ExecutorSignals
+    workers: tuple[threading.Thread]
+
+    def __init__(self, database: SQL, workers: int = cfg.EXECUTOR_WORKERS):
+        self.database = database
+        self.signals = ExecutorSignals()
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+
+        self._queue = queue.PriorityQueue()
+        self._numbers = itertools.count()
+        self._lock = threading.Lock()
+        # запросы, результат которых еще не доставлен
+        self._requests: dict[int, Request] = {}
+        # подключения потоков, выполняющих запросы в данный момент
+        self._running: dict[int, Reader] = {}
+
+        self.workers = tuple(
+            threading.Thread(target=self._work, daemon=True)
+            for _ in range(workers))
+        for worker in self.workers:
+            worker.start()
+
+    def submit(
+            self,
+            task: Callable[[Reader], Any],
+            callback: Callable[[Any], None] = None,
+            priority: request_priority = "normal",
+            tag: str = None,
+            errback: Callable[[str], None] = None) -> int:
+
+        """
+        Schedules task and returns request number.
+        callback(result) is called in the GUI thread /
+        Планирует задачу и возвращает номер запроса.
+        callback(result) вызывается в потоке интерфейса
+        """
+        if tag:
+            self.cancel(tag)
+        request = Request(
+            priorities[priority], next(self._numbers), task, tag,
+            callback=callback, errback=errback)
+        with self._lock:
+            self._requests[request.number] = request
+        self._queue.put(request)
+        return request.number
+
+    def cancel(self, tag: str):
+        """
+        Cancels pending and interrupts running requests with the tag /
+        Отменяет ожидающие и прерывает выполняющиеся запросы с тегом
+        """
+        with self._lock:
+            for request in self._requests.values():
+                if request.tag == tag:
+                    self._cancel(request)
+
+    def _cancel(self, request: Request):
+        request.cancelled = True
+        if request.number in self._running:
+            self._running[request.number].interrupt()
+
+    def close(self):
+        with self._lock:
+            for request in self._requests.values():
+                self._cancel(request)
+        # запрос без задачи останавливает рабочий поток
+        for _ in self.workers:
+            self._queue.put(Request(len(priorities), next(self._numbers), None))
+
+    def _work(self):
+        reader = Reader(self.database)
+        while True:
+            request = self._queue.get()
+            if request.task is None:
+                break
+            with self._lock:
+                if request.cancelled:
+                    self._requests.pop(request.number, None)
+                    continue
+                self._running[request.number] = reader
+            self._execute(request, reader)
+        reader.close()
+
+    def _execute(self, request: Request, reader: Reader):
+        try:
+            result = request.task(reader)
+        except Exception as error:
+            if not request.cancelled:
+                self.signals.failed.emit(request.number, str(error))
+        else:
+            if not request.cancelled:
+                self.signals.finished.emit(request.number, result)
+        finally:
+            with self._lock:
+                self._running.pop(request.number, None)
+                if request.cancelled:
+                    self._requests.pop(request.number, None)
+
+    def _take(self, number: int) -> Request | None:
+        with self._lock:
+            request = self._requests.pop(number, None)
+        # запрос мог быть отменен уже после получения результата
+        if request and not request.cancelled:
+            return request
+        return None
+
+    def _on_finished(self, number: int, result: Any):
+        request = self._take(number)
+        if request and request.callback:
+            request.callback(result)
+
+    def _on_failed(self, number: int, message: str):
+        request = self._take(number)
+        if not request:
+            return
+        logger.error(f"query failed: {message}")
+        if request.errback:
+            request.errback(message)
@@ -0,0 +1,138 @@
+import re
+from hashlib import sha1
+
+from . import background
+from . import config as cfg
+from .connector import SQL, quote
+
+"""
+Module with the tracebacks fingerprinting and exceptions grouping /
+Модуль с отпечатками трассировок и группировкой исключений
+"""
+
+
+# строка кадра стека: "  File "app.py", line 10, in main", у loguru может начинаться с ">"
+frame_line = re.compile(r'^\s*>?\s*File "(?P<file>[^"]+)", line \d+, in (?P<function>\S+)', re.M)
+# строка исключения: "ValueError: bad value" или "KeyboardInterrupt" без отступа
+exception_line = re.compile(r"^(?P<type>[A-Za-z_][\w.]*)(?::|$)", re.M)
+
+
+def normalize_file(path: str) -> str:
+    # пути различаются между машинами и окружениями, важно только имя файла
+    return re.split(r"[\\/]", path)[-1]
+
+
+def parse_traceback(text: str) -> tuple[str, list[tuple[str, str]]] | None:
+    """
+    Exception type and (file name, function) frames of the traceback
+    without line numbers, None if the text has no frames /
+    Тип исключения и кадры (имя файла, функция) трассировки
+    без номеров строк, None, если в тексте нет кадров
+    """
+    frames = [(normalize_file(match["file"]), match["function"]) for match in frame_line.finditer(text)]
+    if not frames:
+        return None
+    # у цепочки исключений тип берется у последнего
+    types = [match["type"] for match in exception_line.finditer(text)]
+    return (types[-1] if types else ""), frames
+
+
+def fingerprint(text: str) -> tuple[str, str, str] | None:
+    """
+    Fingerprint hash, exception type and the innermost frame of the
+    traceback. Tracebacks differing only in line numbers, paths and
+    messages of the exception have the same fingerprint /
+    Хеш отпечатка, тип исключения и самый вложенный кадр трассировки.
+    У трассировок, различающихся только номерами строк, путями и
+    сообщениями исключения, один отпечаток
+    """
+    parsed = parse_traceback(text)
+    if parsed is None:
+        return None
+    type_, frames = parsed
+    key = "|".join((type_, *(f"{file}:{function}" for file, function in frames)))
+    file, function = frames[-1]
+    return sha1(key.encode()).hexdigest()[:16], type_, f"{file}:{function}"
+
+
+class ExceptionIndexer():
+
+    """
+    Keeps the exceptions index of a table current: tracebacks of the
+    rows appended after the mark are fingerprinted, occurrences are
+    stored in the exception_rows side table and counts with first and
+    last seen times in the exceptions table, in the current transaction /
+    Поддерживает индекс исключений таблицы актуальным: для трассировок
+    строк, добавленных после отметки, вычисляются отпечатки, появления
+    сохраняются во вспомогательной таблице exception_rows, а количества
+    с временем первого и последнего появления - в таблице exceptions,
+    в текущей транзакции
+    """
+
+    database: SQL
+    tablename: str
+
+    def __init__(self, database: SQL, tablename: str):
+        self.database = database
+        self.tablename = tablename
+        database.create_exceptions()
+
+    def update(self, step: int = None) -> tuple[int, int]:
+        """
+        Indexes the tracebacks after the mark (at most step rowids).
+        Returns the new mark and max rowid of the table /
+        Индексирует трассировки после отметки (не более step rowid).
+        Возвращает новую отметку и максимальный rowid таблицы
+        """
+        source = self.database.exception_source(self.tablename)
+        if source is None:
+            return 0, 0
+        last = self.database.max_rowid(self.tablename) or 0
+        with self.database.transaction():
+            mark = self.database.exception_mark(self.tablename) or 0
+            end = last if step is None else min(last, mark + step)
+            if end > mark:
+                self._index(source, mark, end)
+            self.database.exec(
+                "INSERT OR REPLACE INTO exception_marks (tablename, mark) VALUES (?, ?)",
+                (self.tablename, end))
+        return end, last
+
+    def _index(self, source: tuple[str, str | None], start: int, end: int):
+        traceback, time_ = (quote(name) if name else "NULL" for name in source)
+        chunks = self.database.fetch_chunks(f"""
+            SELECT rowid, {traceback}, {time_} FROM {quote(self.tablename)}
+            WHERE rowid > ? AND rowid <= ? AND {traceback} IS NOT NULL""", (start, end))
+        for rows in chunks:
+            occurrences = []
+            # fingerprint: [тип, место, количество, первое, последнее]
+            groups: dict[str, list] = {}
+            for rowid, text, moment in rows:
+                found = fingerprint(text)
+                if found is None:
+                    continue
+                hash_, type_, location = found
+                occurrences.append((self.tablename, hash_, rowid))
+                group = groups.setdefault(hash_, [type_, location, 0, moment, moment])
+                group[2] += 1
+                if moment is not None:
+                    group[3] = moment if group[3] is None else min(group[3], moment)
+                    group[4] = moment if group[4] is None else max(group[4], moment)
+            self.database.insert_many("exception_rows", ("tablename", "fingerprint", "row"), occurrences)
+            self.database.add_exceptions(self.tablename, ((hash_, *group) for hash_, group in groups.items()))
+
+
+class ExceptionBuilder(background.StepBuilder):
+
+    """
+    Indexes tracebacks of an existing table in background, EXCEPTION_STEP
+    rowids per transaction, continuing from the stored mark /
+    Индексирует трассировки существующей таблицы в фоне, по EXCEPTION_STEP
+    rowid за транзакцию, продолжая с сохраненной отметки
+    """
+
+    label = "exceptions"
+    step = cfg.EXCEPTION_STEP
+
+    def open(self, database: SQL) -> background.updater:
+        return ExceptionIndexer(database, self.tablename).update
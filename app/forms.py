@@ -6,6 +6,8 @@ from .config import GAP
 from . import config as cfg
 from . import gui
 from . import tables
+from . import charts
+from . import rollups
 from . import dynamic
 from .dynamic import global_widget_manager as gwm
 from . import floating
@@ -128,6 +130,13 @@ class MainForm(Form):
 
     table: tables.Table
     nav: tables.TableNav
+    search: widgets.SearchBar
+    rollups: rollups.RollupView
+    chart: charts.ChartView
+    templates: tables.TemplateView
+    exceptions: tables.ExceptionView
+    matches: tables.MatchView
+    stats: tables.StatsView
 
     def __init__(self, window: dynamic.DynamicWindow):
         Form.__init__(self)
@@ -137,13 +146,9 @@ class MainForm(Form):
         gwm.set_style(
             self.table,
             "always",
-            "border: none; outline: none; border-radius: 0px;"
-        )
-        gwm.set_style(
-            self.table,
-            "leave",
-            """background-color: !highlight3!;"""
+            "QTableView { border: none; outline: none; border-radius: 0px; }"
         )
+        gwm.set_style(self.table, "leave", tables.table_stylesheet())
 
         hor = dynamic.DynamicScrollBar()
         self.table.setHorizontalScrollBar(hor)
@@ -152,7 +157,33 @@ class MainForm(Form):
         gwm.set_style(hor, "leave", tables.scrollbar_stylesheet("horizontal"))
 
         self.nav = tables.TableNav()
-        layout.addWidget(self.nav)
-        layout.addWidget(self.table)
+        self.search = widgets.SearchBar()
+        top = shorts.HLayout(None)
+        top.setSpacing(GAP)
+        top.addWidget(self.nav, 1)
+        top.addWidget(self.search)
+        self.rollups = rollups.RollupView()
+        self.rollups.hide()
+        self.chart = charts.ChartView()
+        self.chart.hide()
+        self.templates = tables.TemplateView()
+        self.templates.hide()
+        self.exceptions = tables.ExceptionView()
+        self.exceptions.hide()
+        self.matches = tables.MatchView()
+        self.matches.hide()
+        self.stats = tables.StatsView()
+        self.stats.hide()
+        body = shorts.HLayout(None)
+        body.setSpacing(GAP)
+        body.addWidget(self.table)
+        body.addWidget(self.stats)
+        layout.addLayout(top)
+        layout.addWidget(self.rollups)
+        layout.addWidget(self.chart)
+        layout.addWidget(self.templates)
+        layout.addWidget(self.exceptions)
+        layout.addWidget(self.matches)
+        layout.addLayout(body)
         layout.setContentsMargins(GAP, GAP*2, GAP, GAP)
         layout.setSpacing(GAP)
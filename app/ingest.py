@@ -0,0 +1,904 @@
+import os
+import re
+import gzip
+import lzma
+import mmap
+import time
+import fnmatch
+import tempfile
+import threading
+import zipfile
+import multiprocessing
+from itertools import islice
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Callable, Iterator
+from dataclasses import dataclass
+
+from PyQt6 import QtCore
+from loguru import logger
+
+from . import config as cfg
+from .connector import SQL, ApplicationDatabase, FileState, quote
+from .templates import TemplateMiner
+from .fingerprints import ExceptionIndexer
+
+"""
+Module turning log files into database tables /
+Модуль, превращающий файлы логов в таблицы базы данных
+"""
+
+
+class UnknownFormat(Exception):
+
+    """
+    Raises when no log format matches the file /
+    Вызывается, когда файлу не соответствует ни один формат логов
+    """
+
+
+@dataclass
+class LogFormat():
+
+    name: str
+    # регулярное выражение первой строки записи, группы - столбцы
+    regex: re.Pattern
+    # (имя столбца, тип sqlite)
+    columns: tuple[tuple[str, str]]
+
+    def match(self, line: str) -> re.Match | None:
+        return self.regex.match(line)
+
+
+# поле logging: (столбец, регулярное выражение, тип sqlite)
+logging_fields: dict[str, tuple[str, str, str]] = {
+    "asctime": ("time", r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:,\d{3})?", "TEXT"),
+    "created": ("created", r"\d+(?:\.\d+)?", "REAL"),
+    "relativeCreated": ("relative", r"\d+(?:\.\d+)?", "REAL"),
+    "msecs": ("msecs", r"\d+(?:\.\d+)?", "REAL"),
+    "levelname": ("level", r"[A-Z]+", "TEXT"),
+    "levelno": ("levelno", r"\d+", "INTEGER"),
+    "name": ("logger", r"[^\s:]+", "TEXT"),
+    "module": ("module", r"[^\s:]+", "TEXT"),
+    "filename": ("filename", r"[^\s:]+", "TEXT"),
+    "pathname": ("pathname", r".+?", "TEXT"),
+    "funcName": ("function", r"[^\s:]+", "TEXT"),
+    "lineno": ("line", r"\d+", "INTEGER"),
+    "process": ("process", r"\d+", "INTEGER"),
+    "processName": ("process_name", r".+?", "TEXT"),
+    "thread": ("thread", r"\d+", "INTEGER"),
+    "threadName": ("thread_name", r".+?", "TEXT"),
+    "message": ("message", r".*", "TEXT")
+}
+
+# сжатые ротированные файлы loguru и logrotate
+compressed_extensions = (".gz", ".xz", ".zip")
+log_extensions = (".log", ".txt", *compressed_extensions)
+
+logging_field = re.compile(r"%\((\w+)\)([-#0 +]*)(\d*)(?:\.\d+)?[sdfrixXeEgG]")
+
+
+def from_logging_format(fmt: str, name: str = None) -> LogFormat:
+    """
+    Builds log format from a logging module format string,
+    e.g. "%(asctime)s - %(name)s - %(levelname)s - %(message)s" /
+    Строит формат логов по строке формата модуля logging,
+    например "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    """
+    parts = ["^"]
+    columns = []
+    position = 0
+    for field in logging_field.finditer(fmt):
+        parts.append(re.escape(fmt[position:field.start()].replace("%%", "%")))
+        column, pattern, type_ = logging_fields.get(field[1], (field[1], r".+?", "TEXT"))
+        padded = bool(field[3])
+        # выравнивание по правому краю добавляет пробелы слева
+        if padded and "-" not in field[2]:
+            parts.append(" *")
+        if column in (name_ for name_, _ in columns):
+            parts.append(f"(?:{pattern})")
+        else:
+            parts.append(f"(?P<{column}>{pattern})")
+            columns.append((column, type_))
+        if padded and "-" in field[2]:
+            parts.append(" *")
+        position = field.end()
+    parts.append(re.escape(fmt[position:].replace("%%", "%")))
+    return LogFormat(name or fmt, re.compile("".join(parts)), tuple(columns))
+
+
+loguru_format = LogFormat(
+    "loguru",
+    re.compile(
+        r"^(?P<time>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3}) \| "
+        r"(?P<level>\w+) *\| "
+        r"(?P<logger>[^:]*):(?P<function>[^:]*):(?P<line>\d+) - "
+        r"(?P<message>.*)"),
+    (
+        ("time", "TEXT"),
+        ("level", "TEXT"),
+        ("logger", "TEXT"),
+        ("function", "TEXT"),
+        ("line", "INTEGER"),
+        ("message", "TEXT")
+    )
+)
+
+log_formats: tuple[LogFormat] = (
+    loguru_format,
+    from_logging_format("%(asctime)s - %(name)s - %(levelname)s - %(message)s", "logging"),
+    from_logging_format("%(asctime)s %(levelname)s %(name)s: %(message)s", "logging-short"),
+    from_logging_format("%(levelname)s:%(name)s:%(message)s", "logging-basic")
+)
+
+
+def is_compressed(path: str) -> bool:
+    return path.lower().endswith(compressed_extensions)
+
+
+@contextmanager
+def open_log(path: str) -> Iterator[tuple[BinaryIO, BinaryIO]]:
+    """
+    Opens the log file for binary reading, compressed files are
+    decompressed on the fly with bounded buffers, without a copy on disk.
+    Yields the stream of the log and the underlying file, whose
+    position tells the read share of the file. Of a zip archive
+    the first file is read /
+    Открывает файл логов для чтения в двоичном режиме, сжатые файлы
+    распаковываются на лету буферами ограниченного размера, без копии на диске.
+    Возвращает поток лога и исходный файл, позиция которого показывает
+    прочитанную долю файла. Из zip архива читается первый файл
+    """
+    with open(path, "rb") as raw:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".gz":
+            stream = gzip.GzipFile(fileobj=raw)
+        elif extension == ".xz":
+            stream = lzma.LZMAFile(raw)
+        elif extension == ".zip":
+            with zipfile.ZipFile(raw) as archive:
+                members = [info for info in archive.infolist() if not info.is_dir()]
+                if not members:
+                    raise UnknownFormat(path)
+                stream = archive.open(members[0])
+        else:
+            stream = raw
+        with stream:
+            yield stream, raw
+
+
+def detect_format(path: str, lines: int = 64) -> LogFormat:
+    """
+    Returns the format matching most of the first lines of the file /
+    Возвращает формат, которому соответствует больше всего первых строк файла
+    """
+    with open_log(path) as (file, _):
+        head = [line.decode("utf-8", "replace") for line in islice(file, lines)]
+    scores = {
+        log_format.name: sum(1 for line in head if log_format.match(line))
+        for log_format in log_formats
+    }
+    best = max(log_formats, key=lambda log_format: scores[log_format.name])
+    if not scores[best.name]:
+        raise UnknownFormat(path)
+    return best
+
+
+def read_lines(file: BinaryIO, offset: int = 0) -> Iterator[tuple[str, int]]:
+    """
+    Yields complete lines of the file starting from the byte offset
+    with the offset of their end. The unfinished last line is not read /
+    Возвращает полные строки файла, начиная со смещения в байтах,
+    вместе со смещением их конца. Незаконченная последняя строка не читается
+    """
+    file.seek(offset)
+    while True:
+        lines = file.readlines(cfg.INGEST_READ_SIZE)
+        if not lines:
+            return
+        for line in lines:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            yield line.decode("utf-8", "replace").rstrip("\r\n"), offset
+
+
+def parse_records(
+        lines: Iterator[tuple[str, int]],
+        log_format: LogFormat,
+        final: bool = True) -> Iterator[tuple[tuple[str], int]]:
+
+    """
+    Groups lines into records: (values, traceback) and the offset
+    of the record end. Lines not matching the format continue
+    the previous record (tracebacks, multi-line messages).
+    Lines before the first record are skipped. Unless final,
+    the last record is held back, its lines may be still written /
+    Группирует строки в записи: (значения, traceback) и смещение
+    конца записи. Строки, не соответствующие формату, продолжают
+    предыдущую запись (трассировки, многострочные сообщения).
+    Строки до первой записи пропускаются. Если final ложно,
+    последняя запись не возвращается, ее строки еще могут дописываться
+    """
+    match = log_format.regex.match
+    values = None
+    extra = []
+    end = 0
+    for line, offset in lines:
+        found = match(line)
+        if found:
+            if values is not None:
+                yield (*values, "\n".join(extra) if extra else None), end
+            values = found.groups()
+            extra = []
+        elif values is not None:
+            extra.append(line)
+        end = offset
+    if values is not None and final:
+        yield (*values, "\n".join(extra) if extra else None), end
+
+
+def create_log_table(database: SQL, tablename: str, log_format: LogFormat):
+    columns = ", ".join(f"{quote(name)} {type_}" for name, type_ in log_format.columns)
+    database.exec(f"""
+        CREATE TABLE IF NOT EXISTS {quote(tablename)} (
+            id INTEGER PRIMARY KEY,
+            {columns},
+            traceback TEXT
+        )""")
+    database.create_rollups()
+
+
+def create_offsets_table(database: SQL):
+    database.exec("""
+        CREATE TABLE IF NOT EXISTS ingested_files (
+            path TEXT PRIMARY KEY,
+            tablename TEXT NOT NULL,
+            offset INTEGER NOT NULL
+        )""")
+
+
+def stored_offset(database: SQL, path: str, size: int | None) -> int:
+    """
+    Offset up to which the file is already ingested. Offsets of
+    compressed files are counted in decompressed bytes and their
+    size is not known, so it is given as None /
+    Смещение, до которого файл уже загружен. Смещения сжатых файлов
+    считаются в распакованных байтах, а их размер неизвестен,
+    поэтому он передается как None
+    """
+    row = database.exec(
+        "SELECT offset FROM ingested_files WHERE path = ?", (path, )).fetchone()
+    offset = row[0] if row else 0
+    # файл стал короче загруженной части - он был перезаписан
+    return offset if size is None or offset <= size else 0
+
+
+def store_offset(database: SQL, path: str, tablename: str, offset: int):
+    database.exec(
+        "INSERT OR REPLACE INTO ingested_files (path, tablename, offset) VALUES (?, ?, ?)",
+        (path, tablename, offset))
+
+
+class SideIndexes():
+
+    """
+    Indexes of a table updated in the transaction of its appended rows:
+    rollups, the full-text index (if created), message templates and
+    exceptions (if indexed on loading). Templates and exceptions left out
+    here are indexed later by the background builders from their marks /
+    Индексы таблицы, обновляемые в транзакции добавленных строк:
+    сводки, полнотекстовый индекс (если создан), шаблоны сообщений
+    и исключения (если они индексируются при загрузке). Пропущенные здесь
+    шаблоны и исключения позже индексируют фоновые построители от их отметок
+    """
+
+    database: SQL
+    tablename: str
+    miner: TemplateMiner | None
+    indexer: ExceptionIndexer | None
+
+    def __init__(
+            self,
+            database: SQL,
+            tablename: str,
+            templates: bool = cfg.TEMPLATES_ON_INGEST,
+            exceptions: bool = cfg.EXCEPTIONS_ON_INGEST):
+
+        self.database = database
+        self.tablename = tablename
+        self.miner = TemplateMiner(database, tablename) if templates else None
+        self.indexer = ExceptionIndexer(database, tablename) if exceptions else None
+
+    def update(self):
+        self.database.update_rollups(self.tablename)
+        self.database.update_search(self.tablename)
+        if self.miner:
+            self.miner.update()
+        if self.indexer:
+            self.indexer.update()
+
+
+def write_batches(
+        database: SQL,
+        tablename: str,
+        log_format: LogFormat,
+        records: Iterator[tuple[tuple[str], int]],
+        on_commit: Callable[[int], None] = None) -> Iterator[tuple[int, int]]:
+
+    """
+    Inserts records in batches of INGEST_BATCH_SIZE, one transaction each,
+    side indexes of the table are updated in the same transaction.
+    on_commit(offset) runs inside the transaction of the batch.
+    Yields (inserted rows, offset) after every batch /
+    Вставляет записи пакетами по INGEST_BATCH_SIZE, каждый одной транзакцией,
+    вспомогательные индексы таблицы обновляются в той же транзакции.
+    on_commit(offset) выполняется внутри транзакции пакета.
+    Возвращает (вставлено строк, смещение) после каждого пакета
+    """
+    columns = (*(name for name, _ in log_format.columns), "traceback")
+    indexes = SideIndexes(database, tablename)
+    while batch := tuple(islice(records, cfg.INGEST_BATCH_SIZE)):
+        offset = batch[-1][1]
+        with database.transaction():
+            rows = database.insert_many(tablename, columns, (values for values, _ in batch))
+            indexes.update()
+            if on_commit:
+                on_commit(offset)
+        yield rows, offset
+
+
+@dataclass
+class IngestResult():
+
+    path: str
+    database_path: str
+    tablename: str
+    # добавлено строк таблицы
+    rows: int
+    # смещение, до которого файл загружен
+    offset: int
+    size: int
+
+
+class IngestSignals(QtCore.QObject):
+
+    progress = QtCore.pyqtSignal(object, object)
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+
+class LogIngestor():
+
+    """
+    Streams a log file into a table of the database in batches.
+    Every batch is inserted in one transaction together with the
+    reached byte offset, so an interrupted ingestion resumes
+    from the last committed record /
+    Потоково загружает файл логов в таблицу базы данных пакетами.
+    Каждый пакет вставляется одной транзакцией вместе с достигнутым
+    смещением в байтах, поэтому прерванная загрузка продолжается
+    с последней зафиксированной записи
+    """
+
+    path: str
+    database_path: str
+    log_format: LogFormat | None
+    tablename: str
+    signals: IngestSignals
+
+    def __init__(
+            self,
+            path: str,
+            database_path: str = None,
+            log_format: LogFormat = None,
+            tablename: str = "logs"):
+
+        self.path = os.path.abspath(path)
+        # app.log.gz -> app.db
+        name = os.path.splitext(self.path)[0]
+        name = os.path.splitext(name)[0] if is_compressed(self.path) else name
+        self.database_path = database_path or f"{name}.db"
+        self.log_format = log_format
+        self.tablename = tablename
+        self.signals = IngestSignals()
+        self._stopped = threading.Event()
+
+    def start(self) -> threading.Thread:
+        """
+        Runs ingestion on a background thread, reports through signals /
+        Запускает загрузку в фоновом потоке, сообщает о ходе через сигналы
+        """
+        thread = threading.Thread(target=self._run_reporting, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """
+        Stops ingestion after the current batch /
+        Останавливает загрузку после текущего пакета
+        """
+        self._stopped.set()
+
+    def _run_reporting(self):
+        try:
+            result = self.run()
+        except Exception as error:
+            logger.error(f"ingestion of {self.path} failed: {error}")
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(result)
+
+    def run(self) -> IngestResult:
+        """
+        Ingests the file synchronously /
+        Синхронно загружает файл
+        """
+        log_format = self.log_format or detect_format(self.path)
+        database = SQL(self.database_path, parse=False)
+        try:
+            self._prepare(database, log_format)
+            return self._ingest(database, log_format)
+        finally:
+            database.close()
+
+    def _prepare(self, database: SQL, log_format: LogFormat):
+        create_log_table(database, self.tablename, log_format)
+        create_offsets_table(database)
+
+    def _ingest(self, database: SQL, log_format: LogFormat) -> IngestResult:
+        size = os.path.getsize(self.path)
+        offset = stored_offset(database, self.path, None if is_compressed(self.path) else size)
+        rows = 0
+        with open_log(self.path) as (file, raw):
+            records = parse_records(read_lines(file, offset), log_format)
+            batches = write_batches(
+                database, self.tablename, log_format, records,
+                lambda offset: store_offset(database, self.path, self.tablename, offset))
+            for inserted, offset in batches:
+                rows += inserted
+                self.signals.progress.emit(raw.tell(), size)
+                if self._stopped.is_set():
+                    break
+        return IngestResult(
+            self.path, self.database_path, self.tablename, rows, offset, size)
+
+
+def file_identity(stat: os.stat_result) -> str:
+    return f"{stat.st_dev}:{stat.st_ino}"
+
+
+class FollowSignals(QtCore.QObject):
+
+    started = QtCore.pyqtSignal(str)
+    appended = QtCore.pyqtSignal(str, object, object)
+    failed = QtCore.pyqtSignal(str)
+
+
+class LogFollower():
+
+    """
+    Follows a folder of rotated log files: periodically ingests only
+    the appended bytes into a table of the database.
+    Files are tracked by identity, not by name, so a renamed (rotated)
+    file is read up to its end and the new file from its start.
+    A file shorter than its read position was truncated and is reread.
+    Read positions are kept in the application database /
+    Отслеживает папку с ротируемыми файлами логов: периодически загружает
+    в таблицу базы данных только дописанные байты.
+    Файлы отслеживаются по идентификатору, а не по имени, поэтому
+    переименованный (ротированный) файл дочитывается до конца, а новый
+    читается с начала. Файл короче позиции чтения был усечен и читается заново.
+    Позиции чтения хранятся в базе данных приложения
+    """
+
+    folder: str
+    database_path: str
+    pattern: str
+    log_format: LogFormat | None
+    tablename: str
+    interval: float
+    signals: FollowSignals
+    # таблица создана и о начале сообщено
+    prepared: bool = False
+
+    def __init__(
+            self,
+            folder: str,
+            database_path: str = None,
+            pattern: str = cfg.FOLLOW_PATTERN,
+            log_format: LogFormat = None,
+            tablename: str = "logs",
+            interval: float = cfg.FOLLOW_INTERVAL):
+
+        self.folder = os.path.abspath(folder)
+        self.database_path = database_path or f"{self.folder}.db"
+        self.pattern = pattern
+        self.log_format = log_format
+        self.tablename = tablename
+        self.interval = interval
+        self.signals = FollowSignals()
+        self._stopped = threading.Event()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._run_reporting, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run_reporting(self):
+        try:
+            self.run()
+        except Exception as error:
+            logger.error(f"following of {self.folder} failed: {error}")
+            self.signals.failed.emit(str(error))
+
+    def run(self):
+        """
+        Polls the folder until stopped /
+        Опрашивает папку до остановки
+        """
+        # позиции чтения для удаленной базы данных устарели
+        existed = os.path.exists(self.database_path)
+        database = SQL(self.database_path, parse=False)
+        # WAL не блокирует читателей открытой таблицы на время записи
+        database.exec("PRAGMA journal_mode = WAL")
+        application_database = ApplicationDatabase()
+        states = {
+            state.identity: state
+            for state in application_database.load_followed(self.database_path)
+        } if existed else {}
+        try:
+            while not self._stopped.is_set():
+                if self.poll(database, states):
+                    # позиции сохраняются после фиксации строк: при сбое
+                    # между ними последний пакет может быть загружен повторно
+                    application_database.save_followed(self.database_path, tuple(states.values()))
+                self._stopped.wait(self.interval)
+        finally:
+            database.close()
+            application_database.close()
+
+    def scan(self) -> list[tuple[str, os.stat_result]]:
+        """
+        Log files of the folder, least recently modified first /
+        Файлы логов папки, начиная с давнее всего измененных
+        """
+        files = []
+        for name in fnmatch.filter(os.listdir(self.folder), self.pattern):
+            path = os.path.join(self.folder, name)
+            try:
+                files.append((path, os.stat(path)))
+            except FileNotFoundError:
+                # файл удален ротацией между listdir и stat
+                continue
+        files.sort(key=lambda file: file[1].st_mtime)
+        return files
+
+    def poll(self, database: SQL, states: dict[str, FileState]) -> bool:
+        """
+        Ingests bytes appended since the last poll.
+        Returns whether read positions changed /
+        Загружает байты, дописанные с прошлого опроса.
+        Возвращает, изменились ли позиции чтения
+        """
+        files = self.scan()
+        changed = self._forget_missing(states, files)
+        before = None
+        for number, (path, stat) in enumerate(files):
+            identity = file_identity(stat)
+            state = states.setdefault(identity, FileState(identity, path, 0))
+            changed |= state.path != path
+            state.path = path
+            if stat.st_size < state.offset:
+                state.offset = 0
+            if stat.st_size == state.offset:
+                continue
+            if before is None:
+                before = self._prepare(database, path)
+            # ротированные файлы закончены, активный может дописываться
+            final = number < len(files) - 1 or time.time() - stat.st_mtime > cfg.FOLLOW_SETTLE_TIME
+            changed |= self._read(database, state, final)
+
+        if before is not None:
+            after = database.max_rowid(self.tablename) or 0
+            if after > before:
+                self.signals.appended.emit(self.tablename, before + 1, after)
+        return changed
+
+    def _forget_missing(
+            self,
+            states: dict[str, FileState],
+            files: list[tuple[str, os.stat_result]]) -> bool:
+
+        # удаленные (или сжатые) ротацией файлы больше не отслеживаются
+        present = set(file_identity(stat) for _, stat in files)
+        missing = tuple(identity for identity in states if identity not in present)
+        for identity in missing:
+            del states[identity]
+        return bool(missing)
+
+    def _prepare(self, database: SQL, path: str) -> int:
+        if not self.log_format:
+            self.log_format = detect_format(path)
+        if not self.prepared:
+            create_log_table(database, self.tablename, self.log_format)
+            self.prepared = True
+            self.signals.started.emit(self.tablename)
+        return database.max_rowid(self.tablename) or 0
+
+    def _read(self, database: SQL, state: FileState, final: bool) -> bool:
+        offset = state.offset
+        with open(state.path, "rb") as file:
+            records = parse_records(read_lines(file, state.offset), self.log_format, final)
+            for _, state.offset in write_batches(database, self.tablename, self.log_format, records):
+                pass
+        return state.offset != offset
+
+
+def record_start(data: mmap.mmap, position: int, log_format: LogFormat) -> int:
+    """
+    Offset of the first record start at or after the position
+    (size of the data if there is none) /
+    Смещение первого начала записи в позиции или после нее
+    (размер данных, если его нет)
+    """
+    size = len(data)
+    newline = data.rfind(b"\n", 0, position)
+    start = newline + 1
+    while start < size:
+        end = data.find(b"\n", start)
+        end = size if end < 0 else end
+        if log_format.match(data[start:end].decode("utf-8", "replace")):
+            return start
+        start = end + 1
+    return size
+
+
+def split_chunks(
+        path: str,
+        log_format: LogFormat,
+        offset: int = 0,
+        chunk_size: int = cfg.BULK_CHUNK_SIZE) -> list[tuple[int, int]]:
+
+    """
+    Splits the memory-mapped file from the offset into (start, end)
+    chunks of about chunk_size bytes. Chunks start at record
+    starts, so a traceback is never separated from its record /
+    Делит отображенный в память файл от смещения на части (начало, конец)
+    примерно по chunk_size байт. Части начинаются с начала записи,
+    поэтому трассировка никогда не отделяется от своей записи
+    """
+    size = os.path.getsize(path)
+    if offset >= size:
+        return []
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bounds = [offset]
+        # за концом файла record_start снова нашел бы начало последней записи
+        while bounds[-1] + chunk_size < size:
+            position = record_start(data, bounds[-1] + chunk_size, log_format)
+            if position >= size:
+                break
+            bounds.append(position)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def parse_chunk(
+        path: str,
+        start: int,
+        end: int | None,
+        log_format: LogFormat,
+        chunk_path: str) -> tuple[str, int]:
+
+    """
+    Pool worker: parses the chunk of the file into a separate
+    database and returns its path with the offset of the chunk end.
+    Inserting in the worker keeps the single writer down to a fast
+    INSERT ... SELECT. A compressed file can not be split, its chunk
+    has no end and is read as a stream to the end of the file /
+    Рабочий процесс пула: разбирает часть файла в отдельную
+    базу данных и возвращает ее путь со смещением конца части.
+    Вставка в рабочем процессе оставляет единственному писателю быстрый
+    INSERT ... SELECT. Сжатый файл нельзя разделить, его часть
+    не имеет конца и читается потоком до конца файла
+    """
+    database = SQL(chunk_path, parse=False)
+    database.echo = False
+    # временная база данных, надежность записи не нужна
+    database.exec("PRAGMA journal_mode = OFF")
+    database.exec("PRAGMA synchronous = OFF")
+    create_log_table(database, "logs", log_format)
+    columns = (*(name for name, _ in log_format.columns), "traceback")
+    if end is None:
+        with open_log(path) as (file, _):
+            records = parse_records(read_lines(file, start), log_format)
+            end = start
+            for batch in iter(lambda: tuple(islice(records, cfg.INGEST_BATCH_SIZE)), ()):
+                database.insert_many("logs", columns, (values for values, _ in batch))
+                end = batch[-1][1]
+    else:
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode("utf-8", "replace")
+        lines = text.split("\n")
+        # последняя часть файла может заканчиваться без перевода строки
+        if not lines[-1]:
+            lines.pop()
+        records = parse_records(((line.rstrip("\r"), end) for line in lines), log_format)
+        database.insert_many("logs", columns, (values for values, _ in records))
+    database.close()
+    return chunk_path, end
+
+
+def chunk_weight(path: str, start: int, end: int | None) -> int:
+    """
+    Share of the chunk in the import progress: its size, for
+    a compressed file - the size of the file on disk /
+    Доля части в ходе импорта: ее размер, для сжатого
+    файла - размер файла на диске
+    """
+    return os.path.getsize(path) if end is None else end - start
+
+
+class BulkImporter():
+
+    """
+    Imports many large log files into a table with a process pool.
+    Files are memory-mapped and split into chunks at record starts
+    (compressed files are one chunk each and are decompressed in parallel),
+    the pool parses chunks into temporary databases and the single
+    writer merges them into the table in file order. Every merged
+    chunk is committed together with the reached offset of its file,
+    so an interrupted import resumes from the last merged chunk /
+    Импортирует множество больших файлов логов в таблицу пулом процессов.
+    Файлы отображаются в память и делятся на части по началам записей
+    (сжатые файлы - одна часть каждый, они распаковываются параллельно),
+    пул разбирает части во временные базы данных, а единственный
+    писатель объединяет их в таблицу в порядке файлов. Каждая
+    объединенная часть фиксируется вместе с достигнутым смещением файла,
+    поэтому прерванный импорт продолжается с последней объединенной части
+    """
+
+    paths: tuple[str]
+    database_path: str
+    log_format: LogFormat | None
+    tablename: str
+    processes: int
+    signals: IngestSignals
+
+    def __init__(
+            self,
+            paths: tuple[str],
+            database_path: str = None,
+            log_format: LogFormat = None,
+            tablename: str = "logs",
+            processes: int = cfg.BULK_PROCESSES):
+
+        # ротированные файлы загружаются в хронологическом порядке
+        self.paths = tuple(sorted((os.path.abspath(path) for path in paths), key=os.path.getmtime))
+        folder = os.path.commonpath([os.path.dirname(path) for path in self.paths])
+        self.database_path = database_path or f"{folder}.db"
+        self.log_format = log_format
+        self.tablename = tablename
+        self.processes = processes or os.cpu_count()
+        self.signals = IngestSignals()
+        self._stopped = threading.Event()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._run_reporting, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """
+        Stops the import after the current chunk /
+        Останавливает импорт после текущей части
+        """
+        self._stopped.set()
+
+    def _run_reporting(self):
+        try:
+            result = self.run()
+        except Exception as error:
+            logger.error(f"import into {self.database_path} failed: {error}")
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(result)
+
+    def run(self) -> IngestResult:
+        """
+        Imports the files synchronously /
+        Синхронно импортирует файлы
+        """
+        log_format = self.log_format or detect_format(self.paths[0])
+        database = SQL(self.database_path, parse=False)
+        try:
+            create_log_table(database, self.tablename, log_format)
+            create_offsets_table(database)
+            chunks = self._plan(database, log_format)
+            with tempfile.TemporaryDirectory() as folder:
+                rows = self._import(database, log_format, chunks, folder)
+        finally:
+            database.close()
+        size = sum(chunk_weight(*chunk) for chunk in chunks)
+        return IngestResult(
+            os.path.commonpath(self.paths), self.database_path, self.tablename, rows, size, size)
+
+    def _plan(self, database: SQL, log_format: LogFormat) -> list[tuple[str, int, int | None]]:
+        chunks = []
+        for path in self.paths:
+            if is_compressed(path):
+                chunks.append((path, stored_offset(database, path, None), None))
+                continue
+            offset = stored_offset(database, path, os.path.getsize(path))
+            chunks.extend((path, start, end) for start, end in split_chunks(path, log_format, offset))
+        return chunks
+
+    def _import(
+            self,
+            database: SQL,
+            log_format: LogFormat,
+            chunks: list[tuple[str, int, int | None]],
+            folder: str) -> int:
+
+        total = sum(chunk_weight(*chunk) for chunk in chunks)
+        done = 0
+        rows = 0
+        # spawn: дочерние процессы не наследуют потоки и подключения приложения
+        context = multiprocessing.get_context("spawn")
+        # разбор шаблонов и трассировок в единственном писателе ограничил бы скорость
+        # всего пула, их индексируют фоновые построители после импорта
+        indexes = SideIndexes(database, self.tablename, templates=False, exceptions=False)
+        with ProcessPoolExecutor(self.processes, context) as pool:
+            tasks = iter(enumerate(chunks))
+            pending = deque()
+            while not self._stopped.is_set():
+                # число разобранных, но не объединенных частей ограничено
+                while len(pending) < self.processes * 2 and (task := next(tasks, None)):
+                    number, (path, start, end) = task
+                    chunk_path = os.path.join(folder, f"{number}.db")
+                    future = pool.submit(parse_chunk, path, start, end, log_format, chunk_path)
+                    pending.append((future, path, chunk_weight(path, start, end)))
+                if not pending:
+                    break
+                future, path, weight = pending.popleft()
+                rows += self._merge(database, log_format, *future.result(), path, indexes)
+                done += weight
+                self.signals.progress.emit(done, total)
+            for future, *_ in pending:
+                future.cancel()
+        return rows
+
+    def _merge(
+            self,
+            database: SQL,
+            log_format: LogFormat,
+            chunk_path: str,
+            offset: int,
+            path: str,
+            indexes: SideIndexes) -> int:
+
+        """
+        Appends rows of the chunk database to the table in their order,
+        updates its side indexes and stores the offset of the file
+        in the same transaction /
+        Добавляет строки базы данных части в таблицу в их порядке,
+        обновляет ее вспомогательные индексы и сохраняет смещение
+        файла в той же транзакции
+        """
+        columns = ", ".join(quote(name) for name, _ in (*log_format.columns, ("traceback", None)))
+        database.exec("ATTACH DATABASE ? AS chunk", (chunk_path, ))
+        try:
+            with database.transaction():
+                rows = database.exec(f"""
+                    INSERT INTO {quote(self.tablename)} ({columns})
+                    SELECT {columns} FROM chunk.logs ORDER BY id""").rowcount
+                indexes.update()
+                store_offset(database, path, self.tablename, offset)
+        finally:
+            database.exec("DETACH DATABASE chunk")
+        os.remove(chunk_path)
+        return rows
@@ -0,0 +1,139 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from . import config as cfg
+
+"""
+Module with the executed queries profiler /
+Модуль с профилировщиком выполняемых запросов
+"""
+
+
+@dataclass
+class QueryProfile():
+
+    # время выполнения (unix time)
+    time: float
+    path: str
+    # нормализованный текст запроса
+    shape: str
+    kind: str
+    # длительность в миллисекундах
+    duration: float
+    rows: int | None = None
+    # EXPLAIN QUERY PLAN медленного запроса
+    plan: str | None = None
+
+
+@dataclass
+class ShapeStatistics():
+
+    shape: str
+    kind: str
+    count: int
+    p50: float
+    p95: float
+    p99: float
+    max: float
+    rows: float | None
+    plan: str | None
+
+
+def percentile(durations: list[float], share: float) -> float:
+    """
+    Nearest-rank percentile of sorted durations /
+    Процентиль отсортированных длительностей методом ближайшего ранга
+    """
+    if not durations:
+        return 0.0
+    rank = max(0, min(len(durations) - 1, round(share * len(durations) + 0.5) - 1))
+    return durations[rank]
+
+
+class QueryProfiler():
+
+    """
+    Keeps the last executed queries in a ring buffer and
+    aggregates them by shape (normalized query text).
+    Records not yet saved to the application database
+    are collected separately /
+    Хранит последние выполненные запросы в кольцевом буфере и
+    группирует их по форме (нормализованному тексту запроса).
+    Записи, еще не сохраненные в базу данных приложения,
+    собираются отдельно
+    """
+
+    slow: float
+    records: deque[QueryProfile]
+
+    def __init__(
+            self,
+            size: int = cfg.PROFILER_BUFFER_SIZE,
+            slow: float = cfg.SQL_SLOW_QUERY_MS):
+
+        self.slow = slow
+        self.records = deque(maxlen=size)
+        self._unsaved = deque(maxlen=size)
+        # запросы записываются и из рабочих потоков исполнителя
+        self._lock = threading.Lock()
+
+    def record(self, profile: QueryProfile):
+        with self._lock:
+            self.records.append(profile)
+            self._unsaved.append(profile)
+
+    def restore(self, profiles: list[QueryProfile]):
+        """
+        Fills the buffer with saved profiles without marking them unsaved /
+        Заполняет буфер сохраненными записями, не помечая их несохраненными
+        """
+        with self._lock:
+            self.records.extendleft(reversed(profiles))
+
+    def take_unsaved(self) -> tuple[QueryProfile]:
+        with self._lock:
+            profiles = tuple(self._unsaved)
+            self._unsaved.clear()
+        return profiles
+
+    def statistics(self, path: str = None) -> list[ShapeStatistics]:
+        """
+        Duration percentiles per query shape (of the database file
+        if the path is given), the slowest shapes first /
+        Процентили длительности по формам запросов (файла базы данных,
+        если задан путь), сначала самые медленные
+        """
+        with self._lock:
+            records = tuple(self.records)
+        shapes: dict[str, list[QueryProfile]] = {}
+        for profile in records:
+            if path is None or profile.path == path:
+                shapes.setdefault(profile.shape, []).append(profile)
+
+        result = []
+        for shape, profiles in shapes.items():
+            durations = sorted(profile.duration for profile in profiles)
+            rows = [profile.rows for profile in profiles if profile.rows is not None]
+            planned = [profile for profile in profiles if profile.plan]
+            result.append(ShapeStatistics(
+                shape,
+                profiles[-1].kind,
+                len(profiles),
+                percentile(durations, 0.5),
+                percentile(durations, 0.95),
+                percentile(durations, 0.99),
+                durations[-1],
+                sum(rows) / len(rows) if rows else None,
+                max(planned, key=lambda profile: profile.duration).plan if planned else None))
+
+        result.sort(key=lambda statistics: statistics.p95, reverse=True)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+            self._unsaved.clear()
+
+
+profiler = QueryProfiler()
@@ -0,0 +1,393 @@
+import io
+import json
+import time
+import pickle
+import struct
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from PyQt6 import QtCore
+from loguru import logger
+
+from . import config as cfg
+from .connector import SQL, quote
+from .ingest import loguru_format, create_log_table, SideIndexes
+
+"""
+Module receiving log records over the local network /
+Модуль приема записей логов по локальной сети
+"""
+
+
+# столбцы принятых записей совпадают со столбцами логов loguru
+columns = (*(name for name, _ in loguru_format.columns), "traceback")
+
+# длина кадра logging.handlers.SocketHandler и DatagramHandler
+frame_header = struct.Struct(">L")
+
+
+class RecordUnpickler(pickle.Unpickler):
+
+    """
+    Unpickler of LogRecord frames. SocketHandler pickles a dict of
+    plain values, so any reference to a class is refused
+    and a frame can not run code on unpickling /
+    Распаковщик кадров LogRecord. SocketHandler упаковывает словарь
+    простых значений, поэтому любая ссылка на класс запрещена
+    и кадр не может выполнить код при распаковке
+    """
+
+    def find_class(self, module: str, name: str):
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a log record")
+
+
+def format_time(timestamp: float) -> str:
+    moment = datetime.fromtimestamp(timestamp)
+    return f"{moment:%Y-%m-%d %H:%M:%S}.{moment.microsecond // 1000:03}"
+
+
+def field(record: dict, *names: str) -> Any:
+    """
+    Value of the first present field of the record /
+    Значение первого имеющегося поля записи
+    """
+    for name in names:
+        value = record.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def loguru_row(record: dict, text: str) -> tuple:
+    """
+    Row of a record serialized by loguru (serialize=True) /
+    Строка записи, сериализованной loguru (serialize=True)
+    """
+    exception = record.get("exception")
+    return (
+        format_time(record["time"]["timestamp"]),
+        record["level"]["name"],
+        record["name"],
+        record["function"],
+        record["line"],
+        record["message"],
+        # трассировка есть только в тексте, после первой строки
+        text.rstrip("\n").partition("\n")[2] or None if exception else None)
+
+
+def record_row(record: dict) -> tuple:
+    """
+    Row of a record: LogRecord attributes, loguru serialized
+    record or a JSON object with the table column names /
+    Строка записи: атрибуты LogRecord, запись, сериализованная
+    loguru, или JSON объект с именами столбцов таблицы
+    """
+    if isinstance(record.get("record"), dict):
+        return loguru_row(record["record"], record.get("text", ""))
+    created = field(record, "created")
+    return (
+        format_time(created) if created is not None else field(record, "time", "asctime") or format_time(time.time()),
+        field(record, "levelname", "level"),
+        field(record, "name", "logger"),
+        field(record, "funcName", "function"),
+        field(record, "lineno", "line"),
+        str(field(record, "msg", "message")),
+        field(record, "exc_text", "traceback"))
+
+
+def decode_pickle(frame: bytes) -> tuple:
+    return record_row(RecordUnpickler(io.BytesIO(frame)).load())
+
+
+def decode_json(line: bytes) -> tuple:
+    return record_row(json.loads(line))
+
+
+def split_frames(buffer: bytearray) -> list[bytes]:
+    """
+    Cuts complete length-prefixed pickle frames off the buffer /
+    Отрезает от буфера полные кадры pickle с длиной в начале
+    """
+    frames = []
+    position = 0
+    while len(buffer) - position >= frame_header.size:
+        size, = frame_header.unpack_from(buffer, position)
+        end = position + frame_header.size + size
+        if end > len(buffer):
+            break
+        frames.append(bytes(buffer[position + frame_header.size:end]))
+        position = end
+    del buffer[:position]
+    return frames
+
+
+def split_lines(buffer: bytearray) -> list[bytes]:
+    """
+    Cuts complete lines off the buffer /
+    Отрезает от буфера полные строки
+    """
+    end = buffer.rfind(b"\n") + 1
+    lines = bytes(buffer[:end]).splitlines()
+    del buffer[:end]
+    return [line for line in lines if line.strip()]
+
+
+@dataclass
+class ReceiverStats():
+
+    received: int = 0
+    written: int = 0
+    # записи UDP, не поместившиеся в очередь, и нераспознанные записи
+    dropped: int = 0
+    # сколько раз чтение соединений TCP приостанавливалось переполненной очередью
+    paused: int = 0
+    queued: int = 0
+    connections: int = 0
+
+
+def format_stats(stats: ReceiverStats) -> str:
+    def number(value: int) -> str:
+        return f"{value:,}".replace(",", " ")
+    return (
+        f"Прием: {number(stats.written)} "
+        f"(очередь {number(stats.queued)}, паузы {number(stats.paused)}, потеряно {number(stats.dropped)})")
+
+
+class ReceiverSignals(QtCore.QObject):
+
+    started = QtCore.pyqtSignal(str)
+    appended = QtCore.pyqtSignal(str, object, object)
+    stats = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+
+class StreamProtocol(asyncio.Protocol):
+
+    """
+    TCP connection: pickle frames of SocketHandler or JSON lines,
+    told apart by the first byte /
+    Соединение TCP: кадры pickle SocketHandler или строки JSON,
+    различаемые по первому байту
+    """
+
+    def __init__(self, receiver: "LogReceiver"):
+        self.receiver = receiver
+        self.buffer = bytearray()
+        self.decode = None
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self.receiver.stats.connections += 1
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        if self.decode is None:
+            # строка JSON начинается со скобки, кадр pickle - с длины
+            self.decode = decode_json if self.buffer.lstrip()[:1] == b"{" else decode_pickle
+        split = split_lines if self.decode is decode_json else split_frames
+        self.receiver.push(self.decode, split(self.buffer), self.transport)
+
+    def connection_lost(self, error: Exception | None):
+        self.receiver.stats.connections -= 1
+        self.receiver.paused.discard(self.transport)
+
+
+class DatagramProtocol(asyncio.DatagramProtocol):
+
+    """
+    UDP datagrams: a pickle frame of DatagramHandler or JSON lines.
+    Datagrams can not be paused, records over the queue size are dropped /
+    Датаграммы UDP: кадр pickle DatagramHandler или строки JSON.
+    Датаграммы нельзя приостановить, записи сверх размера очереди теряются
+    """
+
+    def __init__(self, receiver: "LogReceiver"):
+        self.receiver = receiver
+
+    def datagram_received(self, data: bytes, address: tuple):
+        buffer = bytearray(data)
+        if buffer.lstrip()[:1] == b"{":
+            self.receiver.push(decode_json, split_lines(buffer + b"\n"))
+        else:
+            self.receiver.push(decode_pickle, split_frames(buffer))
+
+
+class LogReceiver():
+
+    """
+    Receives log records from logging.handlers.SocketHandler (TCP),
+    DatagramHandler (UDP) and JSON lines on local ports and writes
+    them into a table of the database. Records are written by a single
+    writer thread in batches bounded by size and time. When the queue
+    is full, TCP connections stop being read (the senders wait)
+    and UDP records are dropped /
+    Принимает записи логов от logging.handlers.SocketHandler (TCP),
+    DatagramHandler (UDP) и строки JSON на локальных портах и записывает
+    их в таблицу базы данных. Записи пишет единственный поток записи
+    пакетами, ограниченными по размеру и времени. Когда очередь полна,
+    соединения TCP перестают читаться (отправители ждут),
+    а записи UDP теряются
+    """
+
+    database_path: str
+    tablename: str
+    host: str
+    tcp_port: int
+    udp_port: int
+    batch_size: int
+    batch_interval: float
+    queue_size: int
+    stats: ReceiverStats
+    paused: set[asyncio.Transport]
+    signals: ReceiverSignals
+    thread: threading.Thread = None
+
+    def __init__(
+            self,
+            database_path: str,
+            tablename: str = cfg.RECEIVER_TABLE,
+            host: str = cfg.RECEIVER_HOST,
+            tcp_port: int = cfg.RECEIVER_TCP_PORT,
+            udp_port: int = cfg.RECEIVER_UDP_PORT,
+            batch_size: int = cfg.RECEIVER_BATCH_SIZE,
+            batch_interval: float = cfg.RECEIVER_BATCH_INTERVAL,
+            queue_size: int = cfg.RECEIVER_QUEUE_SIZE):
+
+        self.database_path = database_path
+        self.tablename = tablename
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.queue_size = queue_size
+        self.stats = ReceiverStats()
+        self.paused = set()
+        self.signals = ReceiverSignals()
+        self._rows = deque()
+        self._stopped = threading.Event()
+        self._loop: asyncio.AbstractEventLoop = None
+        self._flush: asyncio.Event = None
+        self._indexes: SideIndexes = None
+
+    def start(self) -> threading.Thread:
+        self.thread = threading.Thread(target=self._run_reporting, daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        """
+        Stops receiving, queued records are written /
+        Останавливает прием, записи из очереди дописываются
+        """
+        self._stopped.set()
+        if self._loop and self._flush:
+            self._loop.call_soon_threadsafe(self._flush.set)
+
+    def _run_reporting(self):
+        try:
+            self.run()
+        except Exception as error:
+            logger.error(f"receiving into {self.database_path} failed: {error}")
+            self.signals.failed.emit(str(error))
+
+    def run(self):
+        """
+        Receives records until stopped /
+        Принимает записи до остановки
+        """
+        asyncio.run(self._serve())
+
+    def push(self, decode, payloads: list[bytes], transport: asyncio.Transport = None):
+        """
+        Queues decoded records. A TCP transport is paused
+        while the queue is full /
+        Ставит в очередь распознанные записи. Транспорт TCP
+        приостанавливается, пока очередь полна
+        """
+        for payload in payloads:
+            if transport is None and len(self._rows) >= self.queue_size:
+                self.stats.dropped += 1
+                continue
+            try:
+                self._rows.append(decode(payload))
+            except Exception:
+                self.stats.dropped += 1
+                continue
+            self.stats.received += 1
+        if len(self._rows) >= self.batch_size:
+            self._flush.set()
+        if transport and len(self._rows) >= self.queue_size and transport not in self.paused:
+            transport.pause_reading()
+            self.paused.add(transport)
+            self.stats.paused += 1
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._flush = asyncio.Event()
+        with ThreadPoolExecutor(1, "receiver-writer") as writer:
+            # подключение к базе данных создается и используется в потоке записи
+            database, last_rowid = await self._loop.run_in_executor(writer, self._open)
+            server = await self._loop.create_server(
+                lambda: StreamProtocol(self), self.host, self.tcp_port)
+            endpoint, _ = await self._loop.create_datagram_endpoint(
+                lambda: DatagramProtocol(self), (self.host, self.udp_port))
+            logger.debug(f"receiving logs on {self.host}:{self.tcp_port}/tcp, {self.udp_port}/udp")
+            self.signals.started.emit(self.tablename)
+            try:
+                await self._write_batches(writer, database, last_rowid)
+            finally:
+                server.close()
+                endpoint.close()
+                await self._loop.run_in_executor(writer, database.close)
+
+    def _open(self) -> tuple[SQL, int]:
+        database = SQL(self.database_path, parse=False)
+        # WAL не блокирует читателей открытой таблицы на время записи
+        database.exec("PRAGMA journal_mode = WAL")
+        create_log_table(database, self.tablename, loguru_format)
+        self._indexes = SideIndexes(database, self.tablename)
+        last_rowid = database.exec(f"SELECT max(id) FROM {quote(self.tablename)}").fetchone()[0]
+        return database, last_rowid or 0
+
+    async def _write_batches(self, writer: ThreadPoolExecutor, database: SQL, last_rowid: int):
+        reported = ReceiverStats()
+        reported_at = 0.0
+        while True:
+            try:
+                await asyncio.wait_for(self._flush.wait(), self.batch_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush.clear()
+            while self._rows:
+                batch = [self._rows.popleft() for _ in range(min(len(self._rows), self.batch_size))]
+                self._resume()
+                # прием продолжается, пока пакет пишется в потоке записи
+                await self._loop.run_in_executor(writer, self._write, database, batch)
+                self.stats.written += len(batch)
+                self.signals.appended.emit(self.tablename, last_rowid + 1, last_rowid + len(batch))
+                last_rowid += len(batch)
+            finished = self._stopped.is_set() and not self._rows
+            stats = replace(self.stats, queued=len(self._rows))
+            if stats != reported and (finished or time.monotonic() - reported_at >= cfg.RECEIVER_STATS_INTERVAL):
+                reported, reported_at = stats, time.monotonic()
+                self.signals.stats.emit(stats)
+            if finished:
+                return
+
+    def _write(self, database: SQL, rows: list[tuple]):
+        with database.transaction():
+            database.insert_many(self.tablename, columns, rows)
+            self._indexes.update()
+
+    def _resume(self):
+        # чтение возобновляется, когда очередь освободилась наполовину
+        if self.paused and len(self._rows) < self.queue_size // 2:
+            for transport in self.paused:
+                transport.resume_reading()
+            self.paused.clear()
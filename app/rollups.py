@@ -0,0 +1,91 @@
+from functools import partial
+
+from . import shorts
+from . import widgets
+from . import tables
+from . import dynamic
+from . import background
+from . import config as cfg
+from .config import GAP
+from .connector import SQL, rollup_granularity
+
+"""
+Module with the background rollups building and the rollups view /
+Модуль с фоновым построением сводок и представлением сводок
+"""
+
+
+granularities: dict[rollup_granularity, str] = {
+    "minute": "Минуты",
+    "hour": "Часы",
+    "day": "Дни"
+}
+
+
+def pivot(rows: list[tuple[str, str, int]]) -> tuple[tuple[str], list[tuple]]:
+    """
+    Turns (bucket, level, count) rows into headers and rows
+    (bucket, total, *counts per level), the most frequent levels first /
+    Превращает строки (интервал, уровень, количество) в заголовки и строки
+    (интервал, всего, *количества по уровням), сначала частые уровни
+    """
+    totals: dict[str, int] = {}
+    buckets: dict[str, dict[str, int]] = {}
+    for bucket, level, count in rows:
+        totals[level] = totals.get(level, 0) + count
+        buckets.setdefault(bucket, {})[level] = count
+    levels = sorted(totals, key=totals.get, reverse=True)
+    result = [
+        (bucket, sum(counts.values()), *(counts.get(level, 0) for level in levels))
+        for bucket, counts in buckets.items()
+    ]
+    return ("Всего", *(level or "-" for level in levels)), result
+
+
+class RollupBuilder(background.StepBuilder):
+
+    """
+    Builds rollups of an existing table in background, ROLLUP_STEP
+    rowids per transaction, continuing from the stored mark /
+    Строит сводки существующей таблицы в фоне, по ROLLUP_STEP
+    rowid за транзакцию, продолжая с сохраненной отметки
+    """
+
+    label = "rollups"
+    step = cfg.ROLLUP_STEP
+
+    def open(self, database: SQL) -> background.updater:
+        database.create_rollups()
+        return partial(database.update_rollups, self.tablename)
+
+
+class RollupView(dynamic.DynamicFrame):
+
+    """
+    Rows counts of the table per time bucket and level, read
+    from the rollups. The granularity is chosen by the buttons above /
+    Количества строк таблицы по интервалам времени и уровням,
+    читаемые из сводок. Интервал выбирается кнопками сверху
+    """
+
+    bar: widgets.OptionBar
+
+    def __init__(self):
+        dynamic.DynamicFrame.__init__(self)
+        self.setFixedHeight(cfg.ROLLUP_VIEW_HEIGHT)
+        self.bar = widgets.OptionBar(granularities, "hour")
+        self.model, self.table = tables.make_table()
+
+        layout = shorts.VLayout(self)
+        layout.setSpacing(GAP)
+        layout.addWidget(self.bar)
+        layout.addWidget(self.table)
+
+    @property
+    def granularity(self) -> rollup_granularity:
+        return self.bar.option
+
+    def load(self, rows: list[tuple[str, str, int]]):
+        headers, rows = pivot(rows)
+        self.model.load(headers, rows)
+        self.table.resizeColumnsToContents()
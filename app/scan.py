@@ -0,0 +1,174 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable
+
+from PyQt6 import QtCore
+from loguru import logger
+
+from . import config as cfg
+from .connector import Reader
+
+"""
+Module with the parallel partitioned table scan: map-reduce
+over rowid ranges on a pool of read-only connections /
+Модуль с параллельным просмотром таблицы по частям: map-reduce
+по диапазонам rowid на пуле подключений только для чтения
+"""
+
+
+# map(подключение, таблица, начало, конец) - частичный результат диапазона rowid (начало, конец]
+mapper = Callable[[Reader, str, int, int], Any]
+# reduce(накопленный результат, частичный результат) - новый накопленный результат
+reducer = Callable[[Any, Any], Any]
+
+# подключение рабочего процесса пула, открывается один раз на процесс
+_reader: Reader | None = None
+
+
+def _open_reader(database_path: str):
+    global _reader
+    _reader = Reader(database_path)
+
+
+def _map_range(map_: mapper, tablename: str, start: int, end: int) -> Any:
+    # выполняется в рабочем процессе пула
+    return map_(_reader, tablename, start, end)
+
+
+class ScanSignals(QtCore.QObject):
+
+    progress = QtCore.pyqtSignal(object, object)
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+
+class ParallelScan():
+
+    """
+    Full table scan split into rowid ranges of SCAN_RANGE_SIZE. The map
+    callback turns a range into a small partial result on a read-only
+    connection of a worker process, the reduce callback folds partial
+    results in the calling thread in completion order, so it must not
+    depend on the order of ranges. Only a few ranges per process are
+    in flight and no process holds more than one range of rows.
+    Both callbacks must be module-level functions (they are pickled) /
+    Полный просмотр таблицы, разделенный на диапазоны rowid по
+    SCAN_RANGE_SIZE. Функция map превращает диапазон в небольшой частичный
+    результат на подключении только для чтения рабочего процесса, функция
+    reduce сворачивает частичные результаты в вызывающем потоке в порядке
+    завершения, поэтому не должна зависеть от порядка диапазонов. Одновременно
+    обрабатывается лишь несколько диапазонов на процесс, и ни один процесс
+    не держит больше одного диапазона строк. Обе функции должны быть
+    функциями уровня модуля (они сериализуются)
+    """
+
+    database_path: str
+    tablename: str
+    map_: mapper
+    reduce_: reducer
+    initial: Any
+    processes: int
+    range_size: int
+    signals: ScanSignals
+
+    def __init__(
+            self,
+            database_path: str,
+            tablename: str,
+            map_: mapper,
+            reduce_: reducer,
+            initial: Any = None,
+            processes: int = cfg.SCAN_PROCESSES,
+            range_size: int = cfg.SCAN_RANGE_SIZE):
+
+        self.database_path = database_path
+        self.tablename = tablename
+        self.map_ = map_
+        self.reduce_ = reduce_
+        self.initial = initial
+        self.processes = processes or os.cpu_count()
+        self.range_size = range_size
+        self.signals = ScanSignals()
+        self._stopped = threading.Event()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._run_reporting, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """
+        Stops the scan after the ranges in progress /
+        Останавливает просмотр после обрабатываемых диапазонов
+        """
+        self._stopped.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped.is_set()
+
+    def _run_reporting(self):
+        try:
+            result = self.run()
+        except Exception as error:
+            logger.error(f"scan of {self.tablename} failed: {error}")
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(result)
+
+    def run(self) -> Any:
+        """
+        Scans the table synchronously and returns the reduced result /
+        Синхронно просматривает таблицу и возвращает свернутый результат
+        """
+        database = Reader(self.database_path)
+        try:
+            ranges = database.rowid_ranges(self.tablename, self.range_size)
+        finally:
+            database.close()
+        # запуск процессов дороже просмотра одного диапазона
+        if len(ranges) <= 1 or self.processes == 1:
+            return self._run_here(ranges)
+        return self._run_pool(ranges)
+
+    def _run_here(self, ranges: list[tuple[int, int]]) -> Any:
+        reader = Reader(self.database_path)
+        try:
+            result, done, total = self.initial, 0, self._total(ranges)
+            for start, end in ranges:
+                if self._stopped.is_set():
+                    break
+                result = self.reduce_(result, self.map_(reader, self.tablename, start, end))
+                done += end - start
+                self.signals.progress.emit(done, total)
+        finally:
+            reader.close()
+        return result
+
+    def _run_pool(self, ranges: list[tuple[int, int]]) -> Any:
+        result, done, total = self.initial, 0, self._total(ranges)
+        tasks = iter(ranges)
+        pending: dict[Future, int] = {}
+        # spawn: дочерние процессы не наследуют потоки и подключения приложения
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.processes, context, _open_reader, (self.database_path, )) as pool:
+            while not self._stopped.is_set():
+                # число диапазонов в работе ограничено, частичные результаты не копятся
+                while len(pending) < self.processes * 2 and (task := next(tasks, None)):
+                    start, end = task
+                    pending[pool.submit(_map_range, self.map_, self.tablename, start, end)] = end - start
+                if not pending:
+                    break
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    result = self.reduce_(result, future.result())
+                    done += pending.pop(future)
+                self.signals.progress.emit(done, total)
+            for future in pending:
+                future.cancel()
+        return result
+
+    def _total(self, ranges: list[tuple[int, int]]) -> int:
+        return ranges[-1][1] - ranges[0][0] if ranges else 0
@@ -0,0 +1,99 @@
+from functools import partial
+
+from PyQt6 import QtCore
+
+from . import background
+from . import config as cfg
+from .connector import SQL, Reader
+
+"""
+Module with the background full-text index building, the text
+search and the regular expression scan /
+Модуль с фоновым построением полнотекстового индекса, поиском
+текста и просмотром регулярным выражением
+"""
+
+
+def find_next(database: SQL, tablename: str, text: str, after: int | None) -> int | None:
+    """
+    Rowid of the next row containing the text after the given one,
+    continuing from the start of the table after the last match /
+    Rowid следующей строки после данной, содержащей текст,
+    после последнего совпадения поиск продолжается с начала таблицы
+    """
+    after = after or 0
+    rowid = database.find_text(tablename, text, after)
+    if rowid is None and after:
+        rowid = database.find_text(tablename, text, 0)
+    return rowid
+
+
+class SearchBuilder(background.StepBuilder):
+
+    """
+    Builds the full-text index of an existing table in background,
+    SEARCH_STEP rowids per transaction, continuing from the stored mark /
+    Строит полнотекстовый индекс существующей таблицы в фоне,
+    по SEARCH_STEP rowid за транзакцию, продолжая с сохраненной отметки
+    """
+
+    label = "search index"
+    step = cfg.SEARCH_STEP
+
+    def open(self, database: SQL) -> background.updater | None:
+        columns = database.search_source(self.tablename)
+        if columns is None:
+            return None
+        database.create_search(self.tablename, columns)
+        return partial(database.update_search, self.tablename)
+
+
+class RegexSignals(background.TaskSignals):
+
+    # столбцы и найденные строки (rowid, *столбцы) очередного участка
+    found = QtCore.pyqtSignal(object, object)
+
+
+class RegexScanner(background.TableTask):
+
+    """
+    Scans text columns of a table with a regular expression in
+    background on its own connection, REGEXP_STEP rowids per query.
+    Matches of every range are reported as soon as it is scanned,
+    the scan stops between ranges when cancelled or when
+    REGEXP_MATCH_LIMIT rows are found /
+    Просматривает текстовые столбцы таблицы регулярным выражением
+    в фоне на отдельном подключении, по REGEXP_STEP rowid за запрос.
+    Совпадения каждого участка сообщаются сразу после его просмотра,
+    просмотр останавливается между участками при отмене или
+    когда найдено REGEXP_MATCH_LIMIT строк
+    """
+
+    label = "regexp scan"
+    signals_type = RegexSignals
+    pattern: str
+    step: int
+    signals: RegexSignals
+
+    def __init__(self, database_path: str, tablename: str, pattern: str, step: int = cfg.REGEXP_STEP):
+        background.TableTask.__init__(self, database_path, tablename)
+        self.pattern = pattern
+        self.step = step
+
+    def run(self):
+        database = Reader(self.database_path)
+        try:
+            columns = database.search_source(self.tablename) or ()
+            last = database.max_rowid(self.tablename) or 0
+            mark, found = 0, 0
+            while mark < last and found < cfg.REGEXP_MATCH_LIMIT and not self._stopped.is_set():
+                end = min(last, mark + self.step)
+                rows = database.regexp_rows(self.tablename, self.pattern, mark, end)
+                if rows:
+                    rows = rows[:cfg.REGEXP_MATCH_LIMIT - found]
+                    found += len(rows)
+                    self.signals.found.emit(columns, rows)
+                mark = end
+                self.signals.progress.emit(mark, last)
+        finally:
+            database.close()
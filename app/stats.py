@@ -0,0 +1,343 @@
+import json
+import heapq
+from math import log
+from hashlib import blake2b
+from functools import partial
+from dataclasses import dataclass, asdict
+from typing import Any
+
+from PyQt6 import QtCore
+
+from . import config as cfg
+from .connector import Reader, quote, file_state
+from .scan import ParallelScan
+from .background import TableTask
+
+"""
+Module with the background column statistics: null ratio, min/max,
+top values, approximate distinct count and numeric histograms /
+Модуль с фоновой статистикой столбцов: доля пустых значений,
+минимум и максимум, частые значения, приблизительное количество
+различных значений и гистограммы числовых значений
+"""
+
+
+class HyperLogLog():
+
+    """
+    Approximate distinct count in 2^precision bytes of registers,
+    the error is about 1.04 / sqrt(2^precision). Sketches of parts
+    of a table merge into the sketch of the whole table /
+    Приблизительное количество различных значений в 2^precision байт
+    регистров, погрешность около 1.04 / sqrt(2^precision). Наброски
+    частей таблицы объединяются в набросок всей таблицы
+    """
+
+    precision: int
+    registers: bytearray
+
+    def __init__(self, precision: int = cfg.STATS_HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: Any):
+        # repr различает 1 и "1", как и sqlite
+        hash_ = int.from_bytes(blake2b(repr(value).encode(), digest_size=8).digest(), "big")
+        bits = 64 - self.precision
+        index = hash_ >> bits
+        rank = bits - (hash_ & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # на малых количествах точнее линейный подсчет по пустым регистрам
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * log(size / zeros)
+        return round(estimate)
+
+
+def order_key(value: Any) -> tuple[int, Any]:
+    # порядок значений разных типов, как в sqlite: числа, текст, blob
+    if isinstance(value, (int, float)):
+        return 0, value
+    return (1, value) if isinstance(value, str) else (2, value)
+
+
+def displayable(value: Any) -> Any:
+    # значения сохраняются в JSON, blob заменяется коротким описанием
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > cfg.STATS_VALUE_LENGTH:
+        return value[:cfg.STATS_VALUE_LENGTH] + "…"
+    return value
+
+
+class ColumnProfile():
+
+    """
+    Partial statistics of a column over some rowid ranges /
+    Частичная статистика столбца по нескольким диапазонам rowid
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.nulls = 0
+        self.minimum = None
+        self.maximum = None
+        self.top: list[tuple[int, Any]] = []
+        self.sketch = HyperLogLog()
+
+    def merge(self, other: "ColumnProfile"):
+        self.rows += other.rows
+        self.nulls += other.nulls
+        values = [value for value in (self.minimum, other.minimum) if value is not None]
+        self.minimum = min(values, key=order_key) if values else None
+        values = [value for value in (self.maximum, other.maximum) if value is not None]
+        self.maximum = max(values, key=order_key) if values else None
+        # частые значения приблизительны: значение, не попавшее в частые ни одного диапазона, теряется
+        counts: dict[Any, int] = {}
+        for count, value in (*self.top, *other.top):
+            counts[value] = counts.get(value, 0) + count
+        self.top = heapq.nlargest(
+            cfg.STATS_TOP_CANDIDATES, ((count, value) for value, count in counts.items()), key=lambda item: item[0])
+        self.sketch.merge(other.sketch)
+
+
+def profile_range(
+        columns: tuple[str],
+        reader: Reader,
+        tablename: str,
+        start: int,
+        end: int) -> dict[str, ColumnProfile]:
+
+    """
+    Scan map: counts, nulls and min/max of the columns of the rowid range
+    by one aggregate query, distinct values with their counts by one
+    grouping query per column. Python sees only distinct values /
+    Функция map просмотра: количества, пустые значения и минимум/максимум
+    столбцов диапазона rowid одним агрегирующим запросом, различные
+    значения с количествами - одним группирующим запросом на столбец.
+    Python обрабатывает только различные значения
+    """
+    table = quote(tablename)
+    aggregates = ", ".join(f"count({quote(name)}), min({quote(name)}), max({quote(name)})" for name in columns)
+    rows, *values = reader.exec(
+        f"SELECT count(*), {aggregates} FROM {table} WHERE rowid > ? AND rowid <= ?", (start, end)).fetchone()
+    profiles = {}
+    for number, name in enumerate(columns):
+        profile = profiles[name] = ColumnProfile()
+        count, profile.minimum, profile.maximum = values[number * 3:number * 3 + 3]
+        profile.rows, profile.nulls = rows, rows - count
+        groups = reader.exec(f"""
+            SELECT {quote(name)}, count(*) FROM {table}
+            WHERE rowid > ? AND rowid <= ? AND {quote(name)} IS NOT NULL
+            GROUP BY 1""", (start, end))
+        top = []
+        for value, count in groups:
+            profile.sketch.add(value)
+            top.append((count, value))
+        profile.top = heapq.nlargest(cfg.STATS_TOP_CANDIDATES, top, key=lambda item: item[0])
+    return profiles
+
+
+def merge_profiles(total: dict[str, ColumnProfile], part: dict[str, ColumnProfile]) -> dict[str, ColumnProfile]:
+    for name, profile in part.items():
+        if name in total:
+            total[name].merge(profile)
+        else:
+            total[name] = profile
+    return total
+
+
+def histogram_range(
+        bounds: dict[str, tuple[float, float]],
+        reader: Reader,
+        tablename: str,
+        start: int,
+        end: int) -> dict[str, list[int]]:
+
+    """
+    Scan map: counts of the numeric values of the rowid range
+    in STATS_HISTOGRAM_BINS equal bins between the bounds /
+    Функция map просмотра: количества числовых значений диапазона
+    rowid в STATS_HISTOGRAM_BINS равных интервалах между границами
+    """
+    bins = cfg.STATS_HISTOGRAM_BINS
+    histograms = {}
+    for name, (low, high) in bounds.items():
+        histogram = histograms[name] = [0] * bins
+        scale = bins / (high - low) if high > low else 0
+        rows = reader.exec(f"""
+            SELECT min(CAST(({quote(name)} - ?) * ? AS INTEGER), ?), count(*) FROM {quote(tablename)}
+            WHERE rowid > ? AND rowid <= ? AND typeof({quote(name)}) IN ('integer', 'real')
+            GROUP BY 1""", (low, scale, bins - 1, start, end))
+        for number, count in rows:
+            histogram[number] += count
+    return histograms
+
+
+def merge_histograms(total: dict[str, list[int]], part: dict[str, list[int]]) -> dict[str, list[int]]:
+    for name, histogram in part.items():
+        total[name] = list(map(sum, zip(total[name], histogram))) if name in total else histogram
+    return total
+
+
+@dataclass
+class ColumnStats():
+
+    name: str
+    rows: int
+    nulls: int
+    minimum: Any
+    maximum: Any
+    distinct: int
+    # (значение, количество), сначала самые частые
+    top: list[tuple[Any, int]]
+    # количества в равных интервалах между минимумом и максимумом числового столбца
+    histogram: list[int] | None = None
+
+    @property
+    def null_ratio(self) -> float:
+        return self.nulls / self.rows if self.rows else 0.0
+
+    @property
+    def numeric(self) -> bool:
+        return isinstance(self.minimum, (int, float)) and isinstance(self.maximum, (int, float))
+
+    @classmethod
+    def from_profile(cls, name: str, profile: ColumnProfile, histogram: list[int] = None) -> "ColumnStats":
+        top = [(displayable(value), count) for count, value in profile.top[:cfg.STATS_TOP_SIZE] if count > 1]
+        return cls(
+            name,
+            profile.rows,
+            profile.nulls,
+            displayable(profile.minimum),
+            displayable(profile.maximum),
+            # различных значений не больше, чем непустых
+            min(profile.sketch.count(), profile.rows - profile.nulls),
+            top,
+            histogram)
+
+
+def dump_stats(stats: list[ColumnStats]) -> str:
+    return json.dumps([asdict(column) for column in stats], ensure_ascii=False)
+
+
+def load_stats(text: str) -> list[ColumnStats]:
+    stats = [ColumnStats(**column) for column in json.loads(text)]
+    for column in stats:
+        column.top = [tuple(item) for item in column.top]
+    return stats
+
+
+def sparkline(histogram: list[int]) -> str:
+    """
+    Histogram as a line of block characters /
+    Гистограмма в виде строки блочных символов
+    """
+    blocks = " ▁▂▃▄▅▆▇█"
+    peak = max(histogram) if histogram else 0
+    if not peak:
+        return ""
+    return "".join(blocks[-(-count * (len(blocks) - 1) // peak)] for count in histogram)
+
+
+def format_value(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return "" if value is None else str(value)
+
+
+def describe(column: ColumnStats) -> str:
+    """
+    Multiline summary of the column statistics for the header tooltip /
+    Многострочная сводка статистики столбца для подсказки заголовка
+    """
+    lines = [
+        f"Пустые: {column.null_ratio:.1%}",
+        f"Различных: ~{column.distinct:,}".replace(",", " "),
+        f"Минимум: {format_value(column.minimum)}",
+        f"Максимум: {format_value(column.maximum)}",
+    ]
+    if column.histogram:
+        lines.append(f"Гистограмма: {sparkline(column.histogram)}")
+    lines.extend(f"{count:>8} × {format_value(value)}" for value, count in column.top[:cfg.STATS_TOOLTIP_TOP])
+    return "\n".join(lines)
+
+
+class StatsSignals(QtCore.QObject):
+
+    progress = QtCore.pyqtSignal(object, object)
+    # таблица, состояние файла базы данных на начало подсчета и статистика
+    finished = QtCore.pyqtSignal(str, object, object)
+    failed = QtCore.pyqtSignal(str)
+
+
+class StatsBuilder(TableTask):
+
+    """
+    Computes statistics of all columns of a table in background by two
+    parallel scans: the first one profiles the columns, the second one
+    fills histograms of the numeric ones between their min and max /
+    Вычисляет статистику всех столбцов таблицы в фоне двумя параллельными
+    просмотрами: первый собирает профили столбцов, второй заполняет
+    гистограммы числовых столбцов между их минимумом и максимумом
+    """
+
+    label = "statistics"
+    signals_type = StatsSignals
+    signals: StatsSignals
+    _scan: ParallelScan | None = None
+
+    def stop(self):
+        TableTask.stop(self)
+        if self._scan:
+            self._scan.stop()
+
+    def report(self, result: tuple[str, list[ColumnStats]] | None):
+        if result is not None:
+            self.signals.finished.emit(self.tablename, *result)
+
+    def run(self) -> tuple[str, list[ColumnStats]] | None:
+        """
+        Returns the state of the database file at the start (see
+        connector.file_state) and the statistics, None if the table
+        can not be scanned or the builder was stopped /
+        Возвращает состояние файла базы данных на начало (см.
+        connector.file_state) и статистику, None, если таблицу нельзя
+        просмотреть или подсчет остановлен
+        """
+        # запись во время просмотра меняет состояние, и статистика пересчитается
+        state = file_state(self.database_path)
+        database = Reader(self.database_path)
+        try:
+            columns = database.scan_columns(self.tablename)
+        finally:
+            database.close()
+        if not columns:
+            return None
+        profiles = self._scan_pass(partial(profile_range, columns), merge_profiles, 0)
+        bounds = {
+            name: (profile.minimum, profile.maximum) for name, profile in profiles.items()
+            if isinstance(profile.minimum, (int, float)) and isinstance(profile.maximum, (int, float))
+        }
+        histograms = self._scan_pass(partial(histogram_range, bounds), merge_histograms, 1) if bounds else {}
+        if self._stopped.is_set():
+            return None
+        return state, [ColumnStats.from_profile(name, profiles[name], histograms.get(name)) for name in columns]
+
+    def _scan_pass(self, map_: partial, reduce_: Any, number: int) -> dict:
+        if self._stopped.is_set():
+            return {}
+        self._scan = ParallelScan(self.database_path, self.tablename, map_, reduce_, {})
+        # ход двух проходов складывается в один
+        self._scan.signals.progress.connect(
+            lambda done, total: self.signals.progress.emit(done + number * total, total * 2))
+        return self._scan.run()
@@ -1,6 +1,6 @@
-from typing import Any, Literal
+from typing import Any, Callable, Literal
 
-from PyQt6 import QtCore
+from PyQt6 import QtCore, QtWidgets
 from loguru import logger
 
 from . import widgets
@@ -8,6 +8,9 @@ from . import config as cfg
 from . import shorts
 from . import gui
 from . import connector
+from . import cache
+from . import stats
+from .executor import QueryExecutor
 from .dynamic import global_widget_manager as gwm
 from . import dynamic
 from .floating import Floating
@@ -58,8 +61,11 @@ class TableNav(widgets.RadioGroup):
     виджет, обеспечивающий навигацию по таблицам базы данных
     """
 
+    tablenames: list[str]
+
     def __init__(self):
         widgets.RadioGroup.__init__(self, "h", True)
+        self.tablenames = []
         self.setFixedHeight(cfg.HEAD_FONTSIZE + cfg.GAP*2)
         self.area.layout().setSpacing(cfg.GAP*2)
         self.setContentsMargins(cfg.GAP, 0, cfg.GAP, 0)
@@ -101,161 +107,514 @@ class TableNav(widgets.RadioGroup):
     def fill(self, tablenames: tuple[str]):
 
         self.drop_radios()
+        self.tablenames = list(tablenames)
         self.radios = list(self._make_radio(name) for name in tablenames)
         self.add_radios(*self.radios)
 
+    def set_lenght(self, tablename: str, lenght: str):
+        """
+        Shows rows count next to the table name /
+        Показывает количество строк рядом с именем таблицы
+        """
+        if tablename not in self.tablenames:
+            return
+        radio = self.radios[self.tablenames.index(tablename)]
+        text = f"{tablename} ({lenght})" if lenght else tablename
+        for button in radio.buttons.values():
+            button.setText(text)
 
-class TableCell(dynamic.DynamicButton):
 
-    full_text: str | None
+CELL_TEXT_LIMIT = 100
 
-    def __init__(
-            self,
-            text: str,
-            font: gui.Font):
-
-        visible_text = text[:100] if len(text) >= 100 else text
-        self.full_text = text if visible_text != text else None
-        dynamic.DynamicButton.__init__(self)
-        self.setText(visible_text)
-        self.setFont(font)
-        self.dont_translate = True
-        self.setSizePolicy(shorts.RowPolicy())
-
-        gwm.add_widget(self)
-        gwm.set_style(
-            self,
-            "always",
-            f"""
-                border-radius: 0px;
-                border: none;
-                outline: none;
-                padding: {cfg.GAP}px;
-                text-align: left;
-            """
-        )
-        gwm.set_style(
-            self,
-            "leave",
-            "background-color: !back!; color: !fore!;"
-        )
 
+def table_stylesheet() -> str:
+    return """
+    QTableView {
+        background-color: !highlight3!;
+        color: !fore!;
+        gridline-color: !highlight3!;
+    }
+    QTableView::item {
+        background-color: !back!;
+        color: !fore!;
+        padding: %spx;
+    }
+    QHeaderView {
+        background-color: !highlight3!;
+    }
+    QHeaderView::section {
+        background-color: !back!;
+        color: !fore!;
+        border: none;
+        padding: %spx;
+    }
+    QTableCornerButton::section {
+        background-color: !back!;
+        border: none;
+    }
+""" % (
+        cfg.GAP,
+        cfg.GAP
+    )
 
-class TableRegularCell(TableCell):
 
-    def __init__(self, text: str):
-        TableCell.__init__(self, text, gui.mono_family.font())
+class TableModel(QtCore.QAbstractTableModel):
 
+    """
+    Model holding the visible page of a database table.
+    Rows are stored as (rowid, *values) tuples /
+    Модель, хранящая видимую страницу таблицы базы данных.
+    Строки хранятся в виде кортежей (rowid, *значения)
+    """
 
-class TableHeaderCell(TableCell):
+    headers: tuple[str]
+    rows: tuple[tuple[Any]]
+    # подсказки заголовков по именам столбцов
+    tooltips: dict[str, str]
+    font: gui.Font
+    header_font: gui.Font
 
-    def __init__(self, text: str):
-        TableCell.__init__(self, text, gui.mono_family.font(weight=700))
+    def __init__(self):
+        QtCore.QAbstractTableModel.__init__(self)
+        self.headers = ()
+        self.rows = ()
+        self.tooltips = {}
+        # шрифты создаются один раз на модель, а не на каждую ячейку
+        self.font = gui.mono_family.font()
+        self.header_font = gui.mono_family.font(weight=700)
+
+    def load(self, headers: tuple[str], rows: tuple[tuple[Any]]):
+        self.beginResetModel()
+        self.headers = tuple(headers)
+        self.rows = tuple(rows)
+        self.endResetModel()
+
+    def append(self, rows: tuple[tuple[Any]]):
+        if not rows:
+            return
+        # добавленные строки вставляются без сброса модели и прокрутки
+        self.beginInsertRows(QtCore.QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+        self.rows = self.rows + tuple(rows)
+        self.endInsertRows()
+
+    def fill(self, rows: tuple[tuple[Any]]):
+        if len(rows) != len(self.rows):
+            return self.load(self.headers, rows)
+        # форма страницы не изменилась - перерисовываются только значения
+        self.rows = tuple(rows)
+        if not self.rows or not self.headers:
+            return
+        self.dataChanged.emit(
+            self.index(0, 0),
+            self.index(len(self.rows) - 1, len(self.headers) - 1))
+        self.headerDataChanged.emit(
+            QtCore.Qt.Orientation.Vertical, 0, len(self.rows) - 1)
+
+    def set_tooltips(self, tooltips: dict[str, str]):
+        self.tooltips = tooltips
+        if self.headers:
+            self.headerDataChanged.emit(QtCore.Qt.Orientation.Horizontal, 0, len(self.headers) - 1)
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.headers)
+
+    def value(self, index: QtCore.QModelIndex) -> str:
+        return str(self.rows[index.row()][index.column() + 1])
+
+    def full_text(self, index: QtCore.QModelIndex) -> str | None:
+        """
+        Returns cell text if it does not fit into the cell /
+        Возвращает текст ячейки, если он не помещается в ячейку
+        """
+        if not index.isValid():
+            return None
+        text = self.value(index)
+        return text if len(text) > CELL_TEXT_LIMIT else None
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            return self.value(index)[:CELL_TEXT_LIMIT]
+        if role == QtCore.Qt.ItemDataRole.FontRole:
+            return self.font
+        return None
+
+    def headerData(
+            self,
+            section: int,
+            orientation: QtCore.Qt.Orientation,
+            role: int = QtCore.Qt.ItemDataRole.DisplayRole) -> Any:
+
+        if role == QtCore.Qt.ItemDataRole.FontRole:
+            return self.header_font
+        if role == QtCore.Qt.ItemDataRole.ToolTipRole and orientation == QtCore.Qt.Orientation.Horizontal:
+            return self.tooltips.get(self.headers[section])
+        if role != QtCore.Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Orientation.Horizontal:
+            return self.headers[section]
+        key = self.rows[section][0]
+        if isinstance(key, tuple):
+            return ", ".join(str(value) for value in key)
+        return str(key)
+
+
+def make_table() -> tuple[TableModel, dynamic.DynamicTableView]:
+    """
+    Model and borderless table of a view next to the main table /
+    Модель и таблица без рамки для представления рядом с основной таблицей
+    """
+    model = TableModel()
+    table = dynamic.DynamicTableView()
+    table.setModel(model)
+    table.setWordWrap(False)
+    gwm.add_widget(table)
+    gwm.set_style(
+        table,
+        "always",
+        "QTableView { border: none; outline: none; border-radius: 0px; }"
+    )
+    gwm.set_style(table, "leave", table_stylesheet())
+    return model, table
 
 
-class Table(widgets.HScrollArea):
+class Table(dynamic.DynamicTableView):
 
     """
-    Table widget. Can be connected directly to connector.SQL /
-    Виджет таблицы. Может быть подключен напрямую к connector.SQL
+    Table widget. Can be connected directly to connector.SQL.
+    Only visible cells are painted, no widget is created per cell /
+    Виджет таблицы. Может быть подключен напрямую к connector.SQL.
+    Отрисовываются только видимые ячейки, виджеты для ячеек не создаются
     """
 
     database: connector.SQL = None
     table: connector.Table = None
-    cells: list[list[TableRegularCell]]
+    row_window: connector.RowWindow = None
+    page_cache: cache.PageCache = None
+    executor: QueryExecutor = None
+    pending_step: int = 0
+    table_model: TableModel
     floating: Floating
+    page_size: int = 20
 
     def __init__(self, window: dynamic.DynamicWindow):
-        widgets.HScrollArea.__init__(self)
+        dynamic.DynamicTableView.__init__(self)
         self.floating = Floating(window)
-        layout = shorts.GLayout(self.area)
-        layout.setSpacing(1)
-        layout.setContentsMargins(1, 1, 1, 1)
-        self.cells = []
+        self.table_model = TableModel()
+        self.setModel(self.table_model)
+
+        self.setSizePolicy(shorts.ExpandingPolicy())
+        self.setMouseTracking(True)
+        self.setWordWrap(False)
+        self.setFocusPolicy(QtCore.Qt.FocusPolicy.NoFocus)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.NoSelection)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setHorizontalScrollMode(QtWidgets.QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarPolicy.ScrollBarAsNeeded)
 
+        hheader = self.horizontalHeader()
+        hheader.setHighlightSections(False)
+        hheader.setStretchLastSection(True)
+        hheader.setDefaultAlignment(QtCore.Qt.AlignmentFlag.AlignLeft)
+        vheader = self.verticalHeader()
+        vheader.setHighlightSections(False)
+        vheader.setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.Fixed)
+
+        self.entered.connect(self._cell_hovered)
+
         gwm.add_shortcut(self.up, "Up")
         gwm.add_shortcut(self.down, "Down")
         gwm.add_shortcut(self.start, "Ctrl+Up")
         gwm.add_shortcut(self.end, "Ctrl+Down")
 
-        self.hspacer = shorts.ExpandingSpacer()
-        self.vspacer = shorts.ExpandingSpacer()
-
     def up(self):
-        rowid = self.get_first_rowid()-1
-        self.scroll_table(rowid if rowid >= 1 else 1)
+        self._scroll(-1)
 
     def down(self):
-        self.scroll_table(self.get_first_rowid()+1)
+        self._scroll(1)
 
     def end(self):
-        self.scroll_table(-1)
+        self._request(lambda window: window.last())
 
     def start(self):
-        self.scroll_table(1)
-
-    def connect(self, connector: connector.SQL):
+        self._request(lambda window: window.first())
+
+    def seek(self, key: Any):
+        """
+        Shows the page starting at the first row which key is not less than key /
+        Показывает страницу, начинающуюся с первой строки с ключом не меньше key
+        """
+        self._request(lambda window: window.seek(key))
+
+    def connect(self, connector: connector.SQL, executor: QueryExecutor):
+        if self.page_cache:
+            self.page_cache.close()
         self.database = connector
+        self.executor = executor
+        self.page_cache = cache.PageCache(connector, executor)
 
-    def get_first_rowid(self) -> int:
-        rowid = int(self.cells[1][0].text())
-        return rowid
-
-    def scroll_table(self, start: int):
-        try:
-            values = self.database.get_rows(self.table.name, start, 20, True)
-            if len(values) < len(self.cells) - 1:
-                return
-            hheaders = ["#"]
-            hheaders.extend(column.name for column in self.table.columns)
-            self.fill_cells(hheaders, *values)
-        except connector.EmptySet:
-            self.clear()
+    def get_first_rowid(self) -> Any:
+        return self.row_window.first_key()
 
     def draw_table(self, tablename: str):
         self.table = self.database.tables[tablename]
-        self.clear()
-        try:
-            values = self.database.get_rows(self.table.name, 1, 20, True)
-            hheaders = ["#"]
-            hheaders.extend(column.name for column in self.table.columns)
-            self.draw_cells(hheaders, *values)
-        except connector.EmptySet:
-            self.draw_cells((("", ), ))
-            logger.error(f"Table {tablename} has no rows")
+        self.row_window = connector.RowWindow(self.page_cache, tablename, self.page_size)
+        self.pending_step = 0
+        headers = tuple(column.name for column in self.table.columns)
+        self.table_model.tooltips = {}
+        self.table_model.load(headers, ())
+        self.horizontalScrollBar().setValue(0)
+        self._request(lambda window: window.first(), True)
+
+    def _scroll(self, step: int):
+        # шаги, накопленные до получения ответа, объединяются в один запрос
+        self.pending_step += step
+        steps = self.pending_step
+        if steps > 0:
+            self._request(lambda window: window.down(steps))
+        else:
+            self._request(lambda window: window.up(-steps))
+
+    def _request(
+            self,
+            move: Callable[[connector.RowWindow], Any],
+            first: bool = False):
+
+        """
+        Moves a copy of the row window on the executor worker.
+        Stale requests of the table are cancelled /
+        Перемещает копию окна строк в рабочем потоке исполнителя.
+        Устаревшие запросы таблицы отменяются
+        """
+        if not self.row_window:
+            return
+        window = self.row_window
+
+        def task(reader: connector.Reader) -> tuple[tuple[Any]]:
+            moved = connector.RowWindow(
+                self.page_cache.bind(reader), window.tablename, window.size)
+            moved.rows = window.rows
+            move(moved)
+            return moved.rows
+
+        self.executor.submit(
+            task,
+            lambda rows: self._show_rows(window, rows, first),
+            "high",
+            f"table-{id(self)}")
+
+    def _show_rows(
+            self,
+            window: connector.RowWindow,
+            rows: tuple[tuple[Any]],
+            first: bool):
+
+        if window is not self.row_window:
+            return
+        self.pending_step = 0
+        window.rows = rows
+        self.table_model.fill(rows)
+        if not first:
+            return
+        if rows:
+            self.resizeColumnsToContents()
+        else:
+            logger.error(f"Table {window.tablename} has no rows")
+
+    def rows_appended(self, tablename: str, first_key: int):
+        """
+        Drops cached blocks touched by rows appended from first_key (rowid) on
+        and shows the new rows if the window was at the end of the table /
+        Удаляет закэшированные блоки, затронутые строками, добавленными начиная
+        с first_key (rowid), и показывает новые строки, если окно было в конце таблицы
+        """
+        if not self.page_cache:
+            return
+        self.page_cache.invalidate(tablename, first_key)
+        if not self.table or self.table.name != tablename:
+            return
+        rows = self.row_window.rows
+        # окно, показывавшее конец таблицы, следует за новыми строками
+        if len(rows) < self.page_size or rows[-1][0] >= first_key - 1:
+            self.end()
 
     def clear(self):
-        for row in self.cells:
-            for cell in row:
-                cell.hide()
-        self.cells = []
-
-    def fill_cells(self, *rows: tuple[Any]):
-        for i, row in enumerate(rows):
-            for j, value in enumerate(row):
-                self.cells[i][j].setText(str(value))
-
-    def draw_cells(self, *rows: tuple[Any]):
-        layout = self.area.layout()
-        for i, row in enumerate(rows):
-            self.cells.append([])
-            for j, value in enumerate(row):
-                if i == 0 or j == 0:
-                    cell = TableHeaderCell(str(value))
-                else:
-                    cell = TableRegularCell(str(value))
-                cell.signals.triggered.connect(
-                    lambda trigger, c=cell: self._cell_triggered(c, trigger)
-                )
-                self.cells[-1].append(cell)
-                layout.addWidget(cell, i, j, 1, 1)
-
-        layout.addWidget(self.vspacer, i+1, 0, 1, j)
-        layout.addWidget(self.hspacer, 0, j+1, i, 1)
-
-    def _cell_triggered(self, cell: TableCell, trigger: dynamic.widget_trigger):
-        if trigger == "hover" and cell.full_text:
-            self.floating.show_(cell.full_text)
-        elif trigger == "leave" and cell.full_text:
+        self.table_model.load(self.table_model.headers, ())
+
+    def _cell_hovered(self, index: QtCore.QModelIndex):
+        full_text = self.table_model.full_text(index)
+        if full_text:
+            self.floating.show_(full_text)
+        elif self.floating.isVisible():
             self.floating.hide()
+
+    def leaveEvent(self, a0: QtCore.QEvent) -> None:
+        # текст остается, только если курсор ушел на само всплывающее окно
+        if self.floating.isVisible():
+            self.floating.retire()
+        super().leaveEvent(a0)
+
+
+class TemplateView(dynamic.DynamicFrame):
+
+    """
+    The most frequent message patterns of the table with their
+    counts and first and last seen times, read from the templates /
+    Самые частые шаблоны сообщений таблицы с их количеством
+    и временем первого и последнего появления, читаемые из шаблонов
+    """
+
+    headers = ("Шаблон", "Количество", "Первое", "Последнее")
+
+    def __init__(self):
+        dynamic.DynamicFrame.__init__(self)
+        self.setFixedHeight(cfg.TEMPLATE_VIEW_HEIGHT)
+        self.model, self.table = make_table()
+
+        layout = shorts.VLayout(self)
+        layout.addWidget(self.table)
+
+    def load(self, rows: list[tuple[int, str, int, str | None, str | None]]):
+        rows = tuple((id_, text, count, first or "", last or "") for id_, text, count, first, last in rows)
+        self.model.load(self.headers, rows)
+        self.table.resizeColumnsToContents()
+
+
+class ExceptionViewSignals(QtCore.QObject):
+
+    chosen = QtCore.pyqtSignal(str)
+    occurrence = QtCore.pyqtSignal(int)
+
+
+class ExceptionView(dynamic.DynamicFrame):
+
+    """
+    Exceptions of the table grouped by traceback fingerprint on the
+    left and occurrences of the chosen one on the right. Clicking an
+    occurrence shows its row in the table /
+    Исключения таблицы, сгруппированные по отпечатку трассировки,
+    слева и появления выбранного справа. Нажатие на появление
+    показывает его строку в таблице
+    """
+
+    headers = ("Исключение", "Место", "Количество", "Первое", "Последнее")
+    occurrence_headers = ("Строка", "Время")
+    signals: ExceptionViewSignals
+
+    def __init__(self):
+        dynamic.DynamicFrame.__init__(self)
+        self.setFixedHeight(cfg.EXCEPTION_VIEW_HEIGHT)
+        self.signals = ExceptionViewSignals()
+
+        self.model, self.table = make_table()
+        self.occurrence_model, self.occurrence_table = make_table()
+        self.table.clicked.connect(
+            lambda index: self.signals.chosen.emit(self.model.rows[index.row()][0]))
+        self.occurrence_table.clicked.connect(
+            lambda index: self.signals.occurrence.emit(self.occurrence_model.rows[index.row()][0]))
+
+        layout = shorts.HLayout(self)
+        layout.addWidget(self.table, 3)
+        layout.addWidget(self.occurrence_table, 1)
+
+    def load(self, rows: list[tuple[str, str, str, int, str | None, str | None]]):
+        rows = tuple(
+            (hash_, type_ or "-", location, count, first or "", last or "")
+            for hash_, type_, location, count, first, last in rows
+        )
+        self.model.load(self.headers, rows)
+        self.table.resizeColumnsToContents()
+        # появления показываются заново после выбора исключения
+        self.occurrence_model.load(self.occurrence_headers, ())
+
+    def load_occurrences(self, rows: list[tuple[int, str | None]]):
+        rows = tuple((rowid, rowid, moment or "") for rowid, moment in rows)
+        self.occurrence_model.load(self.occurrence_headers, rows)
+        self.occurrence_table.resizeColumnsToContents()
+
+
+class MatchViewSignals(QtCore.QObject):
+
+    chosen = QtCore.pyqtSignal(int)
+    closed = QtCore.pyqtSignal()
+
+
+class MatchView(dynamic.DynamicFrame):
+
+    """
+    Rows matching the regular expression, appended while the scan goes.
+    Clicking a row shows it in the table, the cross cancels the scan /
+    Строки, совпадающие с регулярным выражением, добавляемые по ходу
+    просмотра. Нажатие на строку показывает ее в таблице, крестик отменяет просмотр
+    """
+
+    signals: MatchViewSignals
+
+    def __init__(self):
+        dynamic.DynamicFrame.__init__(self)
+        self.setFixedHeight(cfg.MATCH_VIEW_HEIGHT)
+        self.signals = MatchViewSignals()
+
+        self.model, self.table = make_table()
+        self.table.clicked.connect(
+            lambda index: self.signals.chosen.emit(self.model.rows[index.row()][0]))
+        self.close_button = widgets.get_regular_button("matches-close", "cross-small")
+        self.close_button.clicked.connect(lambda e: self.signals.closed.emit())
+
+        layout = shorts.HLayout(self)
+        layout.addWidget(self.table)
+        layout.addWidget(self.close_button, alignment=QtCore.Qt.AlignmentFlag.AlignTop)
+
+    def clear(self):
+        self.model.load((), ())
+
+    def append(self, columns: tuple[str], rows: list[tuple[Any]]):
+        rows = tuple((rowid, rowid, *("" if value is None else value for value in values)) for rowid, *values in rows)
+        if not self.model.headers:
+            self.model.load(("Строка", *columns), rows)
+            self.table.resizeColumnsToContents()
+        else:
+            self.model.append(rows)
+
+
+class StatsView(dynamic.DynamicFrame):
+
+    """
+    Side panel with the statistics of the columns of the table:
+    null ratio, approximate distinct count, min/max, histogram
+    of numeric values and the most frequent values /
+    Боковая панель со статистикой столбцов таблицы: доля пустых,
+    приблизительное количество различных, минимум и максимум,
+    гистограмма числовых значений и самые частые значения
+    """
+
+    headers = ("Пустые", "Различных", "Минимум", "Максимум", "Гистограмма", "Частые")
+
+    def __init__(self):
+        dynamic.DynamicFrame.__init__(self)
+        self.setFixedWidth(cfg.STATS_VIEW_WIDTH)
+        self.model, self.table = make_table()
+
+        layout = shorts.VLayout(self)
+        layout.addWidget(self.table)
+
+    def load(self, columns: list[stats.ColumnStats]):
+        rows = tuple(
+            (
+                column.name,
+                f"{column.null_ratio:.1%}",
+                f"~{column.distinct:,}".replace(",", " "),
+                stats.format_value(column.minimum),
+                stats.format_value(column.maximum),
+                stats.sparkline(column.histogram) if column.histogram else "",
+                ", ".join(stats.format_value(value) for value, _ in column.top[:cfg.STATS_TOOLTIP_TOP])
+            )
+            for column in columns
+        )
+        self.model.load(self.headers, rows)
+        self.table.resizeColumnsToContents()
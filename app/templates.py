@@ -0,0 +1,265 @@
+import re
+from dataclasses import dataclass
+
+from . import background
+from . import config as cfg
+from .connector import SQL, quote
+
+"""
+Module with the log messages templates mining (Drain) /
+Модуль с выделением шаблонов сообщений логов (Drain)
+"""
+
+
+wildcard = "<*>"
+
+# значения, которые заведомо являются параметрами сообщения
+parameter_patterns = re.compile(r"""
+    # только слова, в которых есть цифра, это дешевле проверять сразу
+    \b(?=[0-9a-fA-F]*\d)(?:
+        [0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}
+        |\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?
+        |0x[0-9a-fA-F]+
+        |\d+(?:[.,]\d+)*
+    )\b
+""", re.X)
+
+
+def mask(message: str) -> str:
+    """
+    The message with numbers, addresses, hex values
+    and uuids replaced with the wildcard /
+    Сообщение, в котором числа, адреса, шестнадцатеричные
+    значения и uuid заменены подстановочным знаком
+    """
+    return parameter_patterns.sub(wildcard, message)
+
+
+def has_digits(token: str) -> bool:
+    return any(char.isdigit() for char in token)
+
+
+@dataclass
+class Template():
+
+    id: int
+    tokens: list[str]
+    count: int = 0
+    first_seen: str | None = None
+    last_seen: str | None = None
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.tokens)
+
+    def dump(self) -> tuple[int, str, int, str | None, str | None]:
+        return self.id, self.text, self.count, self.first_seen, self.last_seen
+
+    @classmethod
+    def load(cls, row: tuple[int, str, int, str | None, str | None]) -> "Template":
+        id_, text, count, first_seen, last_seen = row
+        return cls(id_, text.split(), count, first_seen, last_seen)
+
+    def similarity(self, tokens: list[str]) -> tuple[float, int]:
+        """
+        Share of the positions equal to the tokens and the number
+        of wildcards (more of them is worse for equal shares) /
+        Доля позиций, равных токенам, и количество подстановочных
+        знаков (при равных долях больше - хуже)
+        """
+        same = wildcards = 0
+        for own, token in zip(self.tokens, tokens):
+            if own == wildcard:
+                wildcards += 1
+            elif own == token:
+                same += 1
+        return same / len(tokens), -wildcards
+
+    def merge(self, tokens: list[str]) -> bool:
+        """
+        Replaces the differing positions with the wildcard,
+        returns True if the template changed /
+        Заменяет отличающиеся позиции подстановочным знаком,
+        возвращает True, если шаблон изменился
+        """
+        changed = False
+        for position, (own, token) in enumerate(zip(self.tokens, tokens)):
+            if own != token and own != wildcard:
+                self.tokens[position] = wildcard
+                changed = True
+        return changed
+
+
+class Drain():
+
+    """
+    Streaming templates miner. Messages are routed through a tree
+    by the number of tokens and the first depth tokens, then compared
+    with the few templates of the leaf only, so mining is linear in
+    the number of messages /
+    Потоковое выделение шаблонов. Сообщения проходят по дереву по
+    количеству токенов и первым depth токенам, затем сравниваются
+    только с немногими шаблонами листа, поэтому выделение линейно
+    по количеству сообщений
+    """
+
+    depth: int
+    similarity: float
+    max_children: int
+    templates: dict[int, Template]
+    # измененные с последнего сохранения шаблоны
+    changed: set[int]
+
+    def __init__(
+            self,
+            templates: list[Template] = (),
+            depth: int = cfg.TEMPLATE_DEPTH,
+            similarity: float = cfg.TEMPLATE_SIMILARITY,
+            max_children: int = cfg.TEMPLATE_MAX_CHILDREN):
+
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        self.templates = {}
+        self.changed = set()
+        self._tree = {}
+        self._cache = {}
+        self._next_id = 1
+        for template in templates:
+            self.templates[template.id] = template
+            self._leaf(template.tokens).append(template)
+            self._next_id = max(self._next_id, template.id + 1)
+
+    def _leaf(self, tokens: list[str]) -> list[Template]:
+        node = self._tree.setdefault(len(tokens), {})
+        for token in tokens[:self.depth]:
+            # токены с цифрами вероятнее параметры, чем часть шаблона
+            key = wildcard if has_digits(token) else token
+            if key not in node:
+                key = key if len(node) < self.max_children else wildcard
+            node = node.setdefault(key, {})
+        return node.setdefault(None, [])
+
+    def add(self, message: str, time_: str = None) -> int:
+        """
+        Adds the message to its template (a new one if no template
+        is similar enough) and returns the template id /
+        Добавляет сообщение к его шаблону (новому, если ни один шаблон
+        не похож достаточно) и возвращает идентификатор шаблона
+        """
+        masked = mask(message or "")
+        template = self._cache.get(masked)
+        if template is None:
+            template = self._match(masked.split())
+            # одинаковые после маскирования сообщения не проходят дерево повторно
+            if len(self._cache) >= cfg.TEMPLATE_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[masked] = template
+        template.count += 1
+        if time_ is not None:
+            if template.first_seen is None or time_ < template.first_seen:
+                template.first_seen = time_
+            if template.last_seen is None or time_ > template.last_seen:
+                template.last_seen = time_
+        self.changed.add(template.id)
+        return template.id
+
+    def _match(self, tokens: list[str]) -> Template:
+        leaf = self._leaf(tokens)
+        best, best_score = None, (-1.0, 0)
+        for template in leaf:
+            score = template.similarity(tokens) if tokens else (1.0, 0)
+            if score > best_score:
+                best, best_score = template, score
+        if best is not None and best_score[0] >= self.similarity:
+            best.merge(tokens)
+            return best
+        template = Template(self._next_id, list(tokens))
+        self._next_id += 1
+        self.templates[template.id] = template
+        leaf.append(template)
+        return template
+
+    def take_changed(self) -> list[Template]:
+        changed = [self.templates[id_] for id_ in self.changed]
+        self.changed = set()
+        return changed
+
+
+class TemplateMiner():
+
+    """
+    Keeps the templates of a table current: messages of the rows
+    appended after the mark are mined and their template ids are
+    stored in the template_rows side table, in the current transaction /
+    Поддерживает шаблоны таблицы актуальными: сообщения строк,
+    добавленных после отметки, разбираются, и идентификаторы их шаблонов
+    сохраняются во вспомогательной таблице template_rows в текущей транзакции
+    """
+
+    database: SQL
+    tablename: str
+    drain: Drain | None = None
+    # отметка, записанная этим разборщиком последней
+    mark: int | None = None
+
+    def __init__(self, database: SQL, tablename: str):
+        self.database = database
+        self.tablename = tablename
+        database.create_templates()
+
+    def update(self, step: int = None) -> tuple[int, int]:
+        """
+        Mines the messages after the mark (at most step rowids).
+        Returns the new mark and max rowid of the table /
+        Разбирает сообщения после отметки (не более step rowid).
+        Возвращает новую отметку и максимальный rowid таблицы
+        """
+        source = self.database.template_source(self.tablename)
+        if source is None:
+            return 0, 0
+        last = self.database.max_rowid(self.tablename) or 0
+        with self.database.transaction():
+            mark = self.database.template_mark(self.tablename) or 0
+            # другой разборщик продвинул отметку - шаблоны в памяти устарели
+            if mark != self.mark:
+                self.drain = None
+            end = last if step is None else min(last, mark + step)
+            if end > mark:
+                self._mine(source, mark, end)
+            self.database.exec(
+                "INSERT OR REPLACE INTO template_marks (tablename, mark) VALUES (?, ?)",
+                (self.tablename, end))
+        self.mark = end
+        return end, last
+
+    def _mine(self, source: tuple[str, str | None], start: int, end: int):
+        if self.drain is None:
+            self.drain = Drain([Template.load(row) for row in self.database.load_templates(self.tablename)])
+        message, time_ = (quote(name) if name else "NULL" for name in source)
+        chunks = self.database.fetch_chunks(
+            f"SELECT rowid, {message}, {time_} FROM {quote(self.tablename)} WHERE rowid > ? AND rowid <= ?",
+            (start, end))
+        add = self.drain.add
+        table_id = self.database.table_id(self.tablename)
+        for rows in chunks:
+            self.database.exec_many(
+                "INSERT OR REPLACE INTO template_rows (table_id, row, template) VALUES (?, ?, ?)",
+                ((table_id, rowid, add(text, moment)) for rowid, text, moment in rows))
+        self.database.save_templates(self.tablename, (template.dump() for template in self.drain.take_changed()))
+
+
+class TemplateBuilder(background.StepBuilder):
+
+    """
+    Mines templates of an existing table in background, TEMPLATE_STEP
+    rowids per transaction, continuing from the stored mark /
+    Выделяет шаблоны существующей таблицы в фоне, по TEMPLATE_STEP
+    rowid за транзакцию, продолжая с сохраненной отметки
+    """
+
+    label = "templates"
+    step = cfg.TEMPLATE_STEP
+
+    def open(self, database: SQL) -> background.updater:
+        return TemplateMiner(database, self.tablename).update
@@ -0,0 +1,173 @@
+import re
+from bisect import bisect_left
+
+from . import config as cfg
+from .connector import SQL, timestamp_pattern
+
+"""
+Module with the sparse timestamp index for jumping to a time /
+Модуль с разреженным индексом времени для перехода ко времени
+"""
+
+
+checkpoint = tuple[int, str]
+
+# "2024-03-01", "2024-03-01 14:05", "2024-03-01T14:05:30.250"
+moment_pattern = re.compile(r"(\d{4}-\d{2}-\d{2})(?:[ T](\d{2}:\d{2}(?::\d{2}(?:[.,]\d{1,6})?)?))?")
+
+
+def parse_moment(text: str, separator: str = " ") -> str | None:
+    """
+    Normalizes the entered time to the form of the column values
+    (date and time joined by separator), None if it is not a time /
+    Приводит введенное время к виду значений столбца
+    (дата и время через separator), None, если это не время
+    """
+    match = moment_pattern.fullmatch(text.strip())
+    if not match:
+        return None
+    date, time_ = match.groups()
+    return f"{date}{separator}{time_}" if time_ else date
+
+
+class TimeIndex():
+
+    """
+    Sparse index of a timestamp column increasing with rowid:
+    (rowid, time) checkpoints every step rowids. Is built and
+    extended by rowid range reads only, so it needs no SQLite index
+    on the column. Every range is checked to hold no time later than
+    its closing checkpoint. A time is found by a binary search over
+    the checkpoints and one query reading at most step rows /
+    Разреженный индекс столбца времени, растущего вместе с rowid:
+    контрольные точки (rowid, время) через каждые step rowid.
+    Строится и дополняется только чтением диапазонов rowid, поэтому
+    ему не нужен индекс SQLite по столбцу. Каждый диапазон проверяется
+    на отсутствие времени позже его закрывающей точки. Время находится
+    двоичным поиском по контрольным точкам и одним запросом, читающим
+    не более step строк
+    """
+
+    tablename: str
+    columnname: str | None
+    checkpoints: list[checkpoint]
+    step: int
+    # точки, добавленные с последнего сохранения; replaced - сохраненные устарели
+    added: list[checkpoint]
+    replaced: bool = False
+
+    def __init__(
+            self,
+            tablename: str,
+            columnname: str = None,
+            checkpoints: list[checkpoint] = None,
+            step: int = cfg.TIME_INDEX_STEP):
+
+        self.tablename = tablename
+        self.columnname = columnname
+        self.checkpoints = checkpoints or []
+        self.step = step
+        self.added = []
+
+    def copy(self) -> "TimeIndex":
+        # копия дополняется в рабочем потоке, не затрагивая используемый индекс
+        return TimeIndex(self.tablename, self.columnname, list(self.checkpoints), self.step)
+
+    @property
+    def separator(self) -> str:
+        # разделитель даты и времени в значениях столбца
+        first = self.checkpoints[0][1] if self.checkpoints else ""
+        return first[10] if len(first) > 10 else " "
+
+    def update(self, database: SQL) -> bool:
+        """
+        Extends the index to the rows appended since it was built,
+        rebuilding it if the stored checkpoints no longer match the table.
+        Returns False if the table has no increasing timestamp column /
+        Дополняет индекс строками, добавленными после построения,
+        перестраивая его, если сохраненные точки больше не совпадают
+        с таблицей. Возвращает False, если в таблице нет растущего столбца времени
+        """
+        if self.columnname and self._matches(database) and self._extend(database):
+            return True
+        for columnname in database.timestamp_columns(self.tablename):
+            self.columnname, self.checkpoints, self.added = columnname, [], []
+            self.replaced = True
+            if self._extend(database):
+                return True
+        self.columnname, self.checkpoints, self.added = None, [], []
+        return False
+
+    def _matches(self, database: SQL) -> bool:
+        if not self.checkpoints:
+            return True
+        key, time_ = self.checkpoints[-1]
+        return database.row_at(self.tablename, self.columnname, key) == (key, time_)
+
+    def _extend(self, database: SQL) -> bool:
+        last = database.max_rowid(self.tablename) or 0
+        key = self.checkpoints[-1][0] + self.step if self.checkpoints else 0
+        while key <= last:
+            row = database.row_at(self.tablename, self.columnname, key)
+            if row is None:
+                break
+            if self.checkpoints and row[0] <= self.checkpoints[-1][0]:
+                key += self.step
+                continue
+            if (
+                not isinstance(row[1], str) or
+                not timestamp_pattern.match(row[1]) or
+                self.checkpoints and not self._ordered(database, row)
+            ):
+                return False
+            self.checkpoints.append(row)
+            self.added.append(row)
+            # при разрыве в rowid следующая точка отсчитывается от найденной строки
+            key = max(key, row[0]) + self.step
+        return True
+
+    def _ordered(self, database: SQL, row: checkpoint) -> bool:
+        # ни одна строка диапазона не позже закрывающей точки, тогда строки до точки,
+        # предшествующей искомому времени, его не достигают, и locate ищет только между точками
+        key, time_ = self.checkpoints[-1]
+        latest = database.range_max(self.tablename, self.columnname, key, row[0])
+        return time_ <= row[1] and not (isinstance(latest, str) and latest > row[1])
+
+    def locate(self, database: SQL, moment: str) -> int | None:
+        """
+        Rowid of the first row which time is not earlier than moment,
+        None if all rows are earlier /
+        Rowid первой строки, время которой не раньше moment,
+        None, если все строки раньше
+        """
+        index = bisect_left(self.checkpoints, moment, key=lambda point: point[1])
+        # нужная строка лежит после предыдущей точки и не дальше найденной
+        low = self.checkpoints[index - 1][0] if index else -1
+        high = self.checkpoints[index][0] if index < len(self.checkpoints) else None
+        return database.first_reaching(self.tablename, self.columnname, moment, low, high)
+
+    def take_added(self) -> tuple[list[checkpoint], bool]:
+        """
+        Checkpoints to save and whether the saved ones are to be replaced /
+        Контрольные точки для сохранения и нужно ли заменить сохраненные
+        """
+        added, replaced = self.added, self.replaced
+        self.added, self.replaced = [], False
+        return added, replaced
+
+
+def seek_time(database: SQL, index: TimeIndex, text: str) -> tuple[TimeIndex, str | None, int | None]:
+    """
+    Updates the index and finds the first row not earlier than the
+    entered time. Returns the index, the normalized time (None if
+    the text is not a time) and the rowid (None if there is no such row) /
+    Обновляет индекс и находит первую строку не раньше введенного
+    времени. Возвращает индекс, приведенное время (None, если текст
+    не время) и rowid (None, если такой строки нет)
+    """
+    if not index.update(database):
+        return index, None, None
+    moment = parse_moment(text, index.separator)
+    if moment is None:
+        return index, None, None
+    return index, moment, index.locate(database, moment)
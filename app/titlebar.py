@@ -38,6 +38,8 @@ class ToolBar(dynamic.DynamicFrame):
             "toolbar-file",
             dd_button("folder", "Открыть папку", "file-folder", "Ctrl+Shift+O"),
             dd_button("document-text", "Открыть файл", "file-file", "Ctrl+O"),
+            dd_button("folder-clock", "Следить за папкой", "file-follow", "Ctrl+Alt+F"),
+            dd_button("server", "Принимать логи", "file-receive", "Ctrl+Alt+R"),
             dd_button("floppy-disk", "Сохранить", "file-save", "Ctrl+S"),
             dd_button("share-reverse", "Отменить", "file-undo", "Ctrl+Z"),
             dd_button("share", "Повторить", "file-redo", "Ctrl+Shift+Z")
@@ -46,6 +48,7 @@ class ToolBar(dynamic.DynamicFrame):
             widgets.TextButton("База данных"),
             "toolbar-database",
             dd_button("filter", "Фильтр", "database-filter", "Ctrl+F"),
+            dd_button("clock-period", "Перейти ко времени", "database-jump", "Ctrl+G"),
             dd_button("sticky-note-pen", "Изменение", "database-edit", "Ctrl+E"),
             dd_button("trash", "Удаление", "database-delete", "Ctrl+-"),
             dd_button("circle-plus", "Добавление", "database-add", "Ctrl+="),
@@ -187,6 +190,28 @@ class StatusBar(dynamic.DynamicFrame):
         self.branch_label = get_statusbar_label("Не синхронизировано", "status-branch")
         self.branch_label.setWordWrap(False)
 
+        rows = dynamic.DynamicSvg("table-rows", "main")
+        norows = dynamic.DynamicSvg("table", "main")
+        self.rows_icon = widgets.SvgButton({
+            "leave": norows,
+            "active": rows
+        })
+        self.rows_label = get_statusbar_label("", "status-rows")
+        self.rows_label.setWordWrap(False)
+        self.rows_label.dont_translate = True
+
+        receiving = dynamic.DynamicSvg("server", "main")
+        noreceiving = dynamic.DynamicSvg("ban", "main")
+        self.receiver_icon = widgets.SvgButton({
+            "leave": noreceiving,
+            "active": receiving
+        })
+        self.receiver_label = get_statusbar_label("", "status-receiver")
+        self.receiver_label.setWordWrap(False)
+        self.receiver_label.dont_translate = True
+        self.receiver_icon.hide()
+        self.receiver_label.hide()
+
         status_layout.addWidget(self.path_icon)
         status_layout.addWidget(self.path_label)
         status_layout.addWidget(shorts.FixedSpacer(width=GAP))
@@ -195,9 +220,20 @@ class StatusBar(dynamic.DynamicFrame):
         status_layout.addWidget(shorts.FixedSpacer(width=GAP))
         status_layout.addWidget(self.branch_icon)
         status_layout.addWidget(self.branch_label)
+        status_layout.addWidget(shorts.FixedSpacer(width=GAP))
+        status_layout.addWidget(self.rows_icon)
+        status_layout.addWidget(self.rows_label)
+        status_layout.addWidget(shorts.FixedSpacer(width=GAP))
+        status_layout.addWidget(self.receiver_icon)
+        status_layout.addWidget(self.receiver_label)
         status_layout.addWidget(shorts.FixedSpacer(width=GAP*2))
 
         self.history_button = widgets.get_regular_button("status-history", "clock-duration")
+        self.rollups_button = widgets.get_regular_button("status-rollups", "chart-histogram")
+        self.chart_button = widgets.get_regular_button("status-chart", "chart-line")
+        self.templates_button = widgets.get_regular_button("status-templates", "shapes")
+        self.exceptions_button = widgets.get_regular_button("status-exceptions", "fingerprint")
+        self.stats_button = widgets.get_regular_button("status-stats", "table-columns")
 
         russian = dynamic.DynamicSvg("flag-russia", "main", cfg.BUTTONS_SIZE)
         english = dynamic.DynamicSvg("flag-uk", "main", cfg.BUTTONS_SIZE)
@@ -245,6 +281,11 @@ class StatusBar(dynamic.DynamicFrame):
 
         layout.addWidget(status)
         layout.addWidget(self.history_button)
+        layout.addWidget(self.rollups_button)
+        layout.addWidget(self.chart_button)
+        layout.addWidget(self.templates_button)
+        layout.addWidget(self.exceptions_button)
+        layout.addWidget(self.stats_button)
         layout.addItem(shorts.HSpacer())
         layout.addWidget(settings)
 
@@ -265,6 +306,20 @@ class StatusBar(dynamic.DynamicFrame):
         self.branch_label.setText(message)
         self.commit_icon.signals.triggered.emit("active" if status else "leave")
 
+    def set_rows_status(self, status: bool, message: str):
+        self.rows_label.setText(message)
+        self.rows_icon.signals.triggered.emit("active" if status else "leave")
+
+    def set_receiver_status(self, status: bool, message: str):
+        """
+        Shows the log receiver counters, hides them if the message is empty /
+        Показывает счетчики приема логов, скрывает их, если сообщение пустое
+        """
+        self.receiver_label.setText(message)
+        self.receiver_icon.signals.triggered.emit("active" if status else "leave")
+        self.receiver_icon.setVisible(bool(message))
+        self.receiver_label.setVisible(bool(message))
+
     def set_file_status(self, status: bool, message: str):
         self.path_icon.signals.triggered.emit("active" if status else "leave")
         self.path_icon.dont_translate = status
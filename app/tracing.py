@@ -0,0 +1,87 @@
+import itertools
+from typing import Any, Literal
+
+from loguru import logger
+
+from . import config as cfg
+
+"""
+Module with the executed queries tracing /
+Модуль с трассировкой выполняемых запросов
+"""
+
+
+trace_mode = Literal["off", "sampled", "full"]
+
+
+def is_query_record(record: dict) -> bool:
+    """
+    Sink filter: whether the log record is a query trace /
+    Фильтр приемника: является ли запись лога трассировкой запроса
+    """
+    return "query" in record["extra"]
+
+
+def not_query_record(record: dict) -> bool:
+    return "query" not in record["extra"]
+
+
+class QueryTracer():
+
+    """
+    Sends executed queries to the log as structured records
+    (query, params, kind, duration, rows). In "sampled" mode
+    only every sample-th query and all slow queries are logged.
+    Records are written by the queued sink (see setup.py),
+    so the calling thread does not wait for the file /
+    Отправляет выполненные запросы в лог структурированными записями
+    (запрос, параметры, класс, длительность, строки). В режиме "sampled"
+    в лог попадает только каждый sample-й запрос и все медленные запросы.
+    Записи пишет приемник с очередью (см. setup.py),
+    поэтому вызывающий поток не ждет файл
+    """
+
+    mode: trace_mode
+    sample: int
+    slow: float
+
+    def __init__(
+            self,
+            mode: trace_mode = cfg.SQL_TRACE_MODE,
+            sample: int = cfg.SQL_TRACE_SAMPLE,
+            slow: float = cfg.SQL_SLOW_QUERY_MS):
+
+        self.mode = mode
+        self.sample = sample
+        self.slow = slow
+        # next() у itertools.count атомарен, блокировка не нужна
+        self._counter = itertools.count()
+
+    def trace(
+            self,
+            query: str,
+            params: tuple[Any],
+            kind: str,
+            duration: float,
+            rows: int | None = None):
+
+        """
+        Logs the query if it passes the sampling.
+        duration is given in milliseconds /
+        Логирует запрос, если он проходит выборку.
+        duration задается в миллисекундах
+        """
+        if self.mode == "off":
+            return
+        if self.mode == "sampled" and duration < self.slow and next(self._counter) % self.sample:
+            return
+        logger.bind(
+            query=query,
+            params=repr(params),
+            kind=kind,
+            duration=round(duration, 3),
+            rows=rows
+        ).info(f"{duration:.3f} ms {query}")
+
+
+tracer = QueryTracer()
@@ -470,3 +470,133 @@ class RadioGroup(ScrollArea):
 
     def get_choosen_radios(self) -> tuple[RadioButton]:
         return tuple(filter(lambda r: r.active, self.radios))
+
+
+class OptionSignals(QtCore.QObject):
+
+    chosen = QtCore.pyqtSignal(str)
+
+
+class OptionBar(dynamic.DynamicFrame):
+
+    """
+    Row of text buttons choosing one of the options,
+    the chosen one is highlighted /
+    Ряд текстовых кнопок, выбирающих один из вариантов,
+    выбранный подсвечивается
+    """
+
+    option: str | None = None
+    buttons: dict[str, TextButton]
+
+    def __init__(self, options: dict[str, str] = None, option: str = None):
+        dynamic.DynamicFrame.__init__(self)
+        self.option_signals = OptionSignals()
+        self.buttons = {}
+        layout = shorts.HLayout(self)
+        layout.setSpacing(cfg.GAP*2)
+        layout.addItem(shorts.HSpacer())
+        if options:
+            self.fill(options, option)
+
+    def fill(self, options: dict[str, str], option: str = None, translated: tuple[str] = None):
+        """
+        Replaces the options: {option: button text}. Texts of
+        the translated options (all if None) are translated /
+        Заменяет варианты: {вариант: текст кнопки}. Тексты
+        вариантов translated (всех, если None) переводятся
+        """
+        for button in self.buttons.values():
+            button.hide()
+        self.buttons = {}
+        layout = self.layout()
+        for name, text in options.items():
+            button = TextButton(text)
+            button.dont_translate = translated is not None and name not in translated
+            gwm.add_widget(button)
+            gwm.set_style(button, "always", "border: none; outline: none;")
+            gwm.set_style(button, "hover", "color: !blue!;")
+            button.clicked.connect(lambda e, name=name: self.choose(name))
+            # перед завершающим растягивающимся промежутком
+            layout.insertWidget(layout.count() - 1, button)
+            self.buttons[name] = button
+        self.option = option if option in options else next(iter(options), None)
+        self._highlight()
+
+    def choose(self, option: str):
+        self.option = option
+        self._highlight()
+        self.option_signals.chosen.emit(option)
+
+    def _highlight(self):
+        for name, button in self.buttons.items():
+            color = "!blue!" if name == self.option else "!fore!"
+            gwm.set_style(button, "leave", f"color: {color};")
+
+
+search_mode = Literal["text", "regex"]
+
+
+class SearchSignals(QtCore.QObject):
+
+    search = QtCore.pyqtSignal(str)
+    regex = QtCore.pyqtSignal(str)
+
+
+class SearchBar(dynamic.DynamicFrame):
+
+    """
+    Search input with the mode and search buttons. Enter and the
+    search button request the next match of the entered text
+    or the scan with the entered regular expression /
+    Поле поиска с кнопками режима и поиска. Enter и кнопка поиска
+    запрашивают следующее совпадение введенного текста или
+    просмотр введенным регулярным выражением
+    """
+
+    placeholders: dict[search_mode, str] = {
+        "text": "Поиск",
+        "regex": "Регулярное выражение"
+    }
+
+    def __init__(self):
+        dynamic.DynamicFrame.__init__(self)
+        self.search_signals = SearchSignals()
+        self.setFixedWidth(cfg.SEARCH_BAR_WIDTH)
+
+        self.input = LineEdit(self.placeholders["text"])
+        gwm.add_widget(self.input, style_preset="input")
+        self.input.returnPressed.connect(self.search)
+        self.mode_button = SwitchingButton(
+            ("text", dynamic.DynamicSvg("document-text", "main")),
+            ("regex", dynamic.DynamicSvg("asterisk", "main"))
+        )
+        gwm.add_widget(self.mode_button, "search-mode", "button")
+        self.mode_button.clicked.connect(
+            lambda e: self.input.setPlaceholderText(self.placeholders[self.mode]))
+        self.button = get_regular_button("search-button", "document-search")
+        self.button.clicked.connect(lambda e: self.search())
+        gwm.add_shortcut(self.focus, "Ctrl+F")
+
+        layout = shorts.HLayout(self)
+        layout.setSpacing(cfg.GAP)
+        layout.addWidget(self.input)
+        layout.addWidget(self.mode_button)
+        layout.addWidget(self.button)
+
+    @property
+    def mode(self) -> search_mode:
+        return self.mode_button.icon[0]
+
+    def focus(self):
+        self.input.setFocus()
+        self.input.selectAll()
+
+    def search(self):
+        text = self.input.text()
+        if not text:
+            return
+        if self.mode == "regex":
+            self.search_signals.regex.emit(text)
+        else:
+            self.search_signals.search.emit(text)
@@ -13,6 +13,7 @@ from .config import GAP, BUTTONS_SIZE
 from . import titlebar
 from .dynamic import global_widget_manager as gwm
 from .floating import Floating
+from .profiler import ShapeStatistics
 
 
 class WindowForms(TypedDict):
@@ -28,6 +29,8 @@ class WindowDialogs(TypedDict):
     close_forcibly: dialogs.AlertDialog
     alert: dialogs.AlertDialog
     choice: dialogs.ChooseVariantDialog
+    history: dialogs.HistoryDialog
+    jump: dialogs.JumpDialog
 
 
 class WindowSignals(QtCore.QObject):
@@ -101,6 +104,18 @@ class Window(dynamic.DynamicWindow):
         close.clicked.connect(lambda e: self.on_close())
         info.clicked.connect(lambda e: self.signals.triggered.emit("info"))
         gwm.add_shortcut(info.click, "Ctrl+H")
+        self.statusbar.history_button.clicked.connect(
+            lambda e: self.signals.triggered.emit("history"))
+        self.statusbar.rollups_button.clicked.connect(
+            lambda e: self.signals.triggered.emit("rollups"))
+        self.statusbar.chart_button.clicked.connect(
+            lambda e: self.signals.triggered.emit("chart"))
+        self.statusbar.templates_button.clicked.connect(
+            lambda e: self.signals.triggered.emit("templates"))
+        self.statusbar.exceptions_button.clicked.connect(
+            lambda e: self.signals.triggered.emit("exceptions"))
+        self.statusbar.stats_button.clicked.connect(
+            lambda e: self.signals.triggered.emit("stats"))
 
         title_layout.addWidget(self.toolbar, 0, 0, 1, 1)
         title_layout.addItem(shorts.HSpacer(), 0, 1, 1, 1)
@@ -145,6 +160,8 @@ class Window(dynamic.DynamicWindow):
 
         self.dialogs["alert"] = dialogs.AlertDialog(self, "")
         self.dialogs["choice"] = dialogs.ChooseVariantDialog(self, "", "")
+        self.dialogs["history"] = dialogs.HistoryDialog(self)
+        self.dialogs["jump"] = dialogs.JumpDialog(self)
 
     def show_choice_dialog(
             self,
@@ -235,6 +252,18 @@ class Window(dynamic.DynamicWindow):
         self._check_nested_dialogs(dialog)
         dialog.show()
 
+    def show_history_dialog(self, statistics: list[ShapeStatistics]):
+        dialog = self.dialogs["history"]
+        dialog.load(statistics)
+        self._check_nested_dialogs(dialog)
+        dialog.show()
+
+    def show_jump_dialog(self):
+        dialog = self.dialogs["jump"]
+        self._check_nested_dialogs(dialog)
+        dialog.show()
+        dialog.input.setFocus()
+
     def showEvent(self, a0: QtGui.QShowEvent) -> None:
         logger.debug(f"show {self.objectName()} window")
         return super().showEvent(a0)
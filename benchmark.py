@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import tempfile
+
+from app.connector import SQL
+
+"""
+Write throughput benchmark: commit per statement, explicit
+transaction and batched insert. Usage: python benchmark.py [rows] /
+Замер скорости записи: коммит на каждый запрос, явная
+транзакция и пакетная вставка. Запуск: python benchmark.py [строк]
+"""
+
+COLUMNS = ("time", "level", "message")
+
+# коммит на каждую строку слишком медленный для полного объема
+SINGLE_LIMIT = 2_000
+
+
+def generate_rows(count: int):
+    for i in range(count):
+        yield (f"2024-01-01 00:00:{i % 60:02}", "INFO", f"message number {i}")
+
+
+def create_database(folder: str, name: str) -> SQL:
+    database = SQL(os.path.join(folder, f"{name}.db"), parse=False)
+    database.echo = False
+    database.exec(
+        "CREATE TABLE logs (id INTEGER PRIMARY KEY, time TEXT, level TEXT, message TEXT)")
+    return database
+
+
+def insert_single(database: SQL, count: int):
+    for row in generate_rows(count):
+        database.exec("INSERT INTO logs (time, level, message) VALUES (?, ?, ?)", row)
+
+
+def insert_transaction(database: SQL, count: int):
+    with database.transaction():
+        for row in generate_rows(count):
+            database.exec("INSERT INTO logs (time, level, message) VALUES (?, ?, ?)", row)
+
+
+def insert_batch(database: SQL, count: int):
+    database.insert_many("logs", COLUMNS, generate_rows(count))
+
+
+def measure(folder: str, name: str, insert, count: int):
+    database = create_database(folder, name)
+    start = time.perf_counter()
+    insert(database, count)
+    elapsed = time.perf_counter() - start
+    database.close()
+    print(f"{name:<12} {count:>10,} rows {elapsed:>8.3f} s {count / elapsed:>12,.0f} rows/s")
+
+
+def main(count: int):
+    with tempfile.TemporaryDirectory() as folder:
+        measure(folder, "single", insert_single, min(count, SINGLE_LIMIT))
+        measure(folder, "transaction", insert_transaction, count)
+        measure(folder, "batch", insert_batch, count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,35 @@
+import sys
+import signal
+
+from loguru import logger
+
+from app import receiver
+from app import config as cfg
+
+"""
+Headless log receiver: writes records of SocketHandler, DatagramHandler
+and JSON lines into the database until interrupted.
+Usage: python receive.py database.db [tcp port] [udp port] /
+Прием логов без окна: записывает записи SocketHandler, DatagramHandler
+и строки JSON в базу данных до прерывания.
+Запуск: python receive.py database.db [порт tcp] [порт udp]
+"""
+
+
+def main(path: str, tcp_port: int, udp_port: int):
+    log_receiver = receiver.LogReceiver(path, tcp_port=tcp_port, udp_port=udp_port)
+    log_receiver.signals.stats.connect(
+        lambda stats: logger.info(receiver.format_stats(stats)))
+    # Ctrl+C останавливает прием, очередь дописывается
+    signal.signal(signal.SIGINT, lambda *_: log_receiver.stop())
+    # прием идет в главном потоке: сигналы Qt вызываются напрямую
+    log_receiver.run()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python receive.py database.db [tcp port] [udp port]")
+    main(
+        sys.argv[1],
+        int(sys.argv[2]) if len(sys.argv) > 2 else cfg.RECEIVER_TCP_PORT,
+        int(sys.argv[3]) if len(sys.argv) > 3 else cfg.RECEIVER_UDP_PORT)
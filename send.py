@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import tempfile
+from dataclasses import replace
+from logging.handlers import SocketHandler, DatagramHandler
+
+from app import receiver
+from app import config as cfg
+
+"""
+Log receiver throughput check: starts a receiver on a temporary
+database, sends records with SocketHandler, DatagramHandler and
+JSON lines and prints written records per second and lost records.
+Usage: python send.py [records] [tcp port] [udp port] /
+Проверка скорости приема логов: запускает прием во временную
+базу данных, отправляет записи через SocketHandler, DatagramHandler
+и строками JSON и выводит записанные в секунду и потерянные записи.
+Запуск: python send.py [записей] [порт tcp] [порт udp]
+"""
+
+HOST = "127.0.0.1"
+
+# прием закончен, если записанных не прибавилось за это время
+SETTLE_TIME = 2.0
+
+# строк JSON в одном вызове sendall
+JSON_BATCH = 1_000
+
+
+def make_logger(handler: logging.Handler) -> logging.Logger:
+    log = logging.getLogger(f"send.{type(handler).__name__}")
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    log.handlers = [handler]
+    return log
+
+
+def send_socket(count: int, tcp_port: int, udp_port: int):
+    handler = SocketHandler(HOST, tcp_port)
+    log = make_logger(handler)
+    for i in range(count):
+        log.info("socket message number %d", i)
+    handler.close()
+
+
+def send_datagram(count: int, tcp_port: int, udp_port: int):
+    handler = DatagramHandler(HOST, udp_port)
+    log = make_logger(handler)
+    for i in range(count):
+        log.info("datagram message number %d", i)
+    handler.close()
+
+
+def send_json(count: int, tcp_port: int, udp_port: int):
+    with socket.create_connection((HOST, tcp_port)) as connection:
+        for start in range(0, count, JSON_BATCH):
+            lines = (
+                json.dumps({"level": "INFO", "logger": "send", "message": f"json message number {i}"})
+                for i in range(start, min(count, start + JSON_BATCH)))
+            connection.sendall("".join(f"{line}\n" for line in lines).encode())
+
+
+def wait_started(tcp_port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((HOST, tcp_port), 0.1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def wait_written(log_receiver: receiver.LogReceiver, written: int, expected: int) -> float:
+    """
+    Waits until expected records are written or written stops growing,
+    returns the time of the last growth /
+    Ждет, пока запишется expected записей или записанных перестанет
+    прибавляться, возвращает время последнего прироста
+    """
+    last, changed = -1, time.perf_counter()
+    while log_receiver.stats.written - written < expected:
+        if log_receiver.stats.written != last:
+            last, changed = log_receiver.stats.written, time.perf_counter()
+        elif time.perf_counter() - changed > SETTLE_TIME:
+            break
+        time.sleep(0.01)
+    return changed if log_receiver.stats.written - written < expected else time.perf_counter()
+
+
+def measure(log_receiver: receiver.LogReceiver, name: str, send, count: int, tcp_port: int, udp_port: int):
+    before = replace(log_receiver.stats)
+    start = time.perf_counter()
+    send(count, tcp_port, udp_port)
+    sent = time.perf_counter() - start
+    elapsed = wait_written(log_receiver, before.written, count) - start
+    stats = log_receiver.stats
+    written = stats.written - before.written
+    dropped = stats.dropped - before.dropped
+    # потерянные до приема: датаграммы, не принятые системой
+    lost = count - (stats.received - before.received) - dropped
+    print(
+        f"{name:<10} {count:>10,} sent {sent:>7.3f} s {written:>10,} written {elapsed:>7.3f} s "
+        f"{written / elapsed:>10,.0f} rec/s  dropped {dropped:,}  lost {lost:,}  paused {stats.paused - before.paused}")
+
+
+def main(count: int, tcp_port: int, udp_port: int):
+    with tempfile.TemporaryDirectory() as folder:
+        log_receiver = receiver.LogReceiver(
+            os.path.join(folder, "received.db"), host=HOST, tcp_port=tcp_port, udp_port=udp_port)
+        log_receiver.start()
+        wait_started(tcp_port)
+        for name, send in (("socket", send_socket), ("datagram", send_datagram), ("json", send_json)):
+            measure(log_receiver, name, send, count, tcp_port, udp_port)
+        log_receiver.stop()
+        log_receiver.thread.join()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else cfg.RECEIVER_TCP_PORT,
+        int(sys.argv[3]) if len(sys.argv) > 3 else cfg.RECEIVER_UDP_PORT)
@@ -1,31 +1,54 @@
 import os
 import sys
+import multiprocessing
 
 from loguru import logger
 
-from app import application
+from app import application, tracing
+from app import config as cfg
 
 """
 Application entry point /
 Запуск приложения
 """
 
-# настройка логирования
-logger.add(
-    f"{os.getcwd()}\\logs\\debug.log",
-    rotation="1MB")
-
-# первая запись в логи
-logger.debug("START")
-
-# создание и запуск приложения
-app = application.Application(sys.argv)
-exit_code = app.run()
-
-# последняя запись в логи
-if exit_code == 0:
-    logger.debug("FINISH")
-else:
-    logger.critical(f"FINISH with exit code = {exit_code}")
-
-sys.exit(exit_code)
+# процессы пула импорта логов заново импортируют этот модуль,
+# приложение запускается только в главном процессе
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    # настройка логирования: записи пишутся фоновым потоком (enqueue),
+    # трассировка запросов - отдельным файлом со структурированными записями
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        filter=tracing.not_query_record)
+    logger.add(
+        f"{os.getcwd()}\\logs\\debug.log",
+        rotation=cfg.LOG_ROTATION,
+        filter=tracing.not_query_record,
+        enqueue=True)
+    logger.add(
+        f"{os.getcwd()}\\logs\\sql.log",
+        rotation=cfg.LOG_ROTATION,
+        filter=tracing.is_query_record,
+        serialize=True,
+        enqueue=True)
+
+    # первая запись в логи
+    logger.debug("START")
+
+    # создание и запуск приложения
+    app = application.Application(sys.argv)
+    exit_code = app.run()
+
+    # последняя запись в логи
+    if exit_code == 0:
+        logger.debug("FINISH")
+    else:
+        logger.critical(f"FINISH with exit code = {exit_code}")
+
+    # дозапись очереди логов
+    logger.complete()
+
+    sys.exit(exit_code)